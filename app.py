@@ -1,11 +1,13 @@
 import os
 import sys
 import time
+import math
 import pandas as pd
 import tempfile
 import streamlit as st
 from datetime import datetime
 from io import StringIO
+import uuid
 import traceback
 import subprocess
 
@@ -14,9 +16,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Импортируем наш модуль scraper
 try:
-    from company_site_finder.scraper import main as scraper_main
+    from company_site_finder.job_service import SearchJobService
+    from company_site_finder.utils.helpers import detect_company_column, companies_from_table
 except ImportError:
-    from scraper import main as scraper_main
+    from job_service import SearchJobService
+    from utils.helpers import detect_company_column, companies_from_table
 
 # Настройка конфигурации Streamlit
 st.set_page_config(
@@ -39,13 +43,47 @@ if 'results' not in st.session_state:
     st.session_state.results = None
 if 'output_file' not in st.session_state:
     st.session_state.output_file = None
+# Строки результатов и счетчики, которые обновляются по мере поиска
+if 'result_rows' not in st.session_state:
+    st.session_state.result_rows = []
+if 'found_count' not in st.session_state:
+    st.session_state.found_count = 0
+if 'processed_count' not in st.session_state:
+    st.session_state.processed_count = 0
+if 'results_df' not in st.session_state:
+    st.session_state.results_df = None
+# Текущее задание в общем сервисе поиска и идентификатор пользователя для равных долей очереди
+if 'job' not in st.session_state:
+    st.session_state.job = None
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+
+# Количество строк на одной странице таблицы результатов
+RESULTS_PAGE_SIZE = 100
+# Минимальный интервал между перерисовками таблицы во время поиска (сек)
+LIVE_REFRESH_SECONDS = 0.5
+# Количество браузеров общего сервиса поиска (на всех пользователей) и его прокси
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", 2))
+SEARCH_PROXY = os.environ.get("SEARCH_PROXY") or None
+# Через сколько секунд без чтения результатов (страница закрыта) задание сеанса отменяется (сек)
+ABANDON_TIMEOUT = 120
+
+@st.cache_resource
+def get_job_service():
+    """
+    Один сервис поиска на процесс Streamlit: все сеансы ставят задания в его очередь,
+    поэтому число браузеров не растет с числом пользователей
+    """
+    return SearchJobService(workers=SEARCH_WORKERS, headless=True, proxy=SEARCH_PROXY,
+                            aggregators_file="data/aggregators.json", abandon_timeout=ABANDON_TIMEOUT)
 
 # Функция для проверки CSV-файла
 def validate_csv(file):
     """
     Проверяет загруженный CSV-файл и возвращает результат
     :param file: Загруженный файл
-    :return: (is_valid, result) - Флаг валидности и результат
+    :return: (is_valid, result) - Флаг валидности и результат (DataFrame с колонкой 'Company Name'
+        или текст ошибки)
     """
     try:
         # Читаем CSV-файл
@@ -55,64 +93,19 @@ def validate_csv(file):
         if df.empty:
             return False, "Файл не содержит данных"
         
-        # Проверяем наличие нужных колонок
-        valid_columns = ['Company Name', 'company name', 'company_name', 'name', 'Name', 'Название', 'название', 'Компания', 'компания']
-        
-        if not any(col in df.columns for col in valid_columns):
-            # Если нет известных колонок, пробуем взять первую колонку
-            if len(df.columns) > 0:
-                first_col = df.columns[0]
-                # Пробуем переименовать первую колонку
-                df = df.rename(columns={first_col: 'Company Name'})
-                return True, df
-            else:
-                return False, "В файле нет корректных колонок с названиями компаний"
-        
-        # Если нашли подходящую колонку, переименуем ее для стандартизации
-        for col in valid_columns:
-            if col in df.columns:
-                df = df.rename(columns={col: 'Company Name'})
-                break
+        if detect_company_column(df.columns) is None:
+            return False, "В файле нет корректных колонок с названиями компаний"
         
-        # Проверяем наличие непустых значений
-        if df['Company Name'].isnull().all():
+        # Те же правила выбора колонки, очистки и удаления дубликатов, что и в scraper
+        companies = companies_from_table(df)
+        if not companies:
             return False, "Колонка с названиями компаний пуста"
         
-        # Удаляем пустые строки
-        df = df.dropna(subset=['Company Name'])
-        
-        # Удаляем дубликаты
-        df = df.drop_duplicates(subset=['Company Name'])
-        
-        return True, df
+        return True, pd.DataFrame({'Company Name': companies})
     
     except Exception as e:
         return False, f"Ошибка при чтении файла: {e}"
 
-# Функция для сохранения загруженного файла
-def save_uploaded_file(uploaded_file):
-    """
-    Сохраняет загруженный файл во временную директорию
-    :param uploaded_file: Загруженный файл
-    :return: (success, path) - Флаг успеха и путь к сохраненному файлу
-    """
-    try:
-        os.makedirs('data/input', exist_ok=True)
-        
-        # Создаем имя файла на основе времени
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_name = f"input_{timestamp}.csv"
-        file_path = os.path.join('data/input', file_name)
-        
-        # Сохраняем файл
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        return True, file_path
-    
-    except Exception as e:
-        return False, f"Ошибка при сохранении файла: {e}"
-
 def setup_settings():
     """Настройка боковой панели с настройками"""
     with st.sidebar:
@@ -122,17 +115,10 @@ def setup_settings():
         search_engine = st.selectbox(
             "Поисковая система",
             options=["google", "yandex", "duckduckgo"],
-            index=1,  # Яндекс по умолчанию, так как он более стабилен
+            index=0,  # Google по умолчанию, как в консоли и в main
             help="Выберите поисковую систему для поиска сайтов компаний. Яндекс обычно более стабилен для поиска российских компаний."
         )
         
-        # Режим запуска браузера
-        headless = st.checkbox(
-            "Фоновый режим",
-            value=True,
-            help="Если включено, браузер будет работать в фоновом режиме без отображения окна. Отключите для отладки."
-        )
-        
         # Настройки поиска
         st.subheader("Настройки поиска")
         
@@ -168,27 +154,127 @@ def setup_settings():
                 help="Использовать дополнительные методы поиска для повышения точности результатов."
             )
             
-            proxy = st.text_input(
-                "Прокси-сервер (опционально)",
-                value="",
-                help="Укажите адрес прокси-сервера в формате 'ip:port' или 'user:pass@ip:port'."
+            domain_guess = st.checkbox(
+                "Подбирать домен по названию",
+                value=False,
+                help="Перед поиском пробовать очевидные домены (например, stalmontazh.ru для 'Стальмонтаж') и проверять их по заголовку сайта. В поисковую систему уходят только компании, для которых домен не подобран."
             )
+            
+            deadline_hours = st.number_input(
+                "Закончить за (часов)",
+                min_value=0.0,
+                max_value=168.0,
+                value=0.0,
+                step=0.5,
+                help="Срок окончания поиска. Если по текущей скорости поиск не успевает, повторные попытки сокращаются, а после срока оставшиеся компании пропускаются. 0 - без срока."
+            )
+            
+            company_budget = st.number_input(
+                "Бюджет на компанию (сек)",
+                min_value=0,
+                max_value=600,
+                value=0,
+                step=10,
+                help="Компании, на которые ушло больше времени, откладываются в конец и повторяются, только если останется время. 0 - без ограничения."
+            )
+            
+        # Браузеры и прокси общие для всех пользователей: они задаются при запуске сервера
+        stats = get_job_service().stats()
+        st.caption(f"Сервис поиска: браузеров - {stats['workers']}, компаний в очереди - {stats['queued']}, "
+                   f"пользователей - {stats['users']}")
         
         # Создаем словарь с настройками
         settings = {
             "search_engine": search_engine,
-            "headless": headless,
-            "proxy": proxy if proxy else None,
             "search_params": {
                 "max_retries": max_retries,
                 "delay_seconds": delay_seconds,
                 "add_keywords": add_keywords,
-                "thorough_search": thorough_search
+                "thorough_search": thorough_search,
+                "domain_guess": domain_guess,
+                "deadline": deadline_hours * 3600 if deadline_hours else None,
+                "company_budget": company_budget or None
             }
         }
         
         return settings
 
+def cancel_job():
+    """Отменяет незавершенное задание сеанса, чтобы оно не занимало рабочих общего сервиса"""
+    job = st.session_state.job
+    if job is not None and not job.done:
+        job.cancel()
+    st.session_state.job = None
+
+def reset_results_state():
+    """Сбрасывает результаты и счетчики перед новым поиском"""
+    cancel_job()
+    st.session_state.results = None
+    st.session_state.output_file = None
+    st.session_state.result_rows = []
+    st.session_state.found_count = 0
+    st.session_state.processed_count = 0
+    st.session_state.results_df = None
+
+def display_stats(placeholder=None):
+    """
+    Показывает статистику по найденным сайтам по инкрементальным счетчикам
+    :param placeholder: Контейнер для вывода (по умолчанию текущая позиция страницы)
+    """
+    found_count = st.session_state.found_count
+    total_count = st.session_state.processed_count
+    found_percent = (found_count / total_count) * 100 if total_count > 0 else 0
+    
+    target = placeholder if placeholder is not None else st
+    target.info(f"Найдено {found_count} сайтов из {total_count} компаний ({found_percent:.1f}%)")
+
+def make_live_results(table_placeholder, stats_placeholder):
+    """
+    Создает обработчик результатов поиска, который дописывает строки в таблицу по ходу поиска
+    :param table_placeholder: Контейнер для таблицы последних результатов
+    :param stats_placeholder: Контейнер для счетчиков
+    :return: (on_result, render) - обработчик записи и функция принудительной перерисовки
+    """
+    last_render = {"time": 0.0}
+    
+    def render():
+        # Показываем только последнюю страницу, чтобы не сериализовать всю таблицу на каждом обновлении
+        rows = st.session_state.result_rows[-RESULTS_PAGE_SIZE:]
+        table_placeholder.dataframe(
+            pd.DataFrame(rows, columns=['Компания', 'Сайт']),
+            use_container_width=True
+        )
+        display_stats(stats_placeholder)
+        last_render["time"] = time.monotonic()
+    
+    def on_result(record):
+        website = record['website'] or "Не найден"
+        st.session_state.result_rows.append((record['company'], website))
+        st.session_state.processed_count += 1
+        if record['status'] == 'found':
+            st.session_state.found_count += 1
+        
+        if time.monotonic() - last_render["time"] >= LIVE_REFRESH_SECONDS:
+            render()
+    
+    return on_result, render
+
+def display_results_page():
+    """Показывает результаты постранично, используя однажды построенный DataFrame"""
+    if st.session_state.results_df is None:
+        st.session_state.results_df = pd.DataFrame(st.session_state.result_rows, columns=['Компания', 'Сайт'])
+    result_df = st.session_state.results_df
+    
+    total_pages = max(1, math.ceil(len(result_df) / RESULTS_PAGE_SIZE))
+    page = 1
+    if total_pages > 1:
+        page = st.number_input("Страница", min_value=1, max_value=total_pages, value=1, step=1)
+    
+    start = (page - 1) * RESULTS_PAGE_SIZE
+    st.dataframe(result_df.iloc[start:start + RESULTS_PAGE_SIZE], use_container_width=True)
+    if total_pages > 1:
+        st.caption(f"Страница {page} из {total_pages} ({len(result_df)} строк)")
+
 def display_search_tips():
     """Отображает рекомендации по поиску"""
     with st.expander("Советы по улучшению поиска", expanded=False):
@@ -249,7 +335,6 @@ def main():
     
     # Переменные для хранения данных
     df = None
-    input_file_path = None
     
     if input_method == "Загрузить CSV-файл":
         # Загрузка файла
@@ -265,13 +350,6 @@ def main():
                 # Показываем предпросмотр данных
                 st.subheader("Предпросмотр данных")
                 st.dataframe(df.head(5), use_container_width=True)
-                
-                # Сохраняем загруженный файл
-                saved, input_file_path = save_uploaded_file(uploaded_file)
-                
-                if not saved:
-                    st.error(input_file_path)
-                    input_file_path = None
             else:
                 st.error(f"Ошибка при проверке файла: {result}")
     else:
@@ -283,7 +361,7 @@ def main():
         )
         
         if manual_input:
-            companies = [company.strip() for company in manual_input.split('\n') if company.strip()]
+            companies = companies_from_table(manual_input.split('\n'))
             
             if companies:
                 # Создаем DataFrame из списка
@@ -292,17 +370,19 @@ def main():
                 # Показываем предпросмотр данных
                 st.subheader("Предпросмотр данных")
                 st.dataframe(df.head(5), use_container_width=True)
-                
-                # Временное сохранение в файл
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                os.makedirs("data/input", exist_ok=True)
-                input_file_path = f"data/input/manual_input_{timestamp}.csv"
-                df.to_csv(input_file_path, index=False)
             else:
                 st.warning("Пожалуйста, введите хотя бы одно название компании.")
     
-    # Если у нас есть данные и путь к файлу, показываем кнопку начала поиска
-    if df is not None and input_file_path is not None:
+    # Новые данные заменили те, по которым идет поиск: старое задание отменяем
+    job = st.session_state.job
+    if job is not None and (df is None or companies_from_table(df) != job.companies):
+        cancel_job()
+        st.session_state.search_running = False
+        st.session_state.progress = 0.0
+        st.session_state.status = "Готов к запуску"
+    
+    # Если у нас есть данные, показываем кнопку начала поиска
+    if df is not None:
         # Создаем путь для выходного файла
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file_dir = "data/output"
@@ -332,18 +412,68 @@ def main():
                 # Запускаем поиск, если он еще не запущен
                 if st.session_state.results is None:
                     try:
-                        # Запускаем процесс поиска
-                        result = scraper_main(
-                            input_file=input_file_path,
-                            output_file=output_file_path,
-                            search_engine=settings["search_engine"],
-                            headless=settings["headless"],
-                            proxy=settings["proxy"],
-                            search_params=settings["search_params"]
-                        )
+                        # Таблица и счетчики, которые заполняются по мере поиска
+                        st.subheader("Результаты поиска:")
+                        stats_placeholder = st.empty()
+                        table_placeholder = st.empty()
+                        on_result, render_live = make_live_results(table_placeholder, stats_placeholder)
+                        
+                        def on_progress(progress, status):
+                            if progress is not None:
+                                st.session_state.progress = progress
+                                progress_bar.progress(progress)
+                            st.session_state.status = status
+                            status_text.text(status)
+                        
+                        service = get_job_service()
+                        job = st.session_state.job
+                        if job is None:
+                            reset_results_state()
+                            
+                            # Ставим задание в очередь общего сервиса поиска
+                            # Передаем уже проверенные данные напрямую, без временного файла
+                            search_params = settings["search_params"]
+                            job = service.submit(
+                                st.session_state.user_id,
+                                df,
+                                search_engine=settings["search_engine"],
+                                max_retries=search_params["max_retries"],
+                                domain_guess=search_params["domain_guess"],
+                                deadline=search_params["deadline"],
+                                delay_seconds=search_params["delay_seconds"],
+                                company_budget=search_params["company_budget"]
+                            )
+                            st.session_state.job = job
+                        else:
+                            # Скрипт перезапущен во время поиска: задание продолжает выполняться в сервисе,
+                            # дочитываем его результаты с того места, где остановились
+                            render_live()
+                        
+                        # Получаем результаты по мере готовности
+                        while True:
+                            for record in job.iter_results(len(st.session_state.result_rows), LIVE_REFRESH_SECONDS):
+                                on_result(record)
+                            
+                            stats = service.stats()
+                            # Оценка времени до окончания задания, как в консоли
+                            details = [f"в очереди сервиса: {stats['queued']}", job.describe()]
+                            on_progress(job.progress(), f"Обработано {len(job.records)}/{job.total} компаний "
+                                                        f"({', '.join(detail for detail in details if detail)})")
+                            if job.done:
+                                break
+                        for record in job.iter_results(len(st.session_state.result_rows)):
+                            on_result(record)
+                        render_live()
+                        
+                        if job.error and not any(record['website'] for record in job.records):
+                            # Например, браузер не запускается ни у одного рабочего
+                            st.session_state.job = None
+                            raise RuntimeError(job.error)
                         
                         # Сохраняем результаты в состояние сессии
-                        st.session_state.results = result
+                        job.save(output_file_path)
+                        st.session_state.results = {record['company']: record['website'] for record in job.records}
+                        st.session_state.job = None
                         st.session_state.output_file = output_file_path
                         st.session_state.search_running = False
                         st.session_state.progress = 1.0
@@ -365,20 +495,11 @@ def main():
                     
                     # Показываем результаты в виде таблицы
                     if st.session_state.results:
-                        result_df = pd.DataFrame({
-                            'Компания': list(st.session_state.results.keys()),
-                            'Сайт': list(st.session_state.results.values())
-                        })
-                        
                         st.subheader("Результаты поиска:")
-                        st.dataframe(result_df, use_container_width=True)
+                        display_results_page()
                         
                         # Статистика по найденным сайтам
-                        found_count = len([v for v in st.session_state.results.values() if v != "Не найден"])
-                        total_count = len(st.session_state.results)
-                        found_percent = (found_count / total_count) * 100 if total_count > 0 else 0
-                        
-                        st.info(f"Найдено {found_count} сайтов из {total_count} компаний ({found_percent:.1f}%)")
+                        display_stats()
                         
                         # Кнопка для скачивания результатов
                         if st.session_state.output_file and os.path.exists(st.session_state.output_file):
@@ -393,8 +514,7 @@ def main():
                         # Кнопка для нового поиска
                         if st.button("Начать новый поиск"):
                             # Сбрасываем состояние
-                            st.session_state.results = None
-                            st.session_state.output_file = None
+                            reset_results_state()
                             st.session_state.search_running = False
                             st.session_state.progress = 0.0
                             st.session_state.status = "Готов к запуску"
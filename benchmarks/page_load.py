@@ -0,0 +1,153 @@
+"""
+Замер времени одного запроса при разных настройках ожидания загрузки страниц.
+
+Поднимает локальный сервер с имитацией страницы результатов (медленная картинка
+задерживает событие load, окна cookies на странице нет) и выполняет одинаковые
+запросы в браузере с прежними настройками (pageLoadStrategy 'normal', неявное
+ожидание 10 сек, проверка окна cookies на каждой странице) и с быстрыми
+('eager' / 'none', без неявного ожидания, окно cookies проверяется один раз).
+С параметром --engine запросы выполняются в настоящей поисковой системе.
+
+Примеры:
+    python benchmarks/page_load.py --queries 10
+    python benchmarks/page_load.py --engine yandex --queries 5 --no-headless
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import CompanySiteFinder
+from engines import YandexEngine, get_engine
+
+# Настройки: (название, pageLoadStrategy, неявное ожидание, проверять окно cookies на каждой странице)
+CONFIGS = [
+    ("normal + implicit 10s", "normal", 10, True),
+    ("eager", "eager", 0, False),
+    ("none", "none", 0, False),
+]
+
+COMPANIES = ["Газпром", "Сбербанк", "Яндекс", "Лукойл", "Магнит", "Ростелеком", "Аэрофлот", "Северсталь"]
+
+class MockSerpHandler(BaseHTTPRequestHandler):
+    """Страница результатов в разметке Яндекса и медленный ресурс, задерживающий событие load"""
+    slow_seconds = 3
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/slow.png":
+            time.sleep(self.slow_seconds)
+            self._send(b"", "image/png")
+            return
+
+        query = parse_qs(url.query).get("text", [""])[0]
+        results = "".join(
+            f'<li class="serp-item"><h2><a class="OrganicTitle-Link" href="https://company{i}.ru/">'
+            f'{query} {i}</a></h2></li>'
+            for i in range(10)
+        )
+        html = (f'<html><head><title>{query}</title></head><body><ul class="serp-list">{results}</ul>'
+                f'<img src="/slow.png?q={quote(query)}"></body></html>')
+        self._send(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(slow_seconds):
+    """Запускает сервер в фоновом потоке и возвращает (сервер, порт)"""
+    MockSerpHandler.slow_seconds = slow_seconds
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockSerpHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+def benchmark_engine(base_class, port=None):
+    """
+    Поисковая система для замера: без случайных пауз и прокрутки, чтобы измерялось только ожидание
+    :param base_class: Класс поисковой системы
+    :param port: Порт имитации (None - настоящая поисковая система)
+    """
+    class BenchmarkEngine(base_class):
+        load_delay = None
+        settle_delay = None
+        scroll_fraction = None
+        ready_failed_delay = (0, 0)
+
+        def build_url(self, query):
+            if port is None:
+                return super().build_url(query)
+            return f"http://127.0.0.1:{port}/search?text={quote(query)}"
+
+    return BenchmarkEngine()
+
+def run_config(engine, name, strategy, implicit_wait, consent_every_page, queries, headless):
+    """
+    Выполняет запросы с одной настройкой
+    :return: Список длительностей запросов в секундах
+    """
+    finder = CompanySiteFinder(search_engine="yandex", headless=headless,
+                               page_load_strategy=strategy, implicit_wait=implicit_wait)
+    finder.setup_driver()
+    timings = []
+    try:
+        for i in range(queries):
+            if consent_every_page:
+                finder.pipeline.consent_checked.clear()
+
+            company = COMPANIES[i % len(COMPANIES)]
+            started_at = time.perf_counter()
+            website, _ = finder.pipeline.run(finder.driver, engine, company)
+            timings.append(time.perf_counter() - started_at)
+            print(f"  [{name}] {company}: {timings[-1]:.2f} сек -> {website}")
+    finally:
+        finder.close_driver()
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени запроса при разных стратегиях загрузки страниц")
+    parser.add_argument("--engine", default=None, help="Настоящая поисковая система вместо локальной имитации")
+    parser.add_argument("--queries", type=int, default=8, help="Запросов на каждую настройку")
+    parser.add_argument("--slow-seconds", type=float, default=3, help="Задержка медленного ресурса имитации")
+    parser.add_argument("--no-headless", dest="headless", action="store_false", help="Показывать окно браузера")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.engine:
+        engine = benchmark_engine(type(get_engine(args.engine)))
+    else:
+        server, port = start_mock_server(args.slow_seconds)
+        engine = benchmark_engine(YandexEngine, port)
+
+    results = []
+    try:
+        for name, strategy, implicit_wait, consent_every_page in CONFIGS:
+            print(f"Настройка: {name}")
+            timings = run_config(engine, name, strategy, implicit_wait, consent_every_page,
+                                 args.queries, args.headless)
+            results.append((name, timings))
+    finally:
+        if server:
+            server.shutdown()
+
+    baseline = statistics.mean(results[0][1])
+    print()
+    print(f"{'Настройка':<24}{'среднее':>10}{'медиана':>10}{'минимум':>10}{'экономия':>12}")
+    for name, timings in results:
+        mean = statistics.mean(timings)
+        print(f"{name:<24}{mean:>9.2f}s{statistics.median(timings):>9.2f}s{min(timings):>9.2f}s"
+              f"{baseline - mean:>10.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,690 @@
+"""
+Поисковые системы и общий конвейер поиска: загрузка -> извлечение -> фильтрация -> ранжирование.
+
+Каждая поисковая система описывает только то, чем она отличается от других: как строится
+URL запроса, какой элемент означает, что результаты загрузились, и какими селекторами
+извлекаются ссылки. Все остальное делают общие этапы конвейера, поэтому любые улучшения
+этих этапов сразу действуют для всех поисковых систем.
+"""
+import random
+from collections import deque
+from urllib.parse import quote, urlparse
+
+# Импорт с поддержкой запуска и как модуля, и как скрипта
+try:
+    from .utils.helpers import is_valid_website, clean_url, random_delay, format_search_query
+except ImportError:
+    from utils.helpers import is_valid_website, clean_url, random_delay, format_search_query
+
+# Зарегистрированные поисковые системы: имя -> экземпляр
+ENGINES = {}
+
+# Домены, которые никогда не являются сайтом компании (общие для всех поисковых систем)
+COMMON_BLACKLIST = [
+    'google.com', 'google.ru', 'yandex.ru', 'ya.ru', 'yandex.com', 'duckduckgo.com', 'bing.com',
+    'youtube.com', 'facebook.com', 'vk.com', 'instagram.com', 'twitter.com', 'linkedin.com',
+    'pinterest.com', 'ok.ru', 'wikipedia.org', 'fandom.com', 'wildberries.ru', 'ozon.ru',
+    'avito.ru', 'youla.ru', 'dzen.ru', 'mail.ru', 'gosuslugi.ru', 'amazon.com', 'ebay.com',
+    'aliexpress.com', 'rbc.ru', 'ria.ru', 'tass.ru', 'kommersant.ru', 'interfax.ru', 'lenta.ru',
+    'gazeta.ru', 'vedomosti.ru', 'forbes.ru', 'kinopoisk.ru'
+]
+
+def register_engine(engine_class):
+    """
+    Регистрирует поисковую систему (используется как декоратор класса)
+    :param engine_class: Подкласс SearchEngine
+    :return: Тот же класс
+    """
+    engine = engine_class()
+    ENGINES[engine.name] = engine
+    return engine_class
+
+def get_engine(name):
+    """
+    Возвращает зарегистрированную поисковую систему по имени
+    :param name: Имя поисковой системы
+    :return: Экземпляр SearchEngine
+    """
+    try:
+        return ENGINES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Поддерживаемые поисковые системы: {', '.join(repr(n) for n in ENGINES)}")
+
+class CaptchaDetected(Exception):
+    """Поисковая система показала капчу или страницу блокировки вместо результатов"""
+
+class SearchEngine:
+    """Базовый класс поисковой системы"""
+    # Имя для настроек и название для сообщений
+    name = None
+    title = None
+    # CSS-селектор, появление которого означает, что результаты загрузились
+    ready_selector = None
+    ready_timeout = 15
+    # Прерывать поиск, если результаты не дождались (иначе пробуем разобрать страницу как есть)
+    require_ready = False
+    # Селекторы ссылок на результаты в порядке приоритета
+    selectors = []
+    # Общие селекторы из selectors, которые находят любые внешние ссылки (шапка, реклама):
+    # статистика не поднимает их вперед и не останавливает после них выполнение остальных
+    generic_selectors = []
+    # Селектор для запасного варианта, если основные селекторы ничего не нашли
+    fallback_selector = 'a[href^="http"]'
+    # Брать ссылку у ближайшей родительской <a>, если селектор нашел не саму ссылку
+    link_from_ancestor = False
+    # Дополнительные домены, которые нужно отфильтровать для этой системы
+    blacklist = []
+    # XPath кнопки согласия с cookies (None - не проверять) и сколько секунд ждать ее появления
+    consent_xpath = None
+    consent_timeout = 2
+    # Паузы (мин, макс) в секундах: после открытия страницы, после появления результатов,
+    # после прокрутки и если результаты так и не появились
+    load_delay = None
+    settle_delay = None
+    scroll_delay = (1, 2)
+    ready_failed_delay = (5, 7)
+    # Доля высоты страницы для прокрутки после загрузки (None - не прокручивать)
+    scroll_fraction = None
+    # Признаки капчи: части адреса, на который перенаправляет система, и фрагменты HTML страницы
+    captcha_url_markers = []
+    captcha_page_markers = []
+
+    def build_query(self, company_name):
+        """Формирует поисковый запрос по названию компании"""
+        return format_search_query(company_name)
+
+    def build_url(self, query):
+        """Формирует URL страницы результатов"""
+        raise NotImplementedError
+
+    def page_delay(self):
+        """
+        Паузы, которые последовательный поиск выдерживает внутри запроса: после открытия страницы,
+        после появления результатов и после прокрутки. Во вкладках браузер их не ждет, поэтому
+        они добавляются к паузе перед следующим запросом к системе
+        :return: Секунды
+        """
+        delays = [self.load_delay, self.settle_delay, self.scroll_delay if self.scroll_fraction else None]
+        return sum(random.uniform(*delay) for delay in delays if delay)
+
+    def open(self, driver, query):
+        """Открывает страницу результатов по запросу"""
+        url = self.build_url(query)
+        print(f"Открываем URL {self.title}: {url}")
+        driver.get(url)
+
+    def handle_consent(self, driver):
+        """
+        Принимает cookies, если на странице есть такое окно
+        :return: True, если окно было и согласие принято
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        if not self.consent_xpath:
+            return False
+        try:
+            # Короткое ограниченное ожидание: окно может появиться не сразу, но если его нет,
+            # не ждем дольше consent_timeout
+            cookies_buttons = WebDriverWait(driver, self.consent_timeout, poll_frequency=0.1).until(
+                lambda d: d.find_elements(By.XPATH, self.consent_xpath)
+            )
+            cookies_buttons[0].click()
+            print(f"Принято согласие с cookies ({self.title})")
+            random_delay(1, 2)
+            return True
+        except TimeoutException:
+            pass
+        except Exception as e:
+            print(f"Не удалось обработать окно cookies ({self.title}): {e}")
+        return False
+
+    def is_captcha(self, url, html=None):
+        """
+        Проверяет, что вместо результатов показана капча
+        :param url: Текущий адрес страницы
+        :param html: HTML страницы (необязательно: адрес проверяется дешевле)
+        """
+        if url and any(marker in url for marker in self.captcha_url_markers):
+            return True
+        return bool(html) and any(marker in html for marker in self.captcha_page_markers)
+
+    def link_from_element(self, element):
+        """Извлекает ссылку из элемента, найденного селектором"""
+        if element.name == 'a' or not self.link_from_ancestor:
+            return element.get('href')
+        parent = element.find_parent('a')
+        return parent.get('href') if parent else None
+
+    def is_blacklisted(self, domain):
+        """
+        Проверяет, входит ли домен в черный список: совпадает с записью или является ее поддоменом
+        (m.vk.com попадает под 'vk.com', а book.ru под 'ok.ru' - нет)
+        """
+        host = domain.lower().rpartition('@')[2].partition(':')[0].strip('.')
+        return any(host == bd or host.endswith('.' + bd) for bd in COMMON_BLACKLIST + self.blacklist)
+
+@register_engine
+class GoogleEngine(SearchEngine):
+    name = "google"
+    title = "Google"
+    ready_selector = "#search"
+    ready_timeout = 10
+    require_ready = True
+    consent_xpath = "//button[contains(., 'Принимаю') or contains(., 'Принять все') or contains(., 'Accept all')]"
+    captcha_url_markers = ['google.com/sorry/']
+    captcha_page_markers = ['id="captcha-form"', 'g-recaptcha', 'unusual traffic from your computer']
+    # Селектор заголовка находит h3, ссылка у него в родителе
+    link_from_ancestor = True
+    selectors = [
+        'div.g div.yuRUbf a',                # Старый формат
+        'div.g h3.LC20lb + div a',           # Альтернативный формат
+        'div.tF2Cxc a',                      # Новый формат 2023
+        'div.yuRUbf > a',                    # Еще один формат
+        '.g .DhN8Cf a',                      # Обновленный Google 2024
+        '.g .kvH3mc a',                      # Дополнительный селектор 2024
+        'h3.LC20lb'                          # Поиск по заголовкам
+    ]
+
+    def build_query(self, company_name):
+        return format_search_query(company_name) + " официальный сайт"
+
+    def build_url(self, query):
+        return f"https://www.google.com/search?q={quote(query)}"
+
+@register_engine
+class YandexEngine(SearchEngine):
+    name = "yandex"
+    title = "Яндекс"
+    ready_selector = ".serp-item, .OrganicTitle-Link, .organic, .serp-list"
+    captcha_url_markers = ['/showcaptcha', '/checkcaptcha']
+    captcha_page_markers = ['SmartCaptcha', 'CheckboxCaptcha', 'AdvancedCaptcha']
+    consent_xpath = "//button[contains(., 'Принять') or contains(., 'Accept') or contains(., 'Да') or contains(., 'Yes')]"
+    load_delay = (2, 4)
+    settle_delay = (2, 3)
+    scroll_fraction = 1 / 2
+    selectors = [
+        # Новые селекторы для Яндекса (2024)
+        'div.serp-item a.link[href^="http"]',
+        'div.organic a.link[href^="http"]',
+        'h2 a.OrganicTitle-Link',
+        'div.Path a.link:not(.link_theme_outer)',
+        '.Title a.link[href^="http"]',
+        '.OrganicSearchSnippet a.OrganicSearchSnippet-LinkUrl',
+        '.OrganicSnippet-LinkUrls a',
+        '.organic a.link_outer, .organic a.OrganicTitle-Link',
+        # Селекторы для разных версий Яндекса
+        'a.OrganicTitle-Link, .OrganicSearchSnippet a',
+        'a[href^="http"].link',
+        '.organic__url',
+        '.serp-url__link',
+        '.typo_text_m a.link',
+        # Осторожные селекторы для проверки наличия URL в тексте ссылки
+        'a[href^="http"]:not([href*="yandex"]):not([href*="ya.ru"])'
+    ]
+    generic_selectors = [
+        'a[href^="http"].link',
+        'a[href^="http"]:not([href*="yandex"]):not([href*="ya.ru"])'
+    ]
+
+    def build_url(self, query):
+        return f"https://yandex.ru/search/?text={quote(query)}"
+
+@register_engine
+class DuckDuckGoEngine(SearchEngine):
+    name = "duckduckgo"
+    title = "DuckDuckGo"
+    ready_selector = ".result, .result__a, .result__url"
+    captcha_page_markers = ['anomaly-modal', 'challenge-form']
+    consent_xpath = "//button[contains(text(), 'Accept') or contains(text(), 'Принять') or contains(text(), 'I Agree')]"
+    load_delay = (3, 5)
+    settle_delay = (2, 4)
+    scroll_fraction = 1 / 3
+    selectors = [
+        '.result__a',                        # Основной селектор для ссылок
+        '.result__url',                      # URL в результатах
+        '.result__snippet a',                # Ссылки в сниппете
+        '.result__title a',                  # Заголовки результатов
+        '.result_content a',                 # Контент результатов
+        'a[href^="http"]:not([href*="duckduckgo.com"])',  # Все внешние ссылки
+        'a[data-testid="result-title-a"]',    # Новый формат 2024
+        '.react-results a.eVNpHGjtxRBq_gLOfGDr'  # Еще один формат 2024
+    ]
+    generic_selectors = ['a[href^="http"]:not([href*="duckduckgo.com"])']
+
+    def build_url(self, query):
+        return f"https://duckduckgo.com/?q={quote(query)}&t=h_&ia=web"
+
+def selector_plan(engine, selector_stats=None):
+    """
+    Порядок выполнения селекторов поисковой системы
+    :param engine: SearchEngine
+    :param selector_stats: SelectorStats (опционально)
+    :return: Список (селектор, можно_остановиться); без статистики - исходный порядок без остановки
+    """
+    if selector_stats is None:
+        return [(selector, False) for selector in engine.selectors]
+    return selector_stats.plan(engine.name, engine.selectors, engine.generic_selectors)
+
+def run_selectors(engine, html, plan, stop_links=None):
+    """
+    Выполняет селекторы по HTML страницы результатов. Не меняет никакого общего состояния,
+    поэтому может выполняться в отдельном процессе
+    :param engine: SearchEngine
+    :param html: HTML-код страницы
+    :param plan: Список (селектор, можно_остановиться) - см. selector_plan
+    :param stop_links: Сколько ссылок должен найти надежный селектор, чтобы остальные не выполнять
+    :return: (ссылки без дубликатов в порядке приоритета селекторов поисковой системы, а внутри
+        селектора - в порядке на странице; число совпадений каждого селектора плана или -1,
+        если селектор не выполнялся)
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    # Приоритет ссылки задается исходным порядком селектора, а не порядком выполнения
+    ranks = {selector: rank for rank, selector in enumerate(engine.selectors)}
+    found = []
+    counts = [-1] * len(plan)
+
+    for index, (selector, trusted) in enumerate(plan):
+        matched = 0
+        try:
+            for element in soup.select(selector):
+                href = engine.link_from_element(element)
+                if href and is_valid_website(href):
+                    found.append((ranks.get(selector, len(ranks)), len(found), href))
+                    matched += 1
+        except Exception as e:
+            print(f"Ошибка при парсинге селектора {selector} ({engine.title}): {e}")
+        counts[index] = matched
+
+        # Надежный селектор уже нашел результаты - остальные не выполняем
+        if trusted and stop_links and matched >= stop_links:
+            break
+
+    found_links = [href for _rank, _position, href in sorted(found)]
+
+    # Если ничего не нашли с помощью селекторов, берем все внешние ссылки на странице
+    if not found_links and engine.fallback_selector:
+        print(f"Не нашли ссылки по селекторам, пробуем найти все ссылки на странице {engine.title}")
+        for link in soup.select(engine.fallback_selector):
+            href = link.get('href')
+            if href and href.startswith('http') and is_valid_website(href):
+                found_links.append(href)
+
+    return list(dict.fromkeys(found_links)), counts
+
+def record_selector_counts(engine, plan, counts, selector_stats=None):
+    """Записывает в статистику число совпадений выполненных селекторов"""
+    if selector_stats is None:
+        return
+    for (selector, _), matched in zip(plan, counts):
+        if matched >= 0:
+            selector_stats.record(engine.name, selector, matched)
+
+def extract_links(engine, html, selector_stats=None):
+    """
+    Этап извлечения: достает ссылки из HTML страницы результатов селекторами поисковой системы
+    :param engine: SearchEngine
+    :param html: HTML-код страницы
+    :param selector_stats: SelectorStats для адаптивного порядка селекторов (опционально)
+    :return: Список ссылок в порядке нахождения (без дубликатов)
+    """
+    plan = selector_plan(engine, selector_stats)
+    stop_links = selector_stats.short_circuit_links if selector_stats is not None else None
+    found_links, counts = run_selectors(engine, html, plan, stop_links)
+    record_selector_counts(engine, plan, counts, selector_stats)
+    return found_links
+
+def parse_serp(engine_name, html, plan, stop_links=None):
+    """
+    Задание для пула процессов разбора: выполняет селекторы поисковой системы по HTML
+    :return: То же, что run_selectors
+    """
+    return run_selectors(get_engine(engine_name), html, plan, stop_links)
+
+# Скрипт извлечения ссылок внутри страницы: вместо передачи всего DOM через WebDriver
+# возвращает только компактный список [href, текст, приоритет селектора, позиция] и число
+# совпадений каждого селектора (-1, если селектор не выполнялся)
+EXTRACT_LINKS_SCRIPT = """
+const selectors = arguments[0];
+const fallbackSelector = arguments[1];
+const fromAncestor = arguments[2];
+const stopAfter = arguments[3];
+const stopLinks = arguments[4];
+const ranks = arguments[5];
+const seen = new Map();
+const links = [];
+const counts = selectors.map(() => -1);
+
+// То же правило, что и в разборе HTML (is_valid_website): засчитываются только абсолютные
+// http(s)-ссылки с доменом, иначе относительные ссылки поисковой системы давали бы
+// ложные попадания селекторов и отменяли запасной вариант
+const websitePattern = /^https?:\/\/[a-z0-9.-]+\.[a-z0-9-]+(?::\d+)?(?:[\/?#]|$)/i;
+
+function add(element, rank) {
+    const link = (element.tagName === 'A' || !fromAncestor) ? element : element.closest('a');
+    if (!link) return false;
+    const href = link.getAttribute('href');
+    if (!href || !websitePattern.test(href)) return false;
+    if (!seen.has(href)) {
+        seen.set(href, links.length);
+        links.push([href, (link.textContent || '').trim().slice(0, 200), rank, links.length]);
+    } else {
+        // Ссылку нашли несколько селекторов - приоритет по самому раннему из них
+        const row = links[seen.get(href)];
+        row[2] = Math.min(row[2], rank);
+    }
+    return true;
+}
+
+for (let i = 0; i < selectors.length; i++) {
+    counts[i] = 0;
+    try {
+        document.querySelectorAll(selectors[i]).forEach(element => { if (add(element, ranks[i])) counts[i]++; });
+    } catch (e) {
+        // Селектор не поддерживается браузером - пропускаем
+    }
+    // Надежный селектор уже нашел результаты - остальные не выполняем
+    if (stopAfter[i] && counts[i] >= stopLinks) break;
+}
+
+if (!links.length && fallbackSelector) {
+    document.querySelectorAll(fallbackSelector).forEach(element => add(element, selectors.length));
+}
+
+return {links: links, counts: counts};
+"""
+
+def extract_links_in_browser(driver, engine, selector_stats=None):
+    """
+    Этап извлечения внутри браузера: выполняет селекторы поисковой системы одним вызовом
+    execute_script и получает только ссылки, без передачи page_source
+    :param driver: WebDriver с открытой страницей результатов
+    :param engine: SearchEngine
+    :param selector_stats: SelectorStats для адаптивного порядка селекторов (опционально)
+    :return: Список ссылок в порядке приоритета селекторов (без дубликатов), как в run_selectors
+    """
+    plan = selector_plan(engine, selector_stats)
+    stop_links = selector_stats.short_circuit_links if selector_stats is not None else 0
+    ranks = {selector: rank for rank, selector in enumerate(engine.selectors)}
+    result = driver.execute_script(EXTRACT_LINKS_SCRIPT, [selector for selector, _ in plan],
+                                   engine.fallback_selector, engine.link_from_ancestor,
+                                   [trusted for _, trusted in plan], stop_links,
+                                   [ranks.get(selector, len(ranks)) for selector, _ in plan]) or {}
+
+    record_selector_counts(engine, plan, result.get('counts', []), selector_stats)
+
+    rows = result.get('links', [])
+    rows.sort(key=lambda row: (row[2], row[3]))
+    return [href for href, _text, _rank, _position in rows if is_valid_website(href)]
+
+def blacklist_filter(engine, links):
+    """Фильтр: убирает поисковые системы, соцсети, маркетплейсы и СМИ"""
+    return [link for link in links if not engine.is_blacklisted(urlparse(link).netloc.lower())]
+
+def first_found_ranker(engine, links):
+    """
+    Ранжирование по умолчанию: порядок извлечения - по исходному приоритету селекторов
+    поисковой системы, внутри селектора - по положению на странице
+    """
+    return links
+
+# Способы извлечения ссылок: разбор page_source в Python или выполнение селекторов в браузере
+EXTRACTION_MODES = ["html", "browser"]
+
+class SearchPipeline:
+    """
+    Общий конвейер поиска. Этапы фильтрации и ранжирования - это списки функций
+    вида stage(engine, links) -> links, в которые можно добавлять свои этапы
+    """
+    def __init__(self, extraction_mode="html", archive=None, selector_stats=None, aggregators=None):
+        """
+        :param extraction_mode: 'html' - разбирать page_source через BeautifulSoup,
+            'browser' - выполнять селекторы внутри страницы и получать только ссылки
+        :param archive: SerpArchive для сохранения загруженных страниц результатов (опционально)
+        :param selector_stats: SelectorStats - упорядочивать селекторы по доле попаданий,
+            пропускать неработающие и останавливаться после надежного (опционально)
+        :param aggregators: AggregatorStats - отфильтровывать справочники организаций и учиться
+            находить новые по кандидатам разных компаний (опционально)
+        """
+        if extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"Поддерживаемые способы извлечения: {', '.join(EXTRACTION_MODES)}")
+        self.extraction_mode = extraction_mode
+        self.archive = archive
+        self.selector_stats = selector_stats
+        # Поисковые системы, для которых окно cookies уже проверено. Согласие хранится в cookies
+        # (профиль браузера или сохраненные cookies), поэтому проверять каждую страницу не нужно
+        self.consent_checked = set()
+        self.aggregators = aggregators
+        self.filters = [blacklist_filter]
+        self.rankers = [first_found_ranker]
+
+    def register_filter(self, stage):
+        """Добавляет этап фильтрации"""
+        self.filters.append(stage)
+        return stage
+
+    def register_ranker(self, stage):
+        """Добавляет этап ранжирования"""
+        self.rankers.append(stage)
+        return stage
+
+    def fetch(self, driver, engine, query):
+        """
+        Этап загрузки: открывает страницу результатов и дожидается их появления
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        engine.open(driver, query)
+
+        if engine.load_delay:
+            random_delay(*engine.load_delay)
+
+        # Перенаправление на капчу видно по адресу - не ждем результатов, которых не будет
+        if engine.is_captcha(driver.current_url):
+            raise CaptchaDetected(f"{engine.title} показывает капчу")
+
+        # Принимаем все cookies, если есть такое окно (один раз для поисковой системы)
+        if engine.name not in self.consent_checked:
+            engine.handle_consent(driver)
+            self.consent_checked.add(engine.name)
+
+        # Ждем загрузки результатов
+        try:
+            WebDriverWait(driver, engine.ready_timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, engine.ready_selector))
+            )
+
+            if engine.settle_delay:
+                random_delay(*engine.settle_delay)
+
+            # Прокручиваем страницу для загрузки всех результатов
+            if engine.scroll_fraction:
+                driver.execute_script(f"window.scrollTo(0, document.body.scrollHeight * {engine.scroll_fraction});")
+                random_delay(*engine.scroll_delay)
+        except Exception as e:
+            if engine.is_captcha(driver.current_url, driver.page_source):
+                raise CaptchaDetected(f"{engine.title} показывает капчу") from e
+            if engine.require_ready:
+                raise
+            print(f"Ошибка при ожидании загрузки результатов {engine.title}: {e}")
+            # Попробуем продолжить даже если не дождались элементов
+            random_delay(*engine.ready_failed_delay)
+
+    def extract(self, driver, engine):
+        """
+        Этап извлечения ссылок с открытой страницы результатов
+        :return: Список ссылок в порядке нахождения
+        """
+        if self.extraction_mode == "browser":
+            return extract_links_in_browser(driver, engine, self.selector_stats)
+        return extract_links(engine, driver.page_source, self.selector_stats)
+
+    def process(self, engine, html, company_name=None):
+        """
+        Этапы извлечения, фильтрации и ранжирования для уже загруженного HTML (не требуют браузера)
+        :return: Отсортированный список кандидатов (очищенные ссылки)
+        """
+        return self.select(engine, extract_links(engine, html, self.selector_stats), company_name)
+
+    def select(self, engine, found_links, company_name=None):
+        """
+        Этапы фильтрации и ранжирования извлеченных ссылок
+        :param company_name: Название компании - для обучения черного списка агрегаторов (опционально)
+        :return: Отсортированный список кандидатов (очищенные ссылки)
+        """
+        print(f"Найдено ссылок ({engine.title}, до фильтрации): {len(found_links)}")
+
+        links = found_links
+        for stage in self.filters:
+            links = stage(engine, links)
+
+        if self.aggregators is not None:
+            # Справочники организаций: известные и выученные по кандидатам разных компаний
+            links = self.aggregators.filter(links, company_name)
+
+        # Очищаем ссылки один раз, после дедупликации и фильтрации
+        links = list(dict.fromkeys(clean_url(link) for link in links))
+        print(f"Найдено ссылок ({engine.title}, после фильтрации): {len(links)}")
+
+        # Домены, которые встречаются для многих разных компаний, со временем станут агрегаторами
+        if self.aggregators is not None and company_name:
+            self.aggregators.observe(company_name, links)
+
+        for stage in self.rankers:
+            links = stage(engine, links)
+
+        return links
+
+    def website_from(self, candidates):
+        """
+        Выбирает сайт из отсортированного списка кандидатов
+        :return: Лучший кандидат с протоколом или None
+        """
+        if not candidates:
+            return None
+
+        # Добавляем протокол, если его нет
+        website = candidates[0]
+        if not website.startswith('http'):
+            website = 'https://' + website
+        return website
+
+    def run(self, driver, engine, company_name):
+        """
+        Полный поиск сайта компании
+        :return: (website, candidates) - лучший кандидат (или None) и все кандидаты
+        """
+        query = engine.build_query(company_name)
+        self.fetch(driver, engine, query)
+        return self.collect(driver, engine, company_name, query)
+
+    def collect(self, driver, engine, company_name, query):
+        """
+        Этапы после загрузки страницы результатов: сохранение в архив, извлечение,
+        фильтрация и ранжирование
+        :return: (website, candidates) - лучший кандидат (или None) и все кандидаты
+        """
+        if self.archive is not None:
+            html = self.page_source(driver, engine, company_name, query)
+            found_links = extract_links(engine, html, self.selector_stats) if self.extraction_mode == "html" else self.extract(driver, engine)
+        else:
+            found_links = self.extract(driver, engine)
+
+        candidates = self.select(engine, found_links, company_name)
+        return self.website_from(candidates), candidates
+
+    def page_source(self, driver, engine, company_name, query):
+        """
+        Забирает HTML открытой страницы результатов (и сохраняет его в архив, если он задан)
+        :return: HTML страницы
+        """
+        html = driver.page_source
+        if self.archive is not None:
+            # Сохраняем страницу, чтобы потом разобрать ее заново без сети
+            self.archive.store(engine.name, query, company_name, html, driver.current_url)
+        return html
+
+
+class ParsePool:
+    """
+    Этап разбора в пуле процессов. Браузер только загружает страницы, а их HTML разбирается
+    в отдельных процессах, поэтому разбор не упирается в GIL и не задерживает загрузку
+    следующих страниц. Очередь разбора ограничена: если она заполнена, загрузка ждет.
+    """
+    def __init__(self, pipeline, workers=None, max_pending=None):
+        """
+        :param pipeline: SearchPipeline (его статистика селекторов, фильтры и ранжирование)
+        :param workers: Количество процессов (по умолчанию по числу ядер)
+        :param max_pending: Максимум страниц в очереди разбора (по умолчанию 2 * workers)
+        """
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.pipeline = pipeline
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+
+    def submit(self, engine, html, context, company_name=None):
+        """
+        Отправляет страницу на разбор
+        :param engine: SearchEngine
+        :param html: HTML страницы результатов
+        :param context: Данные, которые вернутся вместе с результатом (например, описание запроса)
+        :param company_name: Название компании (для SearchPipeline.select)
+        """
+        stats = self.pipeline.selector_stats
+        plan = selector_plan(engine, stats)
+        stop_links = stats.short_circuit_links if stats is not None else None
+        future = self.executor.submit(parse_serp, engine.name, html, plan, stop_links)
+        self.pending.append((future, engine, plan, context, company_name))
+
+    def full(self):
+        """Очередь разбора заполнена"""
+        return len(self.pending) >= self.max_pending
+
+    def __len__(self):
+        return len(self.pending)
+
+    def completed(self, block=False):
+        """
+        Забирает готовые результаты разбора. Фильтрация и ранжирование (быстрые этапы,
+        которые могут быть заданы любыми функциями) выполняются в основном процессе
+        :param block: Ждать, пока будет готов хотя бы один результат
+        :return: Список (context, website, candidates) в порядке готовности
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        if block and self.pending:
+            wait([item[0] for item in self.pending], return_when=FIRST_COMPLETED)
+
+        results = []
+        still_pending = deque()
+        for item in self.pending:
+            future, engine, plan, context, company_name = item
+            if not future.done():
+                still_pending.append(item)
+                continue
+            try:
+                found_links, counts = future.result()
+                record_selector_counts(engine, plan, counts, self.pipeline.selector_stats)
+                candidates = self.pipeline.select(engine, found_links, company_name)
+                results.append((context, self.pipeline.website_from(candidates), candidates))
+            except Exception as e:
+                print(f"Ошибка при разборе страницы {engine.title}: {e}")
+                results.append((context, None, []))
+        self.pending = still_pending
+        return results
+
+    def close(self):
+        """Останавливает процессы разбора, отменяя неначатые задания"""
+        for item in self.pending:
+            item[0].cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
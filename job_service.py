@@ -0,0 +1,501 @@
+"""
+Локальный сервис заданий поиска для нескольких пользователей веб-интерфейса.
+
+Сервис владеет фиксированным пулом рабочих потоков (у каждого свой браузер), поэтому
+сколько бы пользователей ни запускали поиск, на машине работает не больше браузеров,
+чем задано. Задания ставятся в очередь с равными долями: рабочие берут компании у
+пользователей по кругу, так что большое задание одного пользователя не задерживает
+остальных. Если одна и та же компания уже ищется для другого задания, повторный
+запрос не выполняется - результат получат все задания, которые его ждут. Повторные
+попытки и срок окончания задания планируются так же, как в scraper.iter_find_sites
+(RetryQueue и RunBudget), а паузы рабочего между запросами считаются для каждой поисковой
+системы отдельно (EngineSpacing).
+"""
+import time
+import uuid
+import threading
+from collections import deque, OrderedDict
+
+# Импорт с поддержкой запуска и как модуля, и как скрипта
+try:
+    from .scraper import CompanySiteFinder, result_record
+    from .utils.helpers import companies_from_table
+    from .utils.domain_guess import guess_domains
+    from .utils.delta import company_key
+    from .utils.aggregators import AggregatorStats
+    from .utils.scheduling import RetryQueue, RunBudget, EngineSpacing
+    from .engines import get_engine
+except ImportError:
+    from scraper import CompanySiteFinder, result_record
+    from utils.helpers import companies_from_table
+    from utils.domain_guess import guess_domains
+    from utils.delta import company_key
+    from utils.aggregators import AggregatorStats
+    from utils.scheduling import RetryQueue, RunBudget, EngineSpacing
+    from engines import get_engine
+
+class SearchJob:
+    """
+    Задание поиска одного пользователя. Результаты накапливаются по мере готовности и
+    читаются через iter_results (в том числе повторно, например после перезапуска скрипта Streamlit)
+    """
+    def __init__(self, user, companies, engine, max_retries=1, deadline=None, delay_seconds=3, company_budget=None):
+        """
+        :param deadline: Через сколько секунд задание должно закончиться (None - без срока)
+        :param company_budget: Бюджет времени на компанию в секундах (None - без ограничения)
+        """
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.companies = companies
+        self.engine = engine
+        self.max_retries = max(1, max_retries)
+        self.delay_seconds = delay_seconds
+        # Оценка времени до окончания, срок окончания и бюджет на компанию
+        self.budget = RunBudget(len(companies), deadline, company_budget)
+
+        # Компании, ожидающие рабочего: (company, attempt, latency_ms)
+        self.tasks = deque()
+        # Неудачные попытки откладываются с экспоненциальной задержкой, как в iter_find_sites
+        self.retries = RetryQueue(base_delay=max(10, 3 * delay_seconds))
+        # Время, уже потраченное на отложенные компании
+        self.latencies = {}
+        # Повторные попытки компаний, превысивших бюджет времени: после всех остальных
+        self.deferred = deque()
+        self.records = []
+        self.error = None
+        self.cancelled = False
+        # Когда результаты читали последний раз и сколько читателей ждут их сейчас -
+        # по этому видно брошенные задания
+        self.last_read = time.monotonic()
+        self.readers = 0
+        self._condition = threading.Condition()
+
+    @property
+    def total(self):
+        return len(self.companies)
+
+    @property
+    def done(self):
+        """Все компании задания получили результат (или задание отменено)"""
+        return self.cancelled or len(self.records) >= self.total
+
+    def progress(self):
+        return len(self.records) / self.total if self.total else 1.0
+
+    def expired(self):
+        return self.budget.expired()
+
+    def abandoned(self, timeout):
+        """Результаты не читают дольше timeout секунд (например, пользователь закрыл страницу)"""
+        return (timeout is not None and not self.done and not self.readers
+                and time.monotonic() - self.last_read > timeout)
+
+    def pending(self):
+        """Остались ли компании, ожидающие поиска (в том числе отложенные)"""
+        return bool(self.tasks or self.retries or self.deferred)
+
+    def describe(self):
+        """Оценка времени до окончания задания для статуса (см. RunBudget.describe)"""
+        return self.budget.describe()
+
+    def deliver(self, record):
+        """Добавляет запись о результате и будит читателей"""
+        with self._condition:
+            if not self.cancelled:
+                self.records.append(record)
+                self.budget.complete()
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Отменяет задание: компании, которые еще не начали искаться, больше не ищутся"""
+        with self._condition:
+            self.cancelled = True
+            self._condition.notify_all()
+
+    def iter_results(self, start=0, timeout=None):
+        """
+        Генератор записей о результатах по мере готовности
+        :param start: С какой записи начать (например, сколько уже показано)
+        :param timeout: Сколько ждать очередной записи; по истечении генератор завершается,
+            даже если задание еще выполняется (None - ждать до конца задания)
+        :return: Генератор записей в формате scraper.iter_find_sites
+        """
+        position = start
+        with self._condition:
+            self.readers += 1
+        try:
+            while True:
+                with self._condition:
+                    if position >= len(self.records) and not self.done:
+                        self._condition.wait(timeout)
+                    records = self.records[position:]
+                    finished = self.done
+                for record in records:
+                    yield record
+                position += len(records)
+                if (finished and position >= len(self.records)) or (not records and timeout is not None):
+                    return
+        finally:
+            with self._condition:
+                self.readers -= 1
+                self.last_read = time.monotonic()
+
+    def save(self, output_file):
+        """
+        Сохраняет результаты в CSV в формате CompanySiteFinder.save_results
+        :return: Путь к файлу или None при ошибке
+        """
+        import pandas as pd
+
+        try:
+            df = pd.DataFrame({
+                'Company Name': [record['company'] for record in self.records],
+                'Website': [record['website'] or "Не найден" for record in self.records],
+                'Checked At': [record['checked_at'] for record in self.records]
+            })
+            df.to_csv(output_file, index=False, encoding='utf-8-sig')
+            return output_file
+        except Exception as e:
+            print(f"Ошибка при сохранении результатов: {e}")
+            return None
+
+class SearchJobService:
+    """
+    Фиксированный пул рабочих поиска с очередью заданий, общей для всех пользователей
+    """
+    def __init__(self, workers=2, headless=True, proxy=None, delay_seconds=3, max_driver_restarts=2,
+                 idle_timeout=300, aggregators_file=None, abandon_timeout=None, **finder_params):
+        """
+        :param workers: Количество рабочих потоков (и браузеров)
+        :param headless: Запускать браузеры в фоновом режиме
+        :param proxy: Прокси-сервер (опционально)
+        :param delay_seconds: Пауза рабочего между запросами к одной поисковой системе в секундах
+            (по умолчанию для заданий)
+        :param max_driver_restarts: Сколько раз подряд перезапускать упавший браузер для одной компании
+        :param idle_timeout: Через сколько секунд без заданий рабочий закрывает свой браузер
+        :param aggregators_file: JSON-файл черного списка агрегаторов, общего для всех рабочих
+        :param abandon_timeout: Через сколько секунд без чтения результатов задание считается брошенным
+            и отменяется (None - не отменять)
+        :param finder_params: Дополнительные параметры CompanySiteFinder (rate_limits, recycle_every и т.д.)
+        """
+        self.workers = max(1, workers)
+        self.headless = headless
+        self.proxy = proxy
+        self.delay_seconds = delay_seconds
+        self.max_driver_restarts = max_driver_restarts
+        self.idle_timeout = idle_timeout
+        self.abandon_timeout = abandon_timeout
+        self.finder_params = finder_params
+        # Агрегаторы учатся на кандидатах всех заданий, поэтому статистика одна на всех рабочих
+        self.aggregators = AggregatorStats(aggregators_file)
+
+        # Очередь с равными долями: пользователь -> его задания в порядке постановки.
+        # Пользователи обслуживаются по кругу, по одной компании за раз
+        self._queues = OrderedDict()
+        # Компании, которые сейчас ищутся: (поисковая система, ключ компании) -> [(задание, название)].
+        # Первое задание в списке ищет компанию, остальные ждут его результата
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+
+        self._threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"search-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user, companies, search_engine="google", max_retries=1, domain_guess=False, deadline=None,
+               delay_seconds=None, company_budget=None):
+        """
+        Ставит задание в очередь
+        :param user: Идентификатор пользователя (например, сеанса Streamlit) для равных долей
+        :param companies: pandas.DataFrame или итерируемый набор названий компаний
+        :param search_engine: Поисковая система (имя из engines.ENGINES)
+        :param max_retries: Максимальное количество попыток для каждой компании
+        :param domain_guess: Сначала подбирать домен по названию (без рабочих и браузера)
+        :param deadline: Срок окончания в секундах: после него оставшиеся компании получают статус 'skipped'
+        :param delay_seconds: Пауза рабочего перед следующим запросом к той же поисковой системе
+            после запроса этого задания (по умолчанию - заданная для сервиса)
+        :param company_budget: Бюджет времени на компанию в секундах: повторные попытки компаний,
+            превысивших его, выполняются после всех остальных компаний задания
+        :return: SearchJob
+        """
+        job = SearchJob(user, companies_from_table(companies), get_engine(search_engine), max_retries,
+                        deadline or None, self.delay_seconds if delay_seconds is None else delay_seconds,
+                        company_budget or None)
+
+        if domain_guess and job.companies:
+            # Подбор доменов не занимает браузер, поэтому выполняется отдельно от рабочих
+            threading.Thread(target=self._guess_then_enqueue, args=(job,), daemon=True).start()
+        else:
+            self._enqueue(job, job.companies)
+        return job
+
+    def stats(self):
+        """
+        Состояние очереди для отображения в интерфейсе
+        :return: Словарь с ключами workers, users, queued, in_flight
+        """
+        with self._condition:
+            jobs = [job for user_jobs in self._queues.values() for job in user_jobs]
+            return {
+                "workers": self.workers,
+                "users": len(self._queues),
+                "queued": sum(len(job.tasks) + len(job.retries) + len(job.deferred) for job in jobs),
+                "in_flight": len(self._in_flight),
+            }
+
+    def close(self):
+        """Останавливает рабочих после текущих запросов (браузеры закрываются)"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._save_aggregators()
+
+    def _save_aggregators(self):
+        try:
+            self.aggregators.save()
+        except Exception as e:
+            print(f"Ошибка при сохранении статистики агрегаторов: {e}")
+
+    def _guess_then_enqueue(self, job):
+        try:
+            guessed = guess_domains(job.companies)
+        except Exception as e:
+            print(f"Ошибка при подборе доменов: {e}")
+            guessed = {}
+
+        remaining = []
+        for company in job.companies:
+            guess = guessed.get(company)
+            if guess and guess['website']:
+                job.deliver(result_record(company, guess['website'], 'domain_guess', guess['attempts'],
+                                          guess['latency_ms'], guess['candidates']))
+            else:
+                remaining.append(company)
+        self._enqueue(job, remaining)
+
+    def _enqueue(self, job, companies):
+        with self._condition:
+            job.tasks.extend((company, 1, 0.0) for company in companies)
+            self._schedule(job)
+
+    def _schedule(self, job):
+        """Возвращает задание в очередь своего пользователя и будит рабочих. Вызывается под self._condition"""
+        jobs = self._queues.setdefault(job.user, deque())
+        if job not in jobs:
+            jobs.append(job)
+        self._condition.notify_all()
+
+    def _given_up(self, job):
+        """
+        Задание больше не ждет результатов: отменено, брошено читателем или истек его срок.
+        Вызывается под self._condition
+        """
+        if not job.cancelled and job.abandoned(self.abandon_timeout):
+            print(f"Результаты задания {job.id} давно не читали - задание отменено")
+            job.cancel()
+        return job.cancelled or job.expired()
+
+    def _next_task(self):
+        """
+        Выбирает следующую компанию: пользователи по кругу, у пользователя - самое раннее задание,
+        в котором есть компания, готовая к поиску. Вызывается под self._condition
+        :return: (job, company, attempt, latency_ms) или None, если искать нечего
+        """
+        self._release_given_up()
+
+        for _ in range(len(self._queues)):
+            user, jobs = self._queues.popitem(last=False)
+
+            task = None
+            for job in list(jobs):
+                while task is None:
+                    company_task = self._pop_ready(job)
+                    if company_task is None:
+                        break
+                    company, attempt, latency_ms = company_task
+                    key = (job.engine.name, company_key(company))
+                    waiting = self._in_flight.get(key)
+                    if attempt == 1 and waiting and waiting[0][0] is not job:
+                        # Эту компанию уже ищут для другого задания - дождемся того же результата
+                        waiting.append((job, company))
+                        continue
+                    self._in_flight.setdefault(key, [(job, company)])
+                    task = (job, company, attempt, latency_ms)
+                if not job.pending():
+                    jobs.remove(job)
+                if task:
+                    break
+
+            if jobs:
+                # Пользователь уходит в конец круга
+                self._queues[user] = jobs
+            if task:
+                return task
+        return None
+
+    def _pop_ready(self, job):
+        """
+        Следующая компания задания, готовая к поиску: сначала наступившие повторные попытки,
+        затем новые компании, и только потом - отложенные из-за бюджета
+        :return: (company, attempt, latency_ms) или None
+        """
+        retry = job.retries.pop_ready()
+        if retry:
+            company, attempt = retry
+            return company, attempt, job.latencies.pop(company, 0.0)
+        if job.tasks:
+            return job.tasks.popleft()
+        if job.deferred and not job.retries:
+            return job.deferred.popleft()
+        return None
+
+    def _drain(self, job):
+        """Забирает все оставшиеся компании задания: [(company, attempt, latency_ms)]"""
+        remaining = list(job.tasks) + [(company, attempt, job.latencies.pop(company, 0.0))
+                                       for company, attempt in job.retries.drain()] + list(job.deferred)
+        job.tasks.clear()
+        job.deferred.clear()
+        return remaining
+
+    def _release_given_up(self):
+        """
+        Завершает без поиска компании заданий, которые отменены или у которых истек срок (после срока -
+        как пропущенные), в том числе компании, ждущие чужого поиска: их нет в очереди задания,
+        и _drain их не видит. Вызывается под self._condition
+        """
+        for jobs in list(self._queues.values()):
+            for job in list(jobs):
+                if self._given_up(job):
+                    status = None if job.cancelled else 'skipped'
+                    for company, attempt, latency_ms in self._drain(job):
+                        self._abandon(job, company, attempt, latency_ms, status=status)
+
+        for waiting in list(self._in_flight.values()):
+            for job, company in waiting[1:]:
+                if self._given_up(job):
+                    self._abandon(job, company, 1, 0.0, status=None if job.cancelled else 'skipped')
+
+    def _release(self, job, key):
+        """
+        Убирает задание из ожидающих компанию. Если оно само искало ее, поиск переходит к первому
+        из ожидающих заданий: его компания снова ставится в начало очереди. Вызывается под self._condition
+        """
+        waiting = self._in_flight.get(key)
+        if not waiting:
+            return
+        searching = waiting[0][0] is job
+        waiting[:] = [(waiting_job, name) for waiting_job, name in waiting if waiting_job is not job]
+        if not waiting:
+            del self._in_flight[key]
+        elif searching:
+            next_job, name = waiting[0]
+            next_job.tasks.appendleft((name, 1, 0.0))
+            self._schedule(next_job)
+
+    def _abandon(self, job, company, attempt, latency_ms, status=None):
+        """
+        Завершает компанию без поиска (задание отменено или истек его срок). Запись получает только
+        это задание: другие задания, ждущие ту же компанию, продолжают ее поиск.
+        Вызывается под self._condition
+        """
+        self._release(job, (job.engine.name, company_key(company)))
+        job.deliver(result_record(company, None, job.engine.name, attempt - 1, latency_ms, [], status=status))
+
+    def _finish(self, job, company, attempt, website, candidates, latency_ms):
+        """Повторяет попытку или раздает результат всем заданиям, которые ждут эту компанию"""
+        key = (job.engine.name, company_key(company))
+        with self._condition:
+            gave_up = self._given_up(job)
+            retry = website is None and attempt < job.max_retries and not gave_up
+            if retry and job.budget.behind():
+                # Задание не успевает к сроку - повторные попытки сокращаются
+                print(f"Задание отстает от срока: повторная попытка для '{company}' пропущена")
+                retry = False
+            if retry:
+                if job.budget.over_budget(latency_ms / 1000):
+                    # Компания съела свой бюджет времени - вернемся к ней в конце, если успеем
+                    job.deferred.append((company, attempt + 1, latency_ms))
+                else:
+                    # Не обращаемся к поисковой системе сразу: попытка откладывается с растущей задержкой
+                    job.latencies[company] = latency_ms
+                    job.retries.push(company, attempt + 1)
+                self._schedule(job)
+                return
+            if website is None and attempt < job.max_retries and gave_up:
+                # Задание сдалось, не исчерпав попыток: его промах получает только оно само,
+                # а другие ожидающие задания продолжают поиск
+                self._release(job, key)
+                waiting = [(job, company)]
+            else:
+                waiting = self._in_flight.pop(key, [(job, company)])
+
+        record = result_record(company, website, job.engine.name, attempt, latency_ms, candidates)
+        for waiting_job, name in waiting:
+            waiting_job.deliver(dict(record, company=name))
+            if waiting_job.done:
+                self._save_aggregators()
+
+    def _work(self):
+        """Цикл рабочего: свой браузер, компании из общей очереди"""
+        finder = CompanySiteFinder(headless=self.headless, proxy=self.proxy, aggregators=self.aggregators,
+                                   **self.finder_params)
+        idle_since = time.monotonic()
+        # Паузы между запросами считаются для каждой поисковой системы отдельно: после запроса
+        # в Яндекс рабочий может сразу взять компанию другого задания для Google
+        spacing = EngineSpacing(self.delay_seconds)
+        try:
+            while True:
+                with self._condition:
+                    task = None
+                    while not self._stopped:
+                        task = self._next_task()
+                        # Долго нет заданий - освобождаем память браузера
+                        if task or (finder.driver and time.monotonic() - idle_since > self.idle_timeout):
+                            break
+                        self._condition.wait(1.0)
+                    if self._stopped:
+                        return
+                if task is None:
+                    finder.close_driver()
+                    continue
+
+                job, company, attempt, latency_ms = task
+                website, candidates = None, []
+                spacing.wait(job.engine.name)
+                started_at = time.perf_counter()
+                try:
+                    if not finder.driver:
+                        finder.setup_driver()
+                    website, candidates = self._search(finder, job.engine, company)
+                except Exception as e:
+                    print(f"Ошибка рабочего при поиске '{company}': {e}")
+                    job.error = str(e)
+                    # Не удалось даже запустить браузер - повторять бессмысленно
+                    attempt = job.max_retries
+                    finder.close_driver()
+
+                spacing.used(job.engine.name, job.delay_seconds)
+                self._finish(job, company, attempt, website, candidates,
+                             latency_ms + (time.perf_counter() - started_at) * 1000)
+                idle_since = time.monotonic()
+        finally:
+            finder.close_driver()
+
+    def _search(self, finder, engine, company):
+        """Одна попытка поиска с перезапуском упавшего или отработавшего свое браузера"""
+        reason = finder.recycle_reason()
+        if reason:
+            finder.restart_driver(reason)
+
+        website = finder.search_website(company, engine)
+
+        restarts = 0
+        while website is None and finder.is_driver_failure(finder.last_error) and restarts < self.max_driver_restarts:
+            restarts += 1
+            finder.restart_driver(f"ошибка браузера: {finder.last_error}")
+            website = finder.search_website(company, engine)
+        return website, finder.last_candidates
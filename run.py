@@ -5,6 +5,17 @@
 import os
 import sys
 import subprocess
+import importlib.util
+
+# Модули, без которых приложение не запустится (имя модуля, а не пакета в pip)
+REQUIRED_MODULES = ["streamlit", "selenium", "webdriver_manager", "pandas", "bs4", "lxml"]
+
+def missing_dependencies():
+    """
+    Проверяет наличие зависимостей без их импорта
+    :return: Список отсутствующих модулей
+    """
+    return [name for name in REQUIRED_MODULES if importlib.util.find_spec(name) is None]
 
 def main():
     """
@@ -13,16 +24,13 @@ def main():
     # Определяем путь к текущей директории
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Проверяем наличие установленных зависимостей
-    try:
-        import streamlit
-        import selenium
-        import pandas
-        import beautifulsoup4
-    except ImportError:
-        print("Установка необходимых зависимостей...")
+    # Проверяем наличие установленных зависимостей (без установки через pip)
+    missing = missing_dependencies()
+    if missing:
         requirements_path = os.path.join(current_dir, "requirements.txt")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", requirements_path])
+        print(f"Не установлены зависимости: {', '.join(missing)}")
+        print(f"Установите их командой: {sys.executable} -m pip install -r {requirements_path}")
+        sys.exit(1)
     
     # Запускаем приложение
     app_path = os.path.join(current_dir, "app.py")
@@ -30,4 +38,4 @@ def main():
     subprocess.check_call([sys.executable, "-m", "streamlit", "run", app_path])
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,57 +1,146 @@
 import os
-import csv
-import time
-import pandas as pd
 import sys
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import requests
-import streamlit as st
-from urllib.parse import quote, urlparse
+import time
 import random
+from collections import deque
+from datetime import datetime
+from contextlib import nullcontext
+
+# Тяжелые зависимости (selenium, webdriver_manager, BeautifulSoup, pandas, streamlit)
+# импортируются внутри функций, которым они нужны, чтобы импорт модуля и запуск
+# CLI не тратили время на их загрузку
 
 # Импорт с поддержкой запуска и как модуля, и как скрипта
 try:
     # При запуске как часть пакета
-    from .utils.helpers import is_valid_website, clean_url, random_delay, format_search_query
+    from .utils.helpers import clean_url, process_tree_rss_mb, companies_from_table
+    from .utils.columnar import ColumnarResultWriter, COLUMNAR_FORMATS
+    from .utils.domain_guess import guess_domains
+    from .utils.scheduling import RetryQueue, RunBudget, EngineSpacing, parse_duration
+    from .utils.profiling import RunProfiler, PROFILE_MODES
+    from .utils.ratelimit import SharedRateLimiter, parse_rate_limits, resolve_rate
+    from .utils.serp_archive import SerpArchive
+    from .utils.selector_stats import SelectorStats
+    from .utils.aggregators import AggregatorStats
+    from .utils.pacing import AimdPacing
+    from .utils.netstats import NetworkStats, enable_performance_log, enable_performance_metrics, page_load_metrics, merge_metrics
+    from .utils.tabs import TabPool
+    from .utils.delta import load_previous_results, plan_delta
+    from .engines import ENGINES, EXTRACTION_MODES, SearchPipeline, ParsePool, CaptchaDetected, get_engine
 except ImportError:
     # При запуске как скрипт
-    from utils.helpers import is_valid_website, clean_url, random_delay, format_search_query
+    from utils.helpers import clean_url, process_tree_rss_mb, companies_from_table
+    from utils.columnar import ColumnarResultWriter, COLUMNAR_FORMATS
+    from utils.domain_guess import guess_domains
+    from utils.scheduling import RetryQueue, RunBudget, EngineSpacing, parse_duration
+    from utils.profiling import RunProfiler, PROFILE_MODES
+    from utils.ratelimit import SharedRateLimiter, parse_rate_limits, resolve_rate
+    from utils.serp_archive import SerpArchive
+    from utils.selector_stats import SelectorStats
+    from utils.aggregators import AggregatorStats
+    from utils.pacing import AimdPacing
+    from utils.netstats import NetworkStats, enable_performance_log, enable_performance_metrics, page_load_metrics, merge_metrics
+    from utils.tabs import TabPool
+    from utils.delta import load_previous_results, plan_delta
+    from engines import ENGINES, EXTRACTION_MODES, SearchPipeline, ParsePool, CaptchaDetected, get_engine
 
 class CompanySiteFinder:
-    def __init__(self, input_file=None, output_file=None, search_engine="google", headless=True, proxy=None):
+    def __init__(self, input_file=None, output_file=None, search_engine="google", headless=True, proxy=None,
+                 recycle_every=None, max_browser_memory_mb=None, memory_check_every=10, extraction_mode="html",
+                 rate_limits=None, archive_dir=None, selector_stats_file=None, browser_profile=None, cookie_jar=None,
+                 page_load_strategy="eager", implicit_wait=0, aggregators_file=None, aggregators=None,
+                 network_metrics=False):
         """
         Инициализация класса для поиска сайтов компаний
         :param input_file: Путь к входному CSV-файлу
         :param output_file: Путь к выходному CSV-файлу
-        :param search_engine: Поисковая система ('google' или 'yandex')
+        :param search_engine: Поисковая система (имя из engines.ENGINES: 'google', 'yandex', 'duckduckgo')
         :param headless: Запускать браузер в фоновом режиме
         :param proxy: Прокси-сервер (опционально)
+        :param recycle_every: Перезапускать браузер каждые N запросов (None - не перезапускать)
+        :param max_browser_memory_mb: Перезапускать браузер, если Chrome занимает больше N МБ памяти
+        :param memory_check_every: Как часто (раз в сколько запросов) проверять память браузера
+        :param extraction_mode: Способ извлечения ссылок: 'html' (разбор page_source) или 'browser'
+            (селекторы выполняются внутри страницы, передаются только ссылки)
+        :param rate_limits: Общие для всех процессов ограничения частоты запросов в минуту:
+            {'yandex': 20, 'yandex@ip:port': 30} (ключ с прокси имеет приоритет)
+        :param archive_dir: Каталог архива, в который сохраняются все загруженные страницы результатов
+        :param selector_stats_file: JSON-файл статистики селекторов, сохраняемой между запусками
+            (None - статистика ведется только в памяти на время запуска)
+        :param browser_profile: Каталог постоянного профиля Chrome (cookies, согласия и кэш сохраняются
+            между запусками; один профиль не может использоваться двумя браузерами одновременно)
+        :param cookie_jar: JSON-файл, в который сохраняются cookies браузера при закрытии и из которого
+            они загружаются при запуске, чтобы согласие с cookies принималось один раз
+        :param page_load_strategy: Стратегия загрузки страниц Chrome: 'eager' (по умолчанию) - driver.get
+            возвращается после построения DOM, не дожидаясь картинок и рекламы, 'none' - сразу,
+            'normal' - после полной загрузки страницы. Готовность результатов проверяется явным ожиданием
+        :param implicit_wait: Неявное ожидание элементов в секундах. По умолчанию 0: каждый поиск
+            необязательного элемента (например, кнопки cookies) иначе ждал бы его отсутствия полный срок
+        :param aggregators_file: JSON-файл выученного черного списка агрегаторов (справочников организаций),
+            сохраняемого между запусками (None - только известные агрегаторы и обучение в памяти)
+        :param aggregators: Готовый AggregatorStats, например общий для нескольких экземпляров
+            (тогда aggregators_file не используется)
+        :param network_metrics: Собирать сетевые метрики загрузки страниц по событиям Chrome DevTools.
+            По умолчанию выключено: журнал событий сети передается через WebDriver после каждого запроса
         """
         self.input_file = input_file
         self.output_file = output_file
         self.search_engine = search_engine.lower()
+        # Проверяет, что поисковая система зарегистрирована
+        self.engine = get_engine(self.search_engine)
+        self.selector_stats = SelectorStats(selector_stats_file)
+        self.aggregators = aggregators or AggregatorStats(aggregators_file)
+        self.pipeline = SearchPipeline(extraction_mode, SerpArchive(archive_dir) if archive_dir else None,
+                                       self.selector_stats, self.aggregators)
         self.headless = headless
         self.proxy = proxy
         self.driver = None
         self.results = {}
+        # Время проверки каждой компании (для повторных запусков по разнице)
+        self.checked_at = {}
+        # Кандидаты, найденные при последнем поиске (для записи истории поиска)
+        self.last_candidates = []
+        # Ошибка последнего поиска (None, если поиск прошел без исключений)
+        self.last_error = None
+        # Сетевые метрики последней загрузки страницы результатов и сводка за запуск
+        self.last_network = None
+        self.network_stats = NetworkStats()
+        self.track_network = network_metrics
+        # Сбрасывается, если журнал производительности недоступен (до перезапуска браузера)
+        self.network_enabled = network_metrics
+        
+        # Политика перезапуска браузера
+        self.recycle_every = recycle_every
+        self.max_browser_memory_mb = max_browser_memory_mb
+        self.memory_check_every = max(1, memory_check_every)
+        self.queries_since_restart = 0
+        self.driver_restarts = 0
+        
+        # Сохранение состояния браузера между запусками
+        self.browser_profile = browser_profile
+        self.cookie_jar = cookie_jar
         
-        if self.search_engine not in ["google", "yandex"]:
-            raise ValueError("Поддерживаемые поисковые системы: 'google' или 'yandex'")
+        # Ожидание загрузки страниц и элементов
+        self.page_load_strategy = page_load_strategy
+        self.implicit_wait = implicit_wait
+        
+        # Ограничители частоты запросов по поисковым системам
+        self.rate_limits = rate_limits or {}
+        self.rate_limiters = {}
+        # Адаптивный темп запросов (AimdPacing), если он включен для запуска
+        self.pacing = None
     
     def setup_driver(self):
         """Настройка драйвера Selenium"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from webdriver_manager.chrome import ChromeDriverManager
+        
         try:
             # Настраиваем опции Chrome
             chrome_options = Options()
+            chrome_options.page_load_strategy = self.page_load_strategy
             if self.headless:
                 chrome_options.add_argument("--headless=new")
             
@@ -84,6 +173,15 @@ class CompanySiteFinder:
             if self.proxy:
                 chrome_options.add_argument(f'--proxy-server={self.proxy}')
             
+            # Постоянный профиль: cookies и принятые согласия сохраняются между запусками
+            if self.browser_profile:
+                os.makedirs(self.browser_profile, exist_ok=True)
+                chrome_options.add_argument(f"--user-data-dir={os.path.abspath(self.browser_profile)}")
+            
+            # События сети (Network.*) для метрик загрузки страниц - только если они включены
+            if self.track_network:
+                enable_performance_log(chrome_options)
+            
             # Инициализируем драйвер
             service = Service(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -112,8 +210,15 @@ class CompanySiteFinder:
                 """
             })
             
-            # Устанавливаем таймаут по умолчанию для ожидания элементов
-            self.driver.implicitly_wait(10)
+            # Время готовности DOM для сетевых метрик (Performance.getMetrics)
+            if self.track_network:
+                enable_performance_metrics(self.driver)
+            self.network_enabled = self.track_network
+            
+            # Неявное ожидание элементов (по умолчанию отключено - все ожидания явные и ограниченные)
+            self.driver.implicitly_wait(self.implicit_wait)
+            
+            self.load_cookies()
             
             return self.driver
         
@@ -124,418 +229,276 @@ class CompanySiteFinder:
                 self.driver.quit()
             raise
     
-    def load_companies(self):
-        """Загрузка списка компаний из CSV-файла"""
+    def load_companies(self, source=None):
+        """
+        Загрузка списка компаний
+        :param source: pandas.DataFrame или итерируемый набор названий. Если не указан,
+            компании читаются из входного CSV-файла
+        :return: Список уникальных названий в исходном порядке
+        """
         try:
-            df = pd.read_csv(self.input_file)
-            
-            # Проверка наличия столбца с названиями компаний
-            if 'Company Name' in df.columns:
-                company_column = 'Company Name'
-            elif 'CompanyName' in df.columns:
-                company_column = 'CompanyName'
-            elif 'company_name' in df.columns:
-                company_column = 'company_name'
-            elif 'Название' in df.columns:
-                company_column = 'Название'
-            elif 'название' in df.columns:
-                company_column = 'название'
-            elif 'Компания' in df.columns:
-                company_column = 'Компания'
-            elif 'компания' in df.columns:
-                company_column = 'компания'
-            else:
-                # Если нет подходящего столбца, берем первый столбец
-                company_column = df.columns[0]
-            
-            # Получаем список компаний
-            companies = df[company_column].tolist()
+            if source is None:
+                import pandas as pd
+                source = pd.read_csv(self.input_file)
             
-            # Удаляем дубликаты и пустые значения
-            companies = [str(company).strip() for company in companies if company and not pd.isna(company)]
-            companies = list(set(companies))
-            
-            return companies
+            # Общие для CLI и веб-интерфейса правила выбора столбца, очистки и удаления дубликатов
+            return companies_from_table(source)
         except Exception as e:
             print(f"Ошибка при загрузке файла: {e}")
             return []
     
-    def search_google(self, company_name):
-        """Поиск сайта компании через Google"""
+    def search_with_engine(self, engine, company_name):
+        """
+        Поиск сайта компании через общий конвейер поиска
+        :param engine: Поисковая система (SearchEngine)
+        :param company_name: Название компании
+        :return: Найденный сайт или None
+        """
         try:
-            # Формируем поисковый запрос
-            query = format_search_query(company_name) + " официальный сайт"
-            
-            # Открываем Google
-            self.driver.get("https://www.google.com/")
-            
-            # Принимаем все cookies, если есть такое окно
-            try:
-                WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Принимаю')]"))
-                ).click()
-                random_delay(1, 2)
-            except:
-                pass
-            
-            # Ищем поле ввода и вводим запрос
-            search_box = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "q"))
-            )
-            search_box.clear()
-            search_box.send_keys(query)
-            search_box.send_keys(Keys.RETURN)
-            
-            # Ждем загрузки результатов
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "search"))
-            )
-            
-            # Получаем HTML-код страницы с результатами
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'lxml')
-            
-            # Извлекаем все ссылки из результатов поиска с разными селекторами для современной версии Google
-            found_links = []
-            
-            # Пробуем различные селекторы для разных версий Google
-            selectors = [
-                'div.g div.yuRUbf a',                # Старый формат
-                'div.g h3.LC20lb + div a',           # Альтернативный формат
-                'div.tF2Cxc a',                      # Новый формат 2023
-                'div.yuRUbf > a',                    # Еще один формат
-                '.g .DhN8Cf a',                      # Обновленный Google 2024
-                '.g .kvH3mc a',                      # Дополнительный селектор 2024
-                'h3.LC20lb'                          # Поиск по заголовкам
-            ]
-            
-            for selector in selectors:
-                try:
-                    elements = soup.select(selector)
-                    if elements:
-                        for element in elements:
-                            # Извлекаем URL из атрибута href
-                            href = None
-                            if element.name == 'a':
-                                href = element.get('href')
-                            elif element.parent and element.parent.name == 'a':
-                                href = element.parent.get('href')
-                            elif element.find_parent('a'):
-                                href = element.find_parent('a').get('href')
-                                
-                            if href and is_valid_website(href):
-                                found_links.append(href)
-                except Exception as e:
-                    print(f"Ошибка при парсинге селектора {selector}: {e}")
+            self.acquire_rate_limit(engine)
+            self.discard_network_events()
             
-            # Если ничего не нашли с помощью селекторов, берем все ссылки на странице
-            if not found_links:
-                all_links = soup.select('a[href^="http"]')
-                
-                for link in all_links:
-                    href = link.get('href')
-                    if href and is_valid_website(href):
-                        found_links.append(href)
-            
-            # Фильтруем ссылки, исключая поисковые системы, соцсети и другие нерелевантные домены
-            filtered_links = []
-            for link in found_links:
-                # Очищаем ссылку от UTM-меток и других параметров
-                clean_link = clean_url(link)
-                
-                # Проверяем, не принадлежит ли ссылка к известным нерелевантным доменам
-                non_relevant_domains = [
-                    'google.com', 'yandex.ru', 'youtube.com', 'facebook.com', 'vk.com',
-                    'instagram.com', 'twitter.com', 'linkedin.com', 'pinterest.com',
-                    'wikipedia.org', 'wildberries.ru', 'ozon.ru', 'avito.ru', 'amazon.com',
-                    'aliexpress.com', 'youla.ru', 'dzen.ru', 'rbc.ru', 'ria.ru',
-                    'tass.ru', 'kommersant.ru', 'interfax.ru', 'lenta.ru'
-                ]
-                
-                is_relevant = True
-                for domain in non_relevant_domains:
-                    if domain in clean_link.lower():
-                        is_relevant = False
-                        break
-                
-                if is_relevant:
-                    filtered_links.append(clean_link)
-            
-            # Если нашли релевантные ссылки, возвращаем первую
-            if filtered_links:
-                return filtered_links[0]
-            
-            return None
+            website, candidates = self.pipeline.run(self.driver, engine, company_name)
+            # Запоминаем всех кандидатов для истории поиска
+            self.last_candidates = candidates
+            return website
         except Exception as e:
-            print(f"Ошибка при поиске в Google для компании '{company_name}': {e}")
+            print(f"Ошибка при поиске в {engine.title} для компании '{company_name}': {e}")
+            self.last_error = e
             return None
+        finally:
+            self.last_network = self.collect_network_metrics()
     
-    def search_yandex(self, company_name):
-        """Поиск сайта компании через Yandex с улучшенной механикой"""
+    def fetch_page(self, company_name, engine=None):
+        """
+        Только этап загрузки: открывает страницу результатов и возвращает ее HTML для разбора
+        в другом процессе (см. engines.ParsePool)
+        :param company_name: Название компании
+        :param engine: Поисковая система для этого запроса (по умолчанию выбранная при создании)
+        :return: (query, html) или None при ошибке (ошибка сохраняется в last_error)
+        """
+        engine = engine or self.engine
+        self.last_candidates = []
+        self.last_error = None
+        self.last_network = None
+        self.queries_since_restart += 1
+        
         try:
-            # Формируем поисковый запрос
-            query = format_search_query(company_name)
-            encoded_query = quote(query)
-            
-            # Используем прямую ссылку на поиск Яндекса с запросом
-            search_url = f"https://yandex.ru/search/?text={encoded_query}"
-            print(f"Открываем URL: {search_url}")
+            self.acquire_rate_limit(engine)
+            self.discard_network_events()
             
-            # Открываем страницу поиска
-            self.driver.get(search_url)
-            
-            # Пауза для имитации человеческого поведения
-            random_delay(2, 4)
-            
-            # Принимаем все cookies, если есть такое окно
-            try:
-                cookies_buttons = self.driver.find_elements(By.XPATH, 
-                    "//button[contains(., 'Принять') or contains(., 'Accept') or contains(., 'Да') or contains(., 'Yes')]")
-                if cookies_buttons:
-                    cookies_buttons[0].click()
-                    random_delay(1, 2)
-            except Exception as e:
-                print(f"Не удалось обработать окно cookies: {e}")
-                pass
-            
-            # Ждем загрузки результатов поиска с увеличенным таймаутом
-            try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".serp-item, .OrganicTitle-Link, .organic, .serp-list"))
-                )
-                
-                # Добавляем дополнительную паузу для полной загрузки страницы
-                random_delay(2, 3)
-                
-                # Сделаем скролл вниз для загрузки всех результатов
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-                random_delay(1, 2)
-                
-            except Exception as e:
-                print(f"Ошибка при ожидании загрузки результатов Яндекса: {e}")
-                
-                # Попробуем продолжить даже если не дождались элементов
-                random_delay(5, 7)
-            
-            # Получаем HTML-код страницы с результатами
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'lxml')
-            
-            # Список для хранения найденных ссылок
-            found_links = []
-            
-            # Пробуем различные селекторы для извлечения ссылок из результатов поиска
-            selectors = [
-                # Новые селекторы для Яндекса (2024)
-                'div.serp-item a.link[href^="http"]',
-                'div.organic a.link[href^="http"]',
-                'h2 a.OrganicTitle-Link',
-                'div.Path a.link:not(.link_theme_outer)',
-                '.Title a.link[href^="http"]',
-                '.OrganicSearchSnippet a.OrganicSearchSnippet-LinkUrl',
-                '.OrganicSnippet-LinkUrls a',
-                '.organic a.link_outer, .organic a.OrganicTitle-Link',
-                # Селекторы для разных версий Яндекса
-                'a.OrganicTitle-Link, .OrganicSearchSnippet a',
-                'a[href^="http"].link',
-                '.organic__url',
-                '.serp-url__link',
-                '.typo_text_m a.link',
-                # Осторожные селекторы для проверки наличия URL в тексте ссылки
-                'a[href^="http"]:not([href*="yandex"]):not([href*="ya.ru"])'
-            ]
-            
-            # Пробуем каждый селектор
-            for selector in selectors:
-                try:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        href = element.get('href')
-                        # Проверяем, что ссылка валидна и выглядит как сайт компании
-                        if href and is_valid_website(href):
-                            found_links.append(href)
-                except Exception as e:
-                    print(f"Ошибка при парсинге селектора {selector}: {e}")
-            
-            # Если ничего не нашли с помощью селекторов, берем все ссылки
-            if not found_links:
-                print("Не нашли ссылки по селекторам, пробуем найти все ссылки на странице")
-                all_links = soup.find_all('a', href=True)
-                
-                for link in all_links:
-                    href = link.get('href')
-                    # Проверка на http в начале ссылки и не из блэклиста
-                    if href and href.startswith('http') and is_valid_website(href):
-                        found_links.append(href)
-            
-            # Удаляем дубликаты
-            found_links = list(dict.fromkeys(found_links))
-            
-            print(f"Найдено ссылок (до фильтрации): {len(found_links)}")
-            
-            # Фильтруем ссылки
-            filtered_links = []
-            blacklist_domains = [
-                'yandex.ru', 'ya.ru', 'yandex.com', 'google.com', 'google.ru',
-                'youtube.com', 'facebook.com', 'vk.com', 'instagram.com',
-                'twitter.com', 'linkedin.com', 'pinterest.com', 'ok.ru',
-                'wikipedia.org', 'fandom.com', 'wildberries.ru', 'ozon.ru',
-                'avito.ru', 'youla.ru', 'dzen.ru', 'mail.ru', 'gosuslugi.ru',
-                'rbc.ru', 'ria.ru', 'tass.ru', 'kommersant.ru', 'interfax.ru',
-                'lenta.ru', 'gazeta.ru', 'vedomosti.ru', 'forbes.ru', 'kinopoisk.ru'
-            ]
-            
-            for link in found_links:
-                clean_link = clean_url(link)
-                parsed_url = urlparse(link)
-                domain = parsed_url.netloc.lower()
-                
-                # Проверяем, что домен не в черном списке
-                if not any(bd in domain for bd in blacklist_domains):
-                    filtered_links.append(clean_link)
-            
-            print(f"Найдено ссылок (после фильтрации): {len(filtered_links)}")
-            
-            # Если нашли релевантные ссылки, возвращаем первую
-            if filtered_links:
-                # Добавляем протокол, если его нет
-                result = filtered_links[0]
-                if not result.startswith('http'):
-                    result = 'https://' + result
-                return result
-            
-            return None
+            query = engine.build_query(company_name)
+            self.pipeline.fetch(self.driver, engine, query)
+            return query, self.pipeline.page_source(self.driver, engine, company_name, query)
         except Exception as e:
-            print(f"Ошибка при поиске в Яндексе для компании '{company_name}': {e}")
+            print(f"Ошибка при загрузке страницы {engine.title} для компании '{company_name}': {e}")
+            self.last_error = e
+            return None
+        finally:
+            self.last_network = self.collect_network_metrics()
+    
+    def collect_network_metrics(self, dom_ready=True, loads=1):
+        """
+        Сетевые метрики загрузки по событиям браузера с прошлого вызова (учитываются и в сводке за запуск)
+        :param dom_ready: Запрашивать время готовности DOM активной вкладки
+        :param loads: Сколько загрузок страниц покрывают события (в режиме вкладок - несколько)
+        :return: Словарь из netstats.page_load_metrics или None, если метрики недоступны
+        """
+        if not self.driver or not self.network_enabled:
+            return None
+        
+        metrics = page_load_metrics(self.driver, dom_ready)
+        if metrics is None:
+            # Журнал производительности недоступен - не пытаемся до перезапуска браузера
+            self.network_enabled = False
             return None
+        self.network_stats.add(metrics, self.proxy, loads)
+        return metrics
+    
+    def discard_network_events(self):
+        """Отбрасывает события сети между загрузками (фоновые запросы прошлой страницы, окно cookies)"""
+        if self.driver and self.network_enabled:
+            try:
+                self.driver.get_log("performance")
+            except Exception:
+                self.network_enabled = False
+    
+    def acquire_rate_limit(self, engine):
+        """Ждет разрешения общего ограничителя частоты запросов к поисковой системе (если он задан)"""
+        limiter = self.rate_limiter(engine)
+        if limiter:
+            waited = limiter.acquire()
+            if waited >= 1:
+                print(f"Ожидание {waited:.1f} сек из-за ограничения частоты запросов к {engine.title}")
+    
+    def rate_limiter(self, engine):
+        """
+        Возвращает общий для всех процессов ограничитель частоты запросов к поисковой системе
+        :param engine: Поисковая система (SearchEngine)
+        :return: SharedRateLimiter или None, если ограничение не задано
+        """
+        if engine.name not in self.rate_limiters:
+            rate = resolve_rate(self.rate_limits, engine.name, self.proxy)
+            self.rate_limiters[engine.name] = SharedRateLimiter(engine.name, rate, self.proxy) if rate else None
+        return self.rate_limiters[engine.name]
+    
+    def search_google(self, company_name):
+        """Поиск сайта компании через Google"""
+        return self.search_with_engine(get_engine("google"), company_name)
+    
+    def search_yandex(self, company_name):
+        """Поиск сайта компании через Yandex"""
+        return self.search_with_engine(get_engine("yandex"), company_name)
     
     def search_duckduckgo(self, company_name):
         """Поиск сайта компании через DuckDuckGo"""
+        return self.search_with_engine(get_engine("duckduckgo"), company_name)
+    
+    def search_website(self, company_name, engine=None):
+        """
+        Поиск сайта компании в зависимости от выбранной поисковой системы
+        :param company_name: Название компании
+        :param engine: Поисковая система для этого запроса (по умолчанию выбранная при создании)
+        :return: Найденный сайт или None
+        """
+        self.last_candidates = []
+        self.last_error = None
+        self.last_network = None
+        self.queries_since_restart += 1
+        
+        return self.search_with_engine(engine or self.engine, company_name)
+    
+    def browser_memory_mb(self):
+        """
+        Возвращает память, занятую браузером (chromedriver и все процессы Chrome)
+        :return: Объем в мегабайтах или None
+        """
         try:
-            # Формируем поисковый запрос
-            query = format_search_query(company_name)
-            encoded_query = quote(query)
-            
-            # Используем прямой URL для поиска
-            search_url = f"https://duckduckgo.com/?q={encoded_query}&t=h_&ia=web"
-            print(f"Открываем URL DuckDuckGo: {search_url}")
-            
-            # Открываем страницу поиска
-            self.driver.get(search_url)
-            
-            # Пауза для загрузки страницы
-            random_delay(3, 5)
-            
-            # Принимаем cookies если необходимо
+            pid = self.driver.service.process.pid
+        except AttributeError:
+            return None
+        return process_tree_rss_mb(pid)
+    
+    def is_driver_failure(self, error):
+        """
+        Проверяет, означает ли ошибка, что браузер упал или сессия потеряна
+        :param error: Исключение последнего поиска
+        :return: True, если драйвер нужно перезапустить
+        """
+        from selenium.common.exceptions import (
+            WebDriverException, TimeoutException, NoSuchElementException,
+            StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException
+        )
+        
+        if not isinstance(error, WebDriverException):
+            return False
+        
+        # Таймауты и ошибки поиска элементов - это проблемы страницы, а не браузера
+        return not isinstance(error, (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                                      ElementNotInteractableException, ElementClickInterceptedException))
+    
+    def recycle_reason(self):
+        """
+        Проверяет политику перезапуска браузера перед очередным запросом
+        :return: Причина перезапуска или None, если перезапуск не нужен
+        """
+        if not self.driver:
+            return None
+        
+        if self.recycle_every and self.queries_since_restart >= self.recycle_every:
+            return f"выполнено {self.queries_since_restart} запросов"
+        
+        if (self.max_browser_memory_mb and self.queries_since_restart
+                and self.queries_since_restart % self.memory_check_every == 0):
+            memory_mb = self.browser_memory_mb()
+            if memory_mb is not None and memory_mb > self.max_browser_memory_mb:
+                return f"браузер занимает {memory_mb:.0f} МБ памяти"
+        
+        return None
+    
+    def restart_driver(self, reason=None):
+        """
+        Перезапускает браузер, по возможности сохраняя cookies
+        :param reason: Причина перезапуска (для лога)
+        :return: Новый драйвер
+        """
+        print(f"Перезапуск браузера{': ' + reason if reason else ''}")
+        
+        # Сохраняем cookies всех доменов через CDP, чтобы не проходить согласия заново
+        cookies = []
+        if self.driver:
             try:
-                cookies_buttons = self.driver.find_elements(By.XPATH, 
-                    "//button[contains(text(), 'Accept') or contains(text(), 'Принять') or contains(text(), 'I Agree')]")
-                if cookies_buttons:
-                    cookies_buttons[0].click()
-                    random_delay(1, 2)
-            except Exception as e:
-                print(f"Не удалось обработать окно cookies на DuckDuckGo: {e}")
+                cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            except Exception:
+                # Если браузер упал, cookies уже не получить
+                cookies = []
             
-            # Ждем загрузки результатов
             try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".result, .result__a, .result__url"))
-                )
-                
-                # Дополнительная пауза и скролл страницы
-                random_delay(2, 4)
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 3);")
-                random_delay(1, 2)
-                
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+        
+        self.setup_driver()
+        self.queries_since_restart = 0
+        self.driver_restarts += 1
+        
+        if cookies:
+            try:
+                self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
             except Exception as e:
-                print(f"Ошибка при ожидании загрузки результатов DuckDuckGo: {e}")
-                random_delay(5, 7)
-            
-            # Получаем HTML страницы
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'lxml')
-            
-            # Ищем ссылки с разными селекторами
-            found_links = []
-            
-            selectors = [
-                '.result__a',                        # Основной селектор для ссылок
-                '.result__url',                      # URL в результатах
-                '.result__snippet a',                # Ссылки в сниппете
-                '.result__title a',                  # Заголовки результатов
-                '.result_content a',                 # Контент результатов
-                'a[href^="http"]:not([href*="duckduckgo.com"])',  # Все внешние ссылки
-                'a[data-testid="result-title-a"]',    # Новый формат 2024
-                '.react-results a.eVNpHGjtxRBq_gLOfGDr'  # Еще один формат 2024
-            ]
-            
-            for selector in selectors:
-                try:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        href = element.get('href')
-                        if href and is_valid_website(href):
-                            found_links.append(href)
-                except Exception as e:
-                    print(f"Ошибка при парсинге селектора {selector} на DuckDuckGo: {e}")
-            
-            # Если ничего не нашли, берем все ссылки
-            if not found_links:
-                print("Не нашли ссылки по селекторам, пробуем найти все ссылки на странице DuckDuckGo")
-                all_links = soup.find_all('a', href=True)
-                
-                for link in all_links:
-                    href = link.get('href')
-                    if href and href.startswith('http') and is_valid_website(href):
-                        found_links.append(href)
-            
-            # Удаляем дубликаты
-            found_links = list(dict.fromkeys(found_links))
-            
-            print(f"Найдено ссылок на DuckDuckGo (до фильтрации): {len(found_links)}")
-            
-            # Фильтруем ссылки
-            filtered_links = []
-            blacklist_domains = [
-                'duckduckgo.com', 'google.com', 'yandex.ru', 'ya.ru', 'bing.com',
-                'youtube.com', 'facebook.com', 'vk.com', 'instagram.com',
-                'twitter.com', 'linkedin.com', 'pinterest.com', 'ok.ru',
-                'wikipedia.org', 'fandom.com', 'wildberries.ru', 'ozon.ru',
-                'avito.ru', 'youla.ru', 'dzen.ru', 'mail.ru', 'gosuslugi.ru',
-                'amazon.com', 'ebay.com', 'aliexpress.com'
-            ]
-            
-            for link in found_links:
-                clean_link = clean_url(link)
-                parsed_url = urlparse(link)
-                domain = parsed_url.netloc.lower()
-                
-                # Проверяем, что домен не в черном списке
-                if not any(bd in domain for bd in blacklist_domains):
-                    filtered_links.append(clean_link)
-            
-            print(f"Найдено ссылок на DuckDuckGo (после фильтрации): {len(filtered_links)}")
-            
-            # Возвращаем первую валидную ссылку
-            if filtered_links:
-                result = filtered_links[0]
-                if not result.startswith('http'):
-                    result = 'https://' + result
-                return result
-            
-            return None
+                print(f"Не удалось восстановить cookies после перезапуска: {e}")
+                cookies = []
+        
+        # Без cookies согласие могло потеряться - проверим окно cookies заново
+        if not cookies and not self.browser_profile and not self.cookie_jar:
+            self.pipeline.consent_checked.clear()
+        
+        return self.driver
+    
+    def load_cookies(self):
+        """Загружает сохраненные cookies в браузер (если задан cookie_jar)"""
+        import json
+        
+        if not self.cookie_jar or not os.path.exists(self.cookie_jar):
+            return
+        
+        try:
+            with open(self.cookie_jar, encoding='utf-8') as f:
+                cookies = json.load(f)
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            print(f"Загружено cookies: {len(cookies)}")
         except Exception as e:
-            print(f"Ошибка при поиске в DuckDuckGo для компании '{company_name}': {e}")
-            return None
+            print(f"Не удалось загрузить cookies из {self.cookie_jar}: {e}")
     
-    def search_website(self, company_name):
-        """Поиск сайта компании в зависимости от выбранной поисковой системы"""
-        if self.search_engine == "google":
-            return self.search_google(company_name)
-        elif self.search_engine == "duckduckgo":
-            return self.search_duckduckgo(company_name)
-        else:
-            return self.search_yandex(company_name)
+    def save_cookies(self):
+        """Сохраняет cookies всех доменов из браузера (если задан cookie_jar)"""
+        import json
+        
+        if not self.cookie_jar or not self.driver:
+            return
+        
+        try:
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            directory = os.path.dirname(self.cookie_jar)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cookie_jar, 'w', encoding='utf-8') as f:
+                json.dump(cookies, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Не удалось сохранить cookies в {self.cookie_jar}: {e}")
+    
+    def close_driver(self):
+        """Сохраняет cookies и закрывает браузер"""
+        if not self.driver:
+            return
+        
+        self.save_cookies()
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
     
     def save_results(self):
         """Сохранение результатов в CSV-файл"""
@@ -543,11 +506,14 @@ class CompanySiteFinder:
             print("Нет результатов для сохранения.")
             return
         
+        import pandas as pd
+        
         try:
             # Создаем DataFrame из результатов
             df = pd.DataFrame({
                 'Company Name': list(self.results.keys()),
-                'Website': list(self.results.values())
+                'Website': list(self.results.values()),
+                'Checked At': [self.checked_at.get(company) for company in self.results]
             })
             
             # Сохраняем в CSV
@@ -559,25 +525,760 @@ class CompanySiteFinder:
             print(f"Ошибка при сохранении результатов: {e}")
             return None
 
-def main(input_file, output_file, search_engine="google", headless=True, proxy=None, search_params=None):
+def streamlit_progress(progress, status):
+    """
+    Хук прогресса для Streamlit: записывает прогресс и статус в session_state
+    :param progress: Доля обработанных компаний (от 0 до 1)
+    :param status: Текстовый статус
+    """
+    st = sys.modules.get('streamlit')
+    if st is None:
+        return
+    if progress is not None:
+        st.session_state.progress = progress
+    st.session_state.status = status
+
+def report_error(message):
+    """
+    Выводит сообщение об ошибке в консоль и, если приложение запущено из Streamlit, в интерфейс
+    :param message: Текст ошибки
+    """
+    print(message)
+    # Streamlit не импортируем сами: если его загрузило приложение, он уже в sys.modules
+    st = sys.modules.get('streamlit')
+    if st is not None:
+        st.error(message)
+
+def save_metrics(path, metrics):
+    """
+    Сохраняет метрики запуска в JSON-файл
+    :param path: Путь к файлу
+    :param metrics: Словарь с метриками
+    """
+    import json
+    
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        print(f"Метрики запуска сохранены в файл: {path}")
+    except Exception as e:
+        print(f"Ошибка при сохранении метрик: {e}")
+
+def result_record(company, website, engine, attempts, latency_ms, candidates, status=None, checked_at=None,
+                  network=None, carried=False):
+    """
+    Запись с историей поиска по компании (те же поля, что и в колоночном выводе)
+    :param status: Статус, если он отличается от 'found' / 'not_found' (например, 'skipped')
+    :param checked_at: Время проверки (по умолчанию - сейчас; у пропущенных компаний его нет)
+    :param carried: Результат перенесен из прошлого запуска, а не получен в этом
+    :param network: Сетевые метрики загрузок страниц результатов (netstats.page_load_metrics)
+    """
+    if checked_at is None and status != 'skipped':
+        checked_at = datetime.now().replace(microsecond=0)
+    return {
+        'company': company,
+        'website': website,
+        'status': status or ('found' if website else 'not_found'),
+        'engine': engine,
+        'attempts': attempts,
+        'latency_ms': latency_ms,
+        'candidates': list(candidates),
+        'checked_at': checked_at,
+        'carried': carried,
+        'requests': network['requests'] if network else None,
+        'bytes': network['bytes'] if network else None,
+        'bytes_by_type': network['bytes_by_type'] if network else None,
+        'ttfb_ms': network['ttfb_ms'] if network else None,
+        'dom_ready_ms': network['dom_ready_ms'] if network else None,
+    }
+
+def archive_time(entry):
+    """
+    Время загрузки страницы в архив: результат разбора архива не новее самой страницы
+    (иначе при повторном запуске по разнице старые результаты выглядели бы свежими)
+    :return: datetime или None, если время не записано
+    """
+    try:
+        return datetime.strptime(entry['fetched_at'], "%Y-%m-%dT%H:%M:%S")
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def iter_reparse_archive(archive_dir, engines=None, pipeline=None):
+    """
+    Повторный разбор архива страниц результатов без обращения к сети: извлечение, фильтрация
+    и ранжирование выполняются заново, например после исправления селекторов
+    
+    :param archive_dir: Каталог архива (SerpArchive)
+    :param engines: Разбирать только страницы этих поисковых систем (по умолчанию все)
+    :param pipeline: SearchPipeline со своими этапами фильтрации и ранжирования (опционально)
+    :return: Генератор записей в формате iter_find_sites
+    """
+    archive = SerpArchive(archive_dir)
+    pipeline = pipeline or SearchPipeline()
+    
+    for entry in archive.entries(engines):
+        try:
+            engine = get_engine(entry['engine'])
+        except ValueError as e:
+            print(f"Пропускаем запись архива для '{entry['company']}': {e}")
+            continue
+        
+        started_at = time.perf_counter()
+        candidates = pipeline.process(engine, archive.load(entry['sha256']), entry['company'])
+        website = pipeline.website_from(candidates)
+        yield result_record(entry['company'], website, engine.name, 1,
+                            (time.perf_counter() - started_at) * 1000, candidates,
+                            checked_at=archive_time(entry))
+
+def iter_find_sites(companies, search_engine="google", headless=True, proxy=None, progress_callback=None,
+                    cancel_event=None, finder=None, profiler=None, profile_every=1, **search_params):
+    """
+    Потоковый поиск сайтов: генератор, который выдает записи о результатах по мере завершения компаний.
+    
+    Следующий запрос к поисковой системе выполняется только когда потребитель запрашивает следующую
+    запись, поэтому медленный потребитель естественным образом притормаживает поиск. Поиск можно
+    остановить через cancel_event или закрыв генератор (close()); браузер при этом закрывается.
+    
+    :param companies: pandas.DataFrame или итерируемый набор названий компаний
+    :param search_engine: Поисковая система (имя из engines.ENGINES)
+    :param headless: Запускать браузер в фоновом режиме
+    :param proxy: Прокси-сервер (опционально)
+    :param progress_callback: Функция progress_callback(progress, status) для отображения прогресса
+    :param cancel_event: threading.Event, установка которого останавливает поиск после текущего запроса
+    :param finder: Готовый CompanySiteFinder (по умолчанию создается новый)
+    :param profiler: RunProfiler для профилирования (опционально)
+    :param profile_every: Профилировать только каждую N-ю компанию (в режиме вкладок - каждый N-й проход цикла)
+    :param search_params: Параметры поиска, те же, что в search_params функции main
+    :return: Генератор словарей с ключами company, website, status, engine, attempts, latency_ms, candidates
+        и сетевыми метриками requests, bytes, bytes_by_type, ttfb_ms, dom_ready_ms
+    """
+    max_retries = search_params.get('max_retries', 1)
+    delay_seconds = search_params.get('delay_seconds', 3)
+    max_driver_restarts = search_params.get('max_driver_restarts', 2)
+    domain_guess = search_params.get('domain_guess', False)
+    retry_base_delay = search_params.get('retry_base_delay', max(10, delay_seconds * 3))
+    retry_max_delay = search_params.get('retry_max_delay', 600)
+    retry_engine_name = search_params.get('retry_engine')
+    tabs = max(1, int(search_params.get('tabs', 1)))
+    deadline = parse_duration(search_params.get('deadline'))
+    company_budget = parse_duration(search_params.get('company_budget'))
+    fast_engine_name = search_params.get('fast_engine')
+    previous_results = search_params.get('previous_results')
+    retry_missed_after = parse_duration(search_params.get('retry_missed_after'))
+    parse_workers = int(search_params.get('parse_workers') or 0)
+    adaptive_pacing = search_params.get('adaptive_pacing', False)
+    engine_names = search_params.get('engines') or []
+    if isinstance(engine_names, str):
+        engine_names = [name.strip() for name in engine_names.split(',') if name.strip()]
+    profile_every = max(1, int(profile_every))
+    run_started_at = time.monotonic()
+    
+    if finder is None:
+        finder = CompanySiteFinder(
+            search_engine=search_engine,
+            headless=headless,
+            proxy=proxy,
+            recycle_every=search_params.get('recycle_every'),
+            max_browser_memory_mb=search_params.get('max_browser_memory_mb'),
+            extraction_mode=search_params.get('extraction_mode', 'html'),
+            rate_limits=search_params.get('rate_limits'),
+            archive_dir=search_params.get('archive_dir'),
+            selector_stats_file=search_params.get('selector_stats_file'),
+            aggregators_file=search_params.get('aggregators_file'),
+            browser_profile=search_params.get('browser_profile'),
+            cookie_jar=search_params.get('cookie_jar'),
+            page_load_strategy=search_params.get('page_load_strategy', 'eager'),
+            implicit_wait=search_params.get('implicit_wait', 0),
+            network_metrics=search_params.get('network_metrics', False)
+        )
+    
+    companies = finder.load_companies(companies)
+    total_companies = len(companies)
+    done = 0
+    parse_pool = None
+    
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+    
+    try:
+        # Повторный запуск по разнице: переносим прошлые результаты, ищем только новые компании
+        # и давно не найденные
+        if previous_results and companies:
+            previous = load_previous_results(previous_results)
+            companies, carried = plan_delta(companies, previous, retry_missed_after)
+            print(f"Перенесено из прошлых результатов: {len(carried)}, нужно искать: {len(companies)}")
+            
+            for company, row in carried:
+                done += 1
+                # Поисковая система та, что нашла результат в прошлом запуске (в CSV ее нет)
+                yield result_record(company, row['website'], row['engine'], 0, 0.0, [],
+                                    status=row['status'], checked_at=row['checked_at'], carried=True)
+        
+        # Быстрый этап: подбираем домены по названию без поисковой системы
+        if domain_guess and companies:
+            def on_guess_progress(guessed_count, total):
+                if progress_callback:
+                    progress_callback(guessed_count / total_companies, f"Подбор доменов по названию: {guessed_count}/{total}")
+            
+            with profiler.section() if profiler else nullcontext():
+                guessed = guess_domains(companies, progress_callback=on_guess_progress)
+            
+            resolved = set()
+            for company, guess in guessed.items():
+                if guess['website']:
+                    print(f"Домен подобран по названию: {company} -> {guess['website']}")
+                    resolved.add(company)
+                    done += 1
+                    yield result_record(company, guess['website'], 'domain_guess', guess['attempts'],
+                                        guess['latency_ms'], guess['candidates'])
+            
+            companies = [company for company in companies if company not in resolved]
+            print(f"Подобрано доменов: {len(resolved)}, осталось для поиска: {len(companies)}")
+        
+        # Скорость оцениваем только по поиску в браузере: подбор доменов несравнимо быстрее
+        budget = RunBudget(
+            len(companies),
+            deadline=deadline - (time.monotonic() - run_started_at) if deadline is not None else None,
+            company_budget=company_budget
+        )
+        
+        # Настройка драйвера (только если остались компании для поиска в браузере)
+        if companies and not cancelled() and not finder.driver:
+            try:
+                finder.setup_driver()
+            except Exception as e:
+                raise RuntimeError(f"Ошибка при настройке драйвера: {e}") from e
+        
+        # Новые компании идут по порядку, неудачные откладываются в очередь повторных попыток
+        # и возвращаются в работу, когда истечет их задержка
+        fresh = deque(companies)
+        retry_queue = RetryQueue(base_delay=retry_base_delay, max_delay=retry_max_delay)
+        retry_engine = get_engine(retry_engine_name) if retry_engine_name else None
+        # Чередование поисковых систем: пауза delay_seconds соблюдается для каждой системы отдельно,
+        # а браузер тем временем отправляет запросы в другие
+        rotation = [get_engine(name) for name in engine_names]
+        spacing = EngineSpacing(delay_seconds)
+        
+        # Адаптивный темп: пауза и число вкладок подстраиваются по капчам и задержке ответов,
+        # начиная со значений, найденных в прошлых запусках
+        pacing = None
+        if adaptive_pacing:
+            pacing = AimdPacing(search_params.get('pacing_file'), delay_seconds, concurrency=1, max_concurrency=tabs)
+            finder.pacing = pacing
+        latencies = {}
+        # Сетевые метрики загрузок по компании (суммируются по попыткам)
+        networks = {}
+        iteration = 0
+        # Компании, превысившие бюджет времени: к ним возвращаемся в конце, если останется время
+        deferred = deque()
+        deferred_returned = set()
+        # Попытки, взятые вкладкой, но еще не отправленные: их поисковая система не выдержала паузу
+        held = deque()
+        adapted = False
+        
+        def pending():
+            return bool(held or fresh or retry_queue or deferred)
+        
+        def next_item():
+            """Следующая попытка: сначала готовые повторные, затем новые, затем отложенные компании"""
+            if held:
+                return held.popleft()
+            item = retry_queue.pop_ready()
+            if item is None and fresh:
+                item = (fresh.popleft(), 1)
+            if item is None and deferred and not retry_queue:
+                item = deferred.popleft()
+                deferred_returned.add(item[0])
+            return item
+        
+        def adapt():
+            """Если запуск не успевает к сроку, один раз переходим на более быстрые настройки"""
+            nonlocal adapted
+            if adapted or not budget.behind():
+                return
+            adapted = True
+            print(f"Отстаем от срока ({budget.describe()}): повторные попытки сокращаются, "
+                  f"долгие компании откладываются в конец")
+            if fast_engine_name and fast_engine_name != finder.engine.name:
+                finder.engine = get_engine(fast_engine_name)
+                if rotation:
+                    rotation[:] = [finder.engine]
+                print(f"Переходим на поисковую систему {finder.engine.title}")
+            # При разборе в пуле процессов он и так не задерживает загрузку страниц
+            if parse_pool is None and finder.pipeline.extraction_mode != 'browser':
+                finder.pipeline.extraction_mode = 'browser'
+                print("Переходим на извлечение ссылок внутри браузера")
+        
+        def announce(company, attempt):
+            """Печатает и передает наружу статус очередной попытки"""
+            progress = done / total_companies
+            if attempt == 1:
+                status = f"Обработка {done + 1}/{total_companies} ({progress * 100:.1f}%): {company}"
+            else:
+                status = f"Повторная попытка {attempt}/{max_retries} для: {company}"
+            
+            # Оценка времени до окончания по наблюдаемой скорости
+            eta = budget.describe()
+            if eta:
+                status += f" ({eta})"
+            print(status)
+            
+            if progress_callback:
+                progress_callback(progress, status)
+        
+        def engine_for(attempt):
+            # Повторные попытки можно отправлять в другую поисковую систему
+            if attempt > 1 and retry_engine:
+                return retry_engine
+            if rotation:
+                # Система, которая раньше других готова принять запрос
+                engines = {spacing_key(engine): engine for engine in rotation}
+                return engines[spacing.pick(list(engines))]
+            return finder.engine
+        
+        def spacing_key(engine):
+            # Паузы считаются для пары система@прокси: через разные прокси запросы независимы
+            return f"{engine.name}@{finder.proxy}" if finder.proxy else engine.name
+        
+        def delay_for(engine):
+            return pacing.delay(spacing_key(engine)) if pacing else delay_seconds
+        
+        def pace(engine, error, latency_ms):
+            """Передает результат запроса регулятору темпа"""
+            if pacing is None:
+                return
+            if isinstance(error, CaptchaDetected):
+                outcome = 'captcha'
+            else:
+                outcome = 'error' if error else 'ok'
+            change = pacing.record(spacing_key(engine), outcome, latency_ms)
+            if change:
+                print(f"Темп запросов {engine.title}: {change}")
+        
+        def tab_limit():
+            """Сколько вкладок можно занять сейчас"""
+            if pacing is None:
+                return tabs
+            return min(tabs, sum(pacing.limit(spacing_key(engine)) for engine in (rotation or [finder.engine])))
+        
+        def finish(company, attempt, engine, website, candidates, latency_ms, network=None):
+            """
+            Завершает попытку: откладывает повторную или возвращает запись о результате
+            :param network: Сетевые метрики загрузки страницы этой попытки (если есть)
+            :return: Запись или None, если компания отложена
+            """
+            nonlocal done
+            latencies[company] = latencies.get(company, 0.0) + latency_ms
+            networks[company] = merge_metrics(networks.get(company), network)
+            
+            if website is None and attempt < max_retries and company not in deferred_returned:
+                if budget.over_budget(latencies[company] / 1000):
+                    # Компания съела свой бюджет времени - вернемся к ней в конце, если успеем
+                    deferred.append((company, attempt + 1))
+                    print(f"Сайт не найден, '{company}' превысила бюджет времени и отложена в конец")
+                    return None
+                if budget.behind():
+                    print(f"Отстаем от срока: повторная попытка для '{company}' пропущена")
+                else:
+                    # Откладываем компанию, чтобы не обращаться к поисковой системе повторно сразу
+                    wait = retry_queue.push(company, attempt + 1)
+                    print(f"Сайт не найден, повторная попытка для '{company}' через {wait:.0f} сек")
+                    return None
+            
+            if website:
+                cleaned_url = clean_url(website)
+                print(f"Найден сайт: {cleaned_url}")
+                
+                # Добавляем протокол обратно для сохранения, если его нет
+                if not cleaned_url.startswith('http'):
+                    cleaned_url = 'https://' + cleaned_url
+                
+                website = cleaned_url
+            else:
+                print("Сайт не найден")
+            
+            done += 1
+            budget.complete()
+            return result_record(company, website, engine.name, attempt, latencies.pop(company), candidates,
+                                 network=networks.pop(company, None))
+        
+        def parsed(block=False):
+            """
+            Завершает попытки, страницы которых разобраны в пуле процессов
+            :param block: Ждать, пока будет разобрана хотя бы одна страница
+            :return: Список записей о результатах
+            """
+            records = []
+            for job, website, candidates in parse_pool.completed(block):
+                record = finish(job['company'], job['attempt'], job['engine'], website, candidates,
+                                (time.perf_counter() - job['started_at']) * 1000, job.get('network'))
+                if record:
+                    records.append(record)
+            return records
+        
+        def parsing():
+            return parse_pool is not None and len(parse_pool) > 0
+        
+        def complete(job, error, website=None, candidates=(), network=None, html=None):
+            """
+            Общая обработка результата запроса для вкладок и для последовательного поиска:
+            передает его регулятору темпа, затем отправляет страницу в пул разбора или завершает попытку
+            :param job: Попытка {'company', 'attempt', 'engine', 'query', 'started_at'}
+            :param error: Ошибка запроса (None - запрос прошел успешно)
+            :param html: HTML страницы для разбора в пуле процессов (None - ссылки уже извлечены)
+            :return: Запись или None, если попытка отложена или ждет разбора
+            """
+            engine = job['engine']
+            pace(engine, error, (time.perf_counter() - job['started_at']) * 1000)
+            
+            if html is not None:
+                # Попытка завершится, когда страницу разберет пул процессов
+                parse_pool.submit(engine, html, dict(job, network=network), job['company'])
+                return None
+            return finish(job['company'], job['attempt'], engine, website, list(candidates),
+                          (time.perf_counter() - job['started_at']) * 1000, network)
+        
+        # Этап разбора в отдельных процессах: браузер только загружает страницы, а их HTML
+        # разбирается параллельно. Очередь разбора ограничена, чтобы загрузка не убегала вперед
+        if parse_workers > 0 and finder.pipeline.extraction_mode == 'html' and pending() and not cancelled():
+            parse_pool = ParsePool(finder.pipeline, parse_workers)
+            print(f"Разбор страниц в {parse_pool.workers} процессах (очередь до {parse_pool.max_pending} страниц)")
+        
+        if tabs > 1 and pending() and not cancelled():
+            print(f"Поиск в {tabs} вкладках одного браузера")
+            pool = TabPool(finder.driver, tabs)
+            recycle = None
+            restarts = 0
+            
+            # После срока окончания новые запросы не отправляются, но начатые дожидаются
+            while ((pending() and not budget.expired()) or pool.busy() or parsing()) and not cancelled():
+                # Записи собираются за проход и отдаются после участка профилирования,
+                # чтобы в профиль не попадало время обработки записей вызывающим кодом
+                records = []
+                # Профилируем каждый N-й проход (раздача запросов вкладкам и сбор результатов)
+                sampled = profiler is not None and iteration % profile_every == 0
+                iteration += 1
+                
+                try:
+                    with profiler.section(sampled) if profiler else nullcontext():
+                        if parsing():
+                            # Пока очередь разбора заполнена, новые страницы не загружаем; если все вкладки
+                            # свободны и загружать больше нечего, ждем разбора, а не крутимся вхолостую
+                            idle = not pool.busy() and not (pending() and not budget.expired())
+                            records.extend(parsed(block=parse_pool.full() or idle))
+                        
+                        # Плановый перезапуск: перестаем раздавать запросы и ждем, пока освободятся все вкладки
+                        if recycle and not pool.busy():
+                            finder.restart_driver(recycle)
+                            pool = TabPool(finder.driver, tabs)
+                            recycle = None
+                        
+                        # Раздаем запросы свободным вкладкам по кругу
+                        dispatched = False
+                        dispatch_blocked = recycle or budget.expired() or (parse_pool is not None and parse_pool.full())
+                        for tab in ([] if dispatch_blocked else pool.idle()):
+                            if len(pool.busy()) >= tab_limit():
+                                break
+                            adapt()
+                            item = next_item()
+                            if item is None:
+                                break
+                            company, attempt = item
+                            engine = engine_for(attempt)
+                            if spacing.ready_in(spacing_key(engine)) > 0:
+                                # Пауза между запросами к системе соблюдается и во вкладках:
+                                # попытка ждет, пока система будет готова принять запрос
+                                held.appendleft(item)
+                                break
+                            announce(company, attempt)
+                            finder.acquire_rate_limit(engine)
+                            
+                            query = engine.build_query(company)
+                            job = {'company': company, 'attempt': attempt, 'engine': engine, 'query': query,
+                                   'started_at': time.perf_counter()}
+                            pool.dispatch(tab, engine.build_url(query), job, engine.ready_timeout)
+                            # Паузы внутри запроса вкладка не ждет - они добавляются к паузе до следующего
+                            spacing.used(spacing_key(engine), delay_for(engine) + engine.page_delay())
+                            finder.queries_since_restart += 1
+                            dispatched = True
+                        
+                        # Забираем результаты из вкладок, где страница готова или истекло время ожидания
+                        finished = pool.poll()
+                        if finished:
+                            # События сети всех вкладок идут в один журнал - по компаниям их не разделить,
+                            # поэтому в режиме вкладок они учитываются только в сводке за запуск
+                            finder.collect_network_metrics(dom_ready=False, loads=len(finished))
+                        for tab, loaded, ready in finished:
+                            job = tab.job
+                            engine = job['engine']
+                            website, candidates, html = None, [], None
+                            error = None if ready else TimeoutError()
+                            
+                            if loaded and not ready:
+                                # Результаты не появились: возможно, вместо них капча
+                                pool.activate(tab)
+                                if engine.is_captcha(finder.driver.current_url, finder.driver.page_source):
+                                    print(f"{engine.title} показывает капчу для компании '{job['company']}'")
+                                    error = CaptchaDetected(engine.title)
+                                    loaded = False
+                            
+                            if ready or (loaded and not engine.require_ready):
+                                if not ready:
+                                    print(f"Не дождались результатов {engine.title}, разбираем страницу как есть")
+                                pool.activate(tab)
+                                # Окно cookies проверяем только на первой странице поисковой системы
+                                if engine.name not in finder.pipeline.consent_checked:
+                                    engine.handle_consent(finder.driver)
+                                    finder.pipeline.consent_checked.add(engine.name)
+                                if parse_pool is not None:
+                                    html = finder.pipeline.page_source(finder.driver, engine, job['company'], job['query'])
+                                else:
+                                    website, candidates = finder.pipeline.collect(finder.driver, engine, job['company'],
+                                                                                  job['query'])
+                            else:
+                                print(f"Не дождались результатов {engine.title} для компании '{job['company']}'")
+                            
+                            # Пауза перед следующим запросом в этой вкладке
+                            pool.release(tab, random.uniform(delay_for(engine), delay_for(engine) + 2))
+                            restarts = 0
+                            # Политику перезапуска проверяем один раз на завершенный запрос, как в
+                            # последовательном режиме, а не на каждом проходе цикла
+                            recycle = recycle or finder.recycle_reason()
+                            
+                            record = complete(job, error, website, candidates, html=html)
+                            if record:
+                                records.append(record)
+                        
+                        if not dispatched and not finished and (pool.busy() or pending()):
+                            # Ждем загрузки страниц, освобождения вкладок или отложенных попыток. Нулевые
+                            # ожидания пропускаем: свободная вкладка без готовой попытки (или готовая попытка
+                            # без свободной вкладки) ничего не меняет до следующего события
+                            waits = [0.2, pool.next_available_in(), retry_queue.next_ready_in()]
+                            waits += [spacing.ready_in(spacing_key(engine_for(attempt))) for _, attempt in held]
+                            time.sleep(min(wait for wait in waits if wait))
+                    
+                except Exception as e:
+                    if not finder.is_driver_failure(e) or restarts >= max_driver_restarts:
+                        raise
+                    
+                    # Браузер упал: возвращаем незавершенные запросы в начало очереди и перезапускаем его
+                    restarts += 1
+                    for tab in pool.busy():
+                        job = pool.release(tab)
+                        company = job['company']
+                        latencies[company] = latencies.get(company, 0.0) + (time.perf_counter() - job['started_at']) * 1000
+                        if job['attempt'] == 1:
+                            fresh.appendleft(company)
+                        else:
+                            retry_queue.push(company, job['attempt'])
+                    finder.restart_driver(f"ошибка браузера: {e}")
+                    pool = TabPool(finder.driver, tabs)
+                    recycle = None
+                
+                for record in records:
+                    yield record
+        
+        while (pending() or parsing()) and not budget.expired() and not cancelled():
+            if parsing():
+                # Ждем разбора, если очередь разбора заполнена или загружать больше нечего
+                ready_in = retry_queue.next_ready_in()
+                idle = not fresh and (ready_in is None or ready_in > 0)
+                for record in parsed(block=parse_pool.full() or idle):
+                    yield record
+                if parse_pool.full() or not pending():
+                    continue
+            
+            adapt()
+            item = next_item()
+            if item is None:
+                # Остались только отложенные попытки - ждем ближайшую (или разбора страниц)
+                if not parsing():
+                    time.sleep(retry_queue.next_ready_in())
+                continue
+            company, attempt = item
+            
+            # Профилируем каждую N-ю обработанную компанию
+            sampled = profiler is not None and iteration % profile_every == 0
+            iteration += 1
+            
+            with profiler.section(sampled) if profiler else nullcontext():
+                announce(company, attempt)
+                
+                # Плановый перезапуск браузера (по числу запросов или по памяти)
+                reason = finder.recycle_reason()
+                if reason:
+                    finder.restart_driver(reason)
+                
+                engine = engine_for(attempt)
+                # Пауза только если к этой поисковой системе обращались недавно
+                spacing.wait(spacing_key(engine))
+                
+                started_at = time.perf_counter()
+                search = finder.fetch_page if parse_pool is not None else finder.search_website
+                result = search(company, engine)
+                
+                # Если упал браузер, перезапускаем его и повторяем ту же попытку
+                restarts = 0
+                while result is None and finder.is_driver_failure(finder.last_error) and restarts < max_driver_restarts:
+                    restarts += 1
+                    finder.restart_driver(f"ошибка браузера: {finder.last_error}")
+                    result = search(company, engine)
+                spacing.used(spacing_key(engine), delay_for(engine))
+                
+                job = {'company': company, 'attempt': attempt, 'engine': engine, 'query': None,
+                       'started_at': started_at}
+                if parse_pool is not None:
+                    # fetch_page возвращает (запрос, HTML) загруженной страницы или None
+                    job['query'], html = result or (None, None)
+                    record = complete(job, finder.last_error, network=finder.last_network, html=html)
+                else:
+                    record = complete(job, finder.last_error, result, finder.last_candidates, finder.last_network)
+            
+            if record:
+                yield record
+        
+        # Дожидаемся разбора уже загруженных страниц (например, после срока окончания)
+        while parsing() and not cancelled():
+            for record in parsed(block=True):
+                yield record
+        
+        if cancelled():
+            print(f"Поиск остановлен. Обработано {done} из {total_companies} компаний.")
+        elif pending():
+            # Срок окончания наступил: оставшиеся компании попадают в результаты как пропущенные
+            # (при следующем запуске по разнице они будут искаться как новые)
+            print(f"Срок окончания запуска наступил. Обработано {done} из {total_companies} компаний, "
+                  f"остальные пропущены.")
+            remaining = list(held) + [(company, 1) for company in fresh] + retry_queue.drain() + list(deferred)
+            held.clear()
+            fresh.clear()
+            deferred.clear()
+            for company, attempt in remaining:
+                done += 1
+                yield result_record(company, None, finder.engine.name, attempt - 1,
+                                    latencies.pop(company, 0.0), [], status='skipped',
+                                    network=networks.pop(company, None))
+    
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+        
+        try:
+            finder.selector_stats.save()
+            finder.aggregators.save()
+            if finder.pacing:
+                finder.pacing.save()
+        except Exception as e:
+            print(f"Ошибка при сохранении статистики селекторов: {e}")
+        
+        # Закрываем драйвер, в том числе при остановке генератора потребителем
+        finder.close_driver()
+
+def main(input_file, output_file, search_engine="google", headless=True, proxy=None, search_params=None,
+         progress_callback=None, result_callback=None, profile=None, profile_every=1, profile_mode="sampling",
+         companies=None):
     """
     Основная функция для запуска процесса поиска сайтов
     
-    :param input_file: Путь к входному CSV-файлу со списком компаний
+    :param input_file: Путь к входному CSV-файлу со списком компаний (не нужен, если передан companies)
     :param output_file: Путь к выходному CSV-файлу для сохранения результатов
-    :param search_engine: Поисковая система ('google' или 'yandex')
+    :param search_engine: Поисковая система (имя из engines.ENGINES: 'google', 'yandex', 'duckduckgo')
     :param headless: Запускать браузер в фоновом режиме
     :param proxy: Прокси-сервер (опционально)
     :param search_params: Словарь с дополнительными параметрами поиска:
-        - max_retries: Максимальное количество попыток поиска для каждой компании
-        - delay_seconds: Задержка между запросами в секундах
+        - max_retries: Максимальное количество попыток поиска для каждой компании. Неудачные попытки
+          не повторяются сразу, а откладываются с экспоненциальной задержкой, пока идут новые компании
+        - retry_base_delay: Задержка перед второй попыткой в секундах (по умолчанию 3 * delay_seconds, не меньше 10)
+        - retry_max_delay: Максимальная задержка перед повторной попыткой (по умолчанию 600)
+        - retry_engine: Поисковая система для повторных попыток (по умолчанию та же)
+        - delay_seconds: Задержка между запросами к одной поисковой системе в секундах
+        - adaptive_pacing: Подстраивать паузу между запросами и число занятых вкладок по ходу запуска:
+          пока поисковая система отвечает без капчи и без замедления, пауза уменьшается и вкладок
+          становится больше (на шаг), после капчи пауза удваивается, а вкладок становится вдвое меньше.
+          delay_seconds и tabs задают начальную паузу и максимум вкладок
+        - pacing_file: JSON-файл, в котором сохраняются найденные пауза и число вкладок по поисковым системам
+          и из которого они берутся в следующем запуске (по умолчанию pacing.json рядом с выходным файлом)
+        - engines: Список поисковых систем (или строка 'yandex,google'), между которыми чередуются запросы.
+          Очередной запрос уходит в систему, которая раньше других готова его принять, поэтому пауза
+          delay_seconds для каждой системы соблюдается, а браузер не простаивает
         - add_keywords: Добавлять ли ключевые слова к запросу
         - thorough_search: Использовать ли расширенный поиск
+        - output_format: Формат выходного файла: 'csv' (по умолчанию), 'parquet' или 'arrow'.
+          Колоночные форматы пишутся группами строк по ходу поиска и содержат историю поиска
+          (поисковая система, число попыток, время, список кандидатов, статус)
+        - row_group_size: Размер группы строк для Parquet/Arrow (по умолчанию 1000)
+        - recycle_every: Перезапускать браузер каждые N запросов (по умолчанию не перезапускать)
+        - max_browser_memory_mb: Перезапускать браузер, когда Chrome занимает больше N МБ памяти
+        - max_driver_restarts: Сколько раз подряд перезапускать упавший браузер для одной компании (по умолчанию 2)
+        - extraction_mode: 'html' (по умолчанию) - разбирать page_source в Python, 'browser' - выполнять
+          селекторы внутри страницы одним execute_script и получать только список ссылок
+        - domain_guess: Перед поиском подбирать домен по транслитерированному названию и проверять его
+          через DNS и HTTP; в браузер уходят только компании, для которых домен не подобран
+        - archive_dir: Сохранять все загруженные страницы результатов в этот каталог (сжатыми,
+          с адресацией по содержимому), чтобы потом разобрать их заново без сети
+        - reparse_archive: Не выполнять поиск, а заново разобрать страницы из этого каталога архива
+          (входной файл и companies не используются). Время проверки в результатах - время загрузки
+          страницы в архив
+        - reparse_save_stats: Вместе с reparse_archive: сохранить статистику селекторов и агрегаторов,
+          собранную по страницам архива (по умолчанию не сохраняется)
+        - deadline: Срок окончания запуска: секунды, длительность ('8h', '1h30m') или время суток ('07:00').
+          Если по наблюдаемой скорости запуск не успевает, повторные попытки сокращаются, извлечение
+          переходит в режим 'browser', а поиск - на fast_engine (если задана). После срока оставшиеся
+          компании записываются со статусом 'skipped'
+        - company_budget: Бюджет времени на одну компанию (секунды или длительность). Компания, превысившая
+          его, откладывается в конец и повторяется, только если останется время
+        - fast_engine: Поисковая система, на которую переходить, если запуск не успевает к сроку
+        - previous_results: Файл результатов прошлого запуска (CSV, Parquet или Arrow). Ищутся только
+          компании, которых в нем нет (сравнение по нормализованному названию), остальные результаты
+          переносятся в новый файл, который содержит весь список
+        - retry_missed_after: Вместе с previous_results: повторять поиск для ненайденных компаний,
+          проверенных раньше, чем столько назад ('7d', '12h'; 0 - все ненайденные)
+        - tabs: Количество вкладок одного браузера для параллельного поиска (по умолчанию 1). Запросы
+          раздаются вкладкам по кругу, страницы загружаются одновременно, а delay_seconds действует
+          для каждой вкладки отдельно (общую частоту запросов ограничивает rate_limits)
+        - parse_workers: Количество процессов для разбора HTML страниц результатов (по умолчанию 0 - разбор
+          в основном процессе). Браузер только загружает страницы и передает их HTML в ограниченную очередь
+          разбора; если она заполнена, загрузка ждет. Работает только с extraction_mode='html'
+        - selector_stats_file: JSON-файл статистики селекторов (по умолчанию selector_stats.json рядом
+          с выходным файлом). По ней селекторы упорядочиваются по недавней доле попаданий, давно не
+          работающие пропускаются, а после надежного селектора с результатами остальные не выполняются
+        - aggregators_file: JSON-файл выученного черного списка агрегаторов (по умолчанию aggregators.json
+          рядом с выходным файлом). Домен, который встречается среди кандидатов многих не связанных с ним
+          компаний (rusprofile.ru, list-org.com и т.п.), считается справочником и отфильтровывается
+        - network_metrics: Собирать по событиям Chrome DevTools сетевые метрики каждой загрузки страницы
+          результатов (запросы, байты по типам ресурсов, время до первого байта и готовности DOM) и писать
+          их в колоночный вывод и метрики запуска (по умолчанию выключено)
+        - metrics_file: JSON-файл метрик запуска, включая статистику селекторов (по умолчанию
+          <выходной файл>.metrics.json; None - не сохранять)
+        - browser_profile: Каталог постоянного профиля Chrome (согласия с cookies принимаются один раз)
+        - cookie_jar: JSON-файл cookies браузера, сохраняемых между запусками (по умолчанию cookies.json
+          рядом с выходным файлом, если не задан browser_profile; None - не сохранять)
+        - page_load_strategy: Стратегия загрузки страниц Chrome: 'eager' (по умолчанию), 'none' или 'normal'
+        - implicit_wait: Неявное ожидание элементов в секундах (по умолчанию 0)
+        - rate_limits: Ограничения частоты запросов в минуту по поисковым системам ({'yandex': 20}) или
+          по паре система@прокси ({'yandex@ip:port': 30}). Ограничение общее для всех процессов на машине,
+          в отличие от delay_seconds, которая действует только внутри одного процесса
+    :param progress_callback: Функция progress_callback(progress, status) для отображения прогресса.
+        Если не указана и модуль streamlit уже загружен, используется streamlit_progress
+    :param result_callback: Функция result_callback(record), вызываемая после обработки каждой компании
+        с записью о результате (те же поля, что и в колоночном выводе)
+    :param profile: Путь к файлу профиля (без расширения). Если указан, запуск профилируется: пишется
+        профиль (.folded для 'sampling', .prof для 'cprofile') и сводка .txt с временем работы процессора,
+        временем ожидания и самыми затратными функциями
+    :param profile_every: Профилировать только каждую N-ю компанию (для почти нулевых накладных расходов)
+    :param profile_mode: 'sampling' - выборочный профилировщик с разделением on-CPU/blocked,
+        'cprofile' - детерминированный cProfile
+    :param companies: Компании в памяти: pandas.DataFrame или итерируемый набор названий. Если указан,
+        входной файл не читается
     :return: Словарь с результатами поиска
     """
     try:
-        # Используем session_state для обновления прогресса если запущены из Streamlit
-        is_streamlit = 'streamlit' in sys.modules
+        # Обновляем прогресс в Streamlit только если его загрузило само приложение
+        if progress_callback is None and 'streamlit' in sys.modules:
+            progress_callback = streamlit_progress
         
         # Устанавливаем параметры поиска по умолчанию
         if search_params is None:
@@ -587,6 +1288,23 @@ def main(input_file, output_file, search_engine="google", headless=True, proxy=N
         delay_seconds = search_params.get('delay_seconds', 3)
         add_keywords = search_params.get('add_keywords', True)
         thorough_search = search_params.get('thorough_search', True)
+        output_format = search_params.get('output_format', 'csv').lower()
+        row_group_size = search_params.get('row_group_size', 1000)
+        domain_guess = search_params.get('domain_guess', False)
+        reparse_archive = search_params.get('reparse_archive')
+        # Статистика по старым страницам архива может не соответствовать текущей выдаче
+        save_stats = not reparse_archive or search_params.get('reparse_save_stats', False)
+        
+        # Статистика селекторов, cookies и метрики запуска по умолчанию пишутся рядом с результатами
+        selector_stats_file = os.path.join(os.path.dirname(output_file) or '.', 'selector_stats.json')
+        aggregators_file = os.path.join(os.path.dirname(output_file) or '.', 'aggregators.json')
+        pacing_file = os.path.join(os.path.dirname(output_file) or '.', 'pacing.json')
+        cookie_jar = os.path.join(os.path.dirname(output_file) or '.', 'cookies.json')
+        metrics_file = search_params.get('metrics_file', os.path.splitext(output_file)[0] + '.metrics.json')
+        
+        if output_format != 'csv' and output_format not in COLUMNAR_FORMATS:
+            report_error(f"Неизвестный формат вывода: {output_format}")
+            return None
         
         # Инициализируем finder
         finder = CompanySiteFinder(
@@ -594,111 +1312,265 @@ def main(input_file, output_file, search_engine="google", headless=True, proxy=N
             output_file=output_file,
             search_engine=search_engine,
             headless=headless,
-            proxy=proxy
+            proxy=proxy,
+            recycle_every=search_params.get('recycle_every'),
+            max_browser_memory_mb=search_params.get('max_browser_memory_mb'),
+            extraction_mode=search_params.get('extraction_mode', 'html'),
+            rate_limits=search_params.get('rate_limits'),
+            archive_dir=search_params.get('archive_dir'),
+            selector_stats_file=search_params.get('selector_stats_file', selector_stats_file),
+            aggregators_file=search_params.get('aggregators_file', aggregators_file),
+            browser_profile=search_params.get('browser_profile'),
+            cookie_jar=search_params.get('cookie_jar', None if search_params.get('browser_profile') else cookie_jar),
+            page_load_strategy=search_params.get('page_load_strategy', 'eager'),
+            implicit_wait=search_params.get('implicit_wait', 0),
+            network_metrics=search_params.get('network_metrics', False)
         )
         
-        # Загружаем компании
-        companies = finder.load_companies()
-        
-        if not companies:
-            print("Список компаний пуст. Проверьте входной файл.")
-            if is_streamlit:
-                st.error("Список компаний пуст. Проверьте входной файл.")
-            return None
-        
-        # Настройка драйвера
-        try:
-            finder.setup_driver()
-        except Exception as e:
-            print(f"Ошибка при настройке драйвера: {e}")
-            if is_streamlit:
-                st.error(f"Ошибка при настройке драйвера: {e}")
-            return None
+        # Загружаем компании (при разборе архива они берутся из архива)
+        if not reparse_archive:
+            companies = finder.load_companies(companies)
+            
+            if not companies:
+                report_error("Список компаний пуст. Проверьте входной файл.")
+                return None
         
+        writer = None
+        profiler = None
         try:
-            total_companies = len(companies)
+            if profile:
+                profiler = RunProfiler(profile, mode=profile_mode)
             
-            print(f"Начинаем поиск сайтов для {total_companies} компаний...")
-            print(f"Настройки поиска: max_retries={max_retries}, delay_seconds={delay_seconds}, add_keywords={add_keywords}, thorough_search={thorough_search}")
+            if output_format in COLUMNAR_FORMATS:
+                writer = ColumnarResultWriter(output_file, output_format, row_group_size)
             
-            for index, company in enumerate(companies):
-                # Вычисляем прогресс
-                progress = (index + 1) / total_companies
-                progress_percent = progress * 100
-                
-                # Выводим статус в консоль
-                print(f"Обработка {index + 1}/{total_companies} ({progress_percent:.1f}%): {company}")
-                
-                # Обновляем прогресс в Streamlit
-                if is_streamlit:
-                    st.session_state.progress = progress
-                    st.session_state.status = f"Обработка {index + 1}/{total_companies} ({progress_percent:.1f}%): {company}"
-                
-                # Поиск сайта с несколькими попытками
-                website = None
-                attempt = 0
+            if reparse_archive:
+                print(f"Повторный разбор архива {reparse_archive} без обращения к сети...")
+                records = iter_reparse_archive(reparse_archive, pipeline=finder.pipeline)
+            else:
+                print(f"Начинаем поиск сайтов для {len(companies)} компаний...")
+                print(f"Настройки поиска: max_retries={max_retries}, delay_seconds={delay_seconds}, add_keywords={add_keywords}, thorough_search={thorough_search}, domain_guess={domain_guess}")
                 
-                while website is None and attempt < max_retries:
-                    attempt += 1
-                    if attempt > 1:
-                        print(f"Повторная попытка поиска ({attempt}/{max_retries}) для: {company}")
-                        if is_streamlit:
-                            st.session_state.status = f"Повторная попытка {attempt}/{max_retries} для: {company}"
-                    
-                    # Поиск сайта
-                    website = finder.search_website(company)
-                    
-                    # Пауза между попытками
-                    if website is None and attempt < max_retries:
-                        random_delay(delay_seconds, delay_seconds + 2)
+                records = iter_find_sites(
+                    companies,
+                    progress_callback=progress_callback,
+                    finder=finder,
+                    profiler=profiler,
+                    profile_every=profile_every,
+                    **{'pacing_file': pacing_file, **search_params}
+                )
+            
+            for record in records:
+                finder.results[record['company']] = record['website'] or "Не найден"
+                finder.checked_at[record['company']] = record['checked_at']
                 
-                if website:
-                    cleaned_url = clean_url(website)
-                    print(f"Найден сайт: {cleaned_url}")
-                    
-                    # Добавляем протокол обратно для сохранения, если его нет
-                    if not cleaned_url.startswith('http'):
-                        cleaned_url = 'https://' + cleaned_url
-                        
-                    finder.results[company] = cleaned_url
-                else:
-                    print(f"Сайт не найден")
-                    finder.results[company] = "Не найден"
+                # Пишем запись в колоночный файл
+                if writer:
+                    writer.write(record)
                 
-                # Делаем паузу между запросами
-                if index < total_companies - 1:  # Не ждем после последней компании
-                    random_delay(delay_seconds, delay_seconds + 2)
+                # Передаем результат наружу сразу, не дожидаясь конца поиска
+                if result_callback:
+                    result_callback(record)
             
             # Сохраняем результаты
-            finder.save_results()
-            
-            print(f"Поиск завершен. Найдено {len([v for v in finder.results.values() if v != 'Не найден'])} сайтов из {total_companies}.")
+            if writer:
+                # Писатель отсоединяется до закрытия: если закрытие упадет, finally не закроет его второй раз
+                closing, writer = writer, None
+                closing.close()
+                print(f"Результаты сохранены в файл: {output_file}")
+            else:
+                finder.save_results()
+            
+            found_count = len([v for v in finder.results.values() if v != 'Не найден'])
+            print(f"Поиск завершен. Найдено {found_count} сайтов из {len(finder.results)}.")
+            
+            if metrics_file:
+                save_metrics(metrics_file, {
+                    'companies': len(finder.results),
+                    'found': found_count,
+                    'not_found': len(finder.results) - found_count,
+                    'driver_restarts': finder.driver_restarts,
+                    'selector_stats': finder.selector_stats.summary(),
+                    'aggregators': finder.aggregators.summary(),
+                    'pacing': finder.pacing.summary() if finder.pacing else None,
+                    'network': finder.network_stats.summary() if finder.track_network else None,
+                })
             
             return finder.results
         
         except Exception as e:
-            print(f"Ошибка при обработке компаний: {e}")
-            if is_streamlit:
-                st.error(f"Ошибка при обработке компаний: {e}")
+            report_error(f"Ошибка при обработке компаний: {e}")
             return None
         
         finally:
-            # Закрываем драйвер
-            if finder.driver:
+            if profiler:
+                try:
+                    profiler.close()
+                except Exception as e:
+                    print(f"Ошибка при сохранении профиля: {e}")
+            
+            try:
+                if save_stats:
+                    finder.selector_stats.save()
+                    finder.aggregators.save()
+            except Exception as e:
+                print(f"Ошибка при сохранении статистики селекторов: {e}")
+            
+            # Дописываем уже найденные результаты, если поиск прервался до закрытия файла
+            if writer:
                 try:
-                    finder.driver.quit()
-                except:
-                    pass
+                    writer.close()
+                except Exception as e:
+                    print(f"Ошибка при сохранении результатов: {e}")
+            
+            # Сохраняем cookies и закрываем драйвер
+            finder.close_driver()
     
     except Exception as e:
-        print(f"Ошибка в основной функции: {e}")
-        if 'streamlit' in sys.modules:
-            st.error(f"Ошибка в основной функции: {e}")
+        report_error(f"Ошибка в основной функции: {e}")
         return None
 
-if __name__ == "__main__":
-    # Пример использования скрипта напрямую
-    input_file = "data/input/companies.csv"
-    output_file = "data/output/results.csv"
+def parse_args(argv=None):
+    """
+    Разбор аргументов командной строки
+    :param argv: Список аргументов (по умолчанию sys.argv[1:])
+    :return: argparse.Namespace
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Поиск официальных сайтов компаний по списку из CSV-файла")
+    parser.add_argument("input_file", nargs="?", default=None,
+                        help="Входной CSV-файл со списком компаний (по умолчанию data/input/companies.csv; "
+                             "с --reparse-archive не нужен: единственный файл считается выходным)")
+    parser.add_argument("output_file", nargs="?", default=None,
+                        help="Выходной CSV-файл с результатами (по умолчанию data/output/results.csv)")
+    parser.add_argument("--engine", default="google", choices=list(ENGINES),
+                        help="Поисковая система (по умолчанию google, как в main)")
+    parser.add_argument("--no-headless", dest="headless", action="store_false",
+                        help="Показывать окно браузера")
+    parser.add_argument("--proxy", default=None, help="Прокси-сервер в формате 'ip:port'")
+    parser.add_argument("--max-retries", type=int, default=1, help="Количество попыток на компанию")
+    parser.add_argument("--engines", default=None,
+                        help="Чередовать запросы между поисковыми системами через запятую (например, "
+                             "yandex,google,duckduckgo); --delay соблюдается для каждой системы отдельно")
+    parser.add_argument("--adaptive", dest="adaptive_pacing", action="store_true",
+                        help="Подстраивать паузу и число вкладок по капчам и задержке ответов "
+                             "(найденные значения сохраняются для следующих запусков)")
+    parser.add_argument("--pacing-file", default=None,
+                        help="Файл найденных значений темпа (по умолчанию pacing.json рядом с результатами)")
+    parser.add_argument("--retry-engine", default=None, choices=list(ENGINES),
+                        help="Поисковая система для повторных попыток")
+    parser.add_argument("--delay", type=float, default=3, help="Задержка между запросами к одной поисковой системе в секундах")
+    parser.add_argument("--recycle-every", type=int, default=None,
+                        help="Перезапускать браузер каждые N запросов")
+    parser.add_argument("--max-browser-memory", dest="max_browser_memory_mb", type=float, default=None,
+                        help="Перезапускать браузер, когда он занимает больше N МБ памяти")
+    parser.add_argument("--deadline", default=None,
+                        help="Срок окончания запуска: длительность ('8h', '90m') или время суток ('07:00')")
+    parser.add_argument("--company-budget", default=None,
+                        help="Бюджет времени на одну компанию ('60', '2m')")
+    parser.add_argument("--fast-engine", default=None, choices=list(ENGINES),
+                        help="Поисковая система, на которую переходить, если запуск не успевает к сроку")
+    parser.add_argument("--previous", dest="previous_results", default=None,
+                        help="Файл прошлых результатов: искать только новые компании и перенести остальные")
+    parser.add_argument("--retry-missed-after", default=None,
+                        help="Вместе с --previous: повторить поиск для ненайденных компаний, проверенных "
+                             "раньше, чем столько назад ('7d'; 0 - все ненайденные)")
+    parser.add_argument("--tabs", type=int, default=1,
+                        help="Искать параллельно в N вкладках одного браузера")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Разбирать HTML страниц результатов в N отдельных процессах, пока браузер "
+                             "загружает следующие (только для --extract html)")
+    parser.add_argument("--page-load", dest="page_load_strategy", default="eager",
+                        choices=["eager", "none", "normal"],
+                        help="Когда driver.get возвращает управление: после построения DOM (eager), сразу (none) "
+                             "или после полной загрузки страницы (normal)")
+    parser.add_argument("--extract", dest="extraction_mode", default="html", choices=EXTRACTION_MODES,
+                        help="Извлекать ссылки разбором page_source (html) или внутри браузера (browser)")
+    parser.add_argument("--rate-limit", dest="rate_limits", action="append", default=[],
+                        metavar="ENGINE[@PROXY]=RPM",
+                        help="Общее для всех процессов ограничение запросов в минуту (можно указать несколько раз)")
+    parser.add_argument("--archive", dest="archive_dir", default=None,
+                        help="Сохранять загруженные страницы результатов в этот каталог")
+    parser.add_argument("--reparse-archive", default=None,
+                        help="Не искать, а заново разобрать страницы из каталога архива (без сети)")
+    parser.add_argument("--reparse-save-stats", action="store_true",
+                        help="Вместе с --reparse-archive: сохранить статистику селекторов и агрегаторов, "
+                             "собранную по страницам архива")
+    parser.add_argument("--selector-stats", dest="selector_stats_file", default=None,
+                        help="Файл статистики селекторов (по умолчанию selector_stats.json рядом с результатами)")
+    parser.add_argument("--aggregators", dest="aggregators_file", default=None,
+                        help="Файл выученного черного списка агрегаторов (по умолчанию aggregators.json "
+                             "рядом с результатами)")
+    parser.add_argument("--browser-profile", default=None,
+                        help="Каталог постоянного профиля Chrome")
+    parser.add_argument("--cookie-jar", default=None,
+                        help="Файл для сохранения cookies между запусками (по умолчанию cookies.json рядом с результатами)")
+    parser.add_argument("--network-metrics", action="store_true",
+                        help="Собирать сетевые метрики загрузки страниц (запросы, байты, TTFB, готовность DOM) "
+                             "по событиям Chrome DevTools")
+    parser.add_argument("--domain-guess", action="store_true",
+                        help="Сначала подбирать домен по названию компании без поисковой системы")
+    parser.add_argument("--profile", default=None,
+                        help="Профилировать запуск и сохранить профиль и сводку по этому пути")
+    parser.add_argument("--profile-every", type=int, default=1,
+                        help="Профилировать только каждую N-ю компанию (с --tabs - каждый N-й проход цикла вкладок)")
+    parser.add_argument("--profile-mode", default="sampling", choices=PROFILE_MODES,
+                        help="Выборочный профилировщик (sampling) или cProfile")
+    parser.add_argument("--format", dest="output_format", default="csv", choices=["csv"] + COLUMNAR_FORMATS,
+                        help="Формат выходного файла")
+    args = parser.parse_args(argv)
     
-    main(input_file, output_file) 
\ No newline at end of file
+    # При разборе архива входной файл не используется, поэтому единственный файл - выходной
+    if args.reparse_archive and args.input_file and args.output_file is None:
+        args.input_file, args.output_file = None, args.input_file
+    if args.input_file is None and not args.reparse_archive:
+        args.input_file = "data/input/companies.csv"
+    if args.output_file is None:
+        args.output_file = "data/output/results.csv"
+    return args
+
+if __name__ == "__main__":
+    # Пример использования скрипта напрямую:
+    #   python scraper.py data/input/companies.csv data/output/results.csv --engine yandex
+    args = parse_args()
+    main(
+        args.input_file,
+        args.output_file,
+        search_engine=args.engine,
+        headless=args.headless,
+        proxy=args.proxy,
+        search_params={
+            "max_retries": args.max_retries,
+            "delay_seconds": args.delay,
+            "retry_engine": args.retry_engine,
+            "output_format": args.output_format,
+            "recycle_every": args.recycle_every,
+            "max_browser_memory_mb": args.max_browser_memory_mb,
+            "domain_guess": args.domain_guess,
+            "network_metrics": args.network_metrics,
+            "extraction_mode": args.extraction_mode,
+            "tabs": args.tabs,
+            "engines": args.engines,
+            "adaptive_pacing": args.adaptive_pacing,
+            **({"pacing_file": args.pacing_file} if args.pacing_file else {}),
+            "parse_workers": args.parse_workers,
+            "previous_results": args.previous_results,
+            "retry_missed_after": args.retry_missed_after,
+            "deadline": args.deadline,
+            "company_budget": args.company_budget,
+            "fast_engine": args.fast_engine,
+            "page_load_strategy": args.page_load_strategy,
+            "rate_limits": parse_rate_limits(args.rate_limits),
+            "archive_dir": args.archive_dir,
+            "reparse_archive": args.reparse_archive,
+            "reparse_save_stats": args.reparse_save_stats,
+            "browser_profile": args.browser_profile,
+            **({"cookie_jar": args.cookie_jar} if args.cookie_jar else {}),
+            **({"selector_stats_file": args.selector_stats_file} if args.selector_stats_file else {}),
+            **({"aggregators_file": args.aggregators_file} if args.aggregators_file else {})
+        },
+        profile=args.profile,
+        profile_every=args.profile_every,
+        profile_mode=args.profile_mode
+    )
@@ -0,0 +1,57 @@
+"""
+Тесты самообучающегося черного списка агрегаторов
+"""
+from utils.aggregators import AggregatorStats, related
+
+
+def test_seed_aggregators_are_filtered():
+    stats = AggregatorStats(seeds=["rusprofile.ru"])
+    links = ["https://www.rusprofile.ru/id/123", "https://romashka.ru/"]
+
+    assert stats.filter(links, "Ромашка") == ["https://romashka.ru/"]
+
+
+def test_domain_seen_for_many_companies_is_learned():
+    stats = AggregatorStats(min_companies=3, seeds=[])
+    for company in ["Ромашка", "Лютик", "Василек"]:
+        stats.observe(company, ["https://catalog-firm.ru/" + company, "https://own-site.ru/"])
+
+    assert stats.is_aggregator("catalog-firm.ru")
+    assert {domain for domain, _ in stats.learned()} == {"catalog-firm.ru", "own-site.ru"}
+    assert stats.filter(["https://catalog-firm.ru/x", "https://kolokolchik.ru/"], "Колокольчик") == [
+        "https://kolokolchik.ru/"]
+
+
+def test_company_own_domain_is_not_counted():
+    stats = AggregatorStats(min_companies=1, seeds=[])
+    stats.observe("Ромашка", ["https://romashka.ru/"])
+
+    assert not stats.is_aggregator("romashka.ru")
+
+
+def test_learned_aggregator_similar_to_company_is_kept():
+    stats = AggregatorStats(min_companies=2, seeds=[])
+    for company in ["Лютик", "Василек"]:
+        stats.observe(company, ["https://romashka.ru/"])
+
+    assert stats.is_aggregator("romashka.ru")
+    assert stats.filter(["https://romashka.ru/"], "Ромашка") == ["https://romashka.ru/"]
+
+
+def test_related():
+    assert related("ромашка", "romashka.ru")
+    assert related("ромашка плюс", "romashkaplus.ru")
+    assert not related("ромашка", "rusprofile.ru")
+
+
+def test_statistics_persist_between_runs(tmp_path):
+    path = str(tmp_path / "aggregators.json")
+    stats = AggregatorStats(path, min_companies=2, seeds=[])
+    for company in ["Лютик", "Василек"]:
+        stats.observe(company, ["https://catalog-firm.ru/"])
+    stats.save()
+
+    restored = AggregatorStats(path, min_companies=2, seeds=[])
+    assert restored.is_aggregator("catalog-firm.ru")
+    # Хранятся только хеши, а не названия компаний
+    assert "Лютик" not in (tmp_path / "aggregators.json").read_text(encoding="utf-8")
@@ -0,0 +1,52 @@
+"""
+Тесты потоковой записи результатов в Parquet и Arrow IPC
+"""
+from datetime import datetime
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from utils.columnar import ColumnarResultWriter, RESULT_COLUMNS
+
+
+def read_table(path, output_format):
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    with pa.OSFile(path, "rb") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_several_row_groups_round_trip(tmp_path, output_format):
+    path = str(tmp_path / f"results.{output_format}")
+    statuses = ["found", "not_found", "skipped", "domain_guess", "previous"]
+    engines = ["google", "yandex", "duckduckgo"]
+
+    # В каждой группе строк свой набор значений status и engine
+    records = []
+    for index in range(23):
+        records.append({
+            "company": f"Компания {index}",
+            "website": f"https://site{index}.ru" if index % 2 else None,
+            "status": statuses[index // 5],
+            "engine": engines[index % 3] if index < 10 else "yandex",
+            "attempts": 1,
+            "latency_ms": float(index),
+            "candidates": [f"https://site{index}.ru"],
+            "checked_at": datetime(2024, 1, 1, 12, 0, index),
+        })
+
+    with ColumnarResultWriter(path, output_format, row_group_size=5) as writer:
+        for record in records:
+            writer.write(record)
+
+    assert writer.rows_written == len(records)
+
+    rows = read_table(path, output_format).to_pylist()
+    assert [row["company"] for row in rows] == [record["company"] for record in records]
+    assert [row["status"] for row in rows] == [record["status"] for record in records]
+    assert [row["engine"] for row in rows] == [record["engine"] for record in records]
+    assert [row["website"] for row in rows] == [record["website"] for record in records]
+    assert set(rows[0]) == set(RESULT_COLUMNS)
@@ -0,0 +1,74 @@
+"""
+Тесты повторного запуска по разнице с прошлыми результатами
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.delta import company_key, plan_delta, load_previous_results
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def row(company, website, days_ago, engine="yandex"):
+    return {
+        "company": company,
+        "website": website,
+        "status": "found" if website else "not_found",
+        "engine": engine,
+        "checked_at": NOW - timedelta(days=days_ago),
+    }
+
+
+def test_company_key_ignores_legal_form_and_case():
+    assert company_key('ООО "Ромашка"') == company_key("ромашка")
+
+
+def test_plan_delta_searches_new_and_carries_known():
+    previous = {company_key("Ромашка"): row("Ромашка", "https://romashka.ru", 1),
+                company_key("Лютик"): row("Лютик", None, 30)}
+
+    to_search, carried = plan_delta(['ООО "Ромашка"', "Лютик", "Новая"], previous, now=NOW)
+
+    assert to_search == ["Новая"]
+    assert [(company, previous_row["company"]) for company, previous_row in carried] == [
+        ('ООО "Ромашка"', "Ромашка"), ("Лютик", "Лютик")]
+
+
+def test_plan_delta_retries_only_old_misses():
+    previous = {company_key("Старая"): row("Старая", None, 30),
+                company_key("Свежая"): row("Свежая", None, 1),
+                company_key("Найдена"): row("Найдена", "https://found.ru", 30)}
+
+    to_search, carried = plan_delta(["Старая", "Свежая", "Найдена"], previous,
+                                    retry_missed_after=7 * 86400, now=NOW)
+
+    assert to_search == ["Старая"]
+    assert [company for company, _ in carried] == ["Свежая", "Найдена"]
+
+
+def test_plan_delta_searches_companies_that_were_skipped():
+    skipped = dict(row("Пропущена", None, 0), status="skipped", checked_at=None)
+    to_search, carried = plan_delta(["Пропущена"], {company_key("Пропущена"): skipped}, now=NOW)
+
+    assert to_search == ["Пропущена"]
+    assert carried == []
+
+
+def test_load_previous_results_from_csv(tmp_path):
+    pytest.importorskip("pandas")
+    path = tmp_path / "results.csv"
+    path.write_text("Company Name,Website,Checked At\n"
+                    "Ромашка,https://romashka.ru,2024-05-20 10:15:17\n"
+                    "Лютик,Не найден,2024-05-20 10:15:20\n", encoding="utf-8")
+
+    previous = load_previous_results(str(path))
+
+    romashka = previous[company_key("Ромашка")]
+    assert romashka["website"] == "https://romashka.ru"
+    assert romashka["status"] == "found"
+    # В CSV нет поисковой системы
+    assert romashka["engine"] is None
+    assert romashka["checked_at"] == datetime(2024, 5, 20, 10, 15, 17)
+    assert previous[company_key("Лютик")]["website"] is None
+    assert previous[company_key("Лютик")]["status"] == "not_found"
@@ -0,0 +1,112 @@
+"""
+Тесты общей очереди заданий: одна компания из нескольких заданий ищется один раз,
+а задание, которое сдалось, передает поиск ожидающим
+"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("selenium")
+
+import job_service
+from utils.scheduling import EngineSpacing
+
+
+class FakeFinder:
+    """Поиск без браузера: результаты задаются тестом, каждый поиск можно придержать"""
+    searches = []
+    sites = {}
+    gate = threading.Event()
+
+    def __init__(self, **params):
+        self.driver = None
+        self.last_error = None
+        self.last_candidates = []
+
+    def setup_driver(self):
+        self.driver = object()
+
+    def close_driver(self):
+        self.driver = None
+
+    def recycle_reason(self):
+        return None
+
+    def is_driver_failure(self, error):
+        return False
+
+    def search_website(self, company, engine):
+        FakeFinder.searches.append(company)
+        FakeFinder.gate.wait(10)
+        return FakeFinder.sites.get(company)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    FakeFinder.searches = []
+    FakeFinder.sites = {}
+    FakeFinder.gate = threading.Event()
+    monkeypatch.setattr(job_service, "CompanySiteFinder", FakeFinder)
+    # Без случайной добавки к паузе, чтобы тесты не ждали лишнего
+    monkeypatch.setattr(job_service, "EngineSpacing", lambda delay: EngineSpacing(delay, jitter=0))
+    svc = job_service.SearchJobService(workers=2, delay_seconds=0)
+    yield svc
+    FakeFinder.gate.set()
+    svc.close()
+
+
+def wait_for(condition, timeout=10):
+    finish = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < finish, "условие не выполнилось вовремя"
+        time.sleep(0.01)
+
+
+def test_same_company_is_searched_once_for_both_jobs(service):
+    FakeFinder.sites = {"Ромашка": "https://romashka.ru"}
+    first = service.submit("alice", ["Ромашка"])
+    wait_for(lambda: FakeFinder.searches)
+    second = service.submit("bob", ['ООО "Ромашка"'])
+    wait_for(lambda: service.stats()["queued"] == 0)
+    FakeFinder.gate.set()
+
+    first_records = list(first.iter_results(timeout=10))
+    second_records = list(second.iter_results(timeout=10))
+
+    assert FakeFinder.searches == ["Ромашка"]
+    assert first_records[0]["website"] == "https://romashka.ru"
+    # Ожидающее задание получает тот же результат под своим названием
+    assert second_records[0]["company"] == 'ООО "Ромашка"'
+    assert second_records[0]["website"] == "https://romashka.ru"
+
+
+def test_cancelled_job_hands_the_search_to_waiting_job(service):
+    first = service.submit("alice", ["Ромашка"], max_retries=3)
+    wait_for(lambda: FakeFinder.searches)
+    second = service.submit("bob", ["Ромашка"])
+    wait_for(lambda: service.stats()["queued"] == 0)
+
+    # Первое задание не нашло сайт и ждет повторной попытки, а потом отменяется
+    FakeFinder.gate.set()
+    wait_for(lambda: len(first.retries) == 1)
+    FakeFinder.sites = {"Ромашка": "https://romashka.ru"}
+    first.cancel()
+
+    records = list(second.iter_results(timeout=10))
+
+    assert FakeFinder.searches == ["Ромашка", "Ромашка"]
+    assert records[0]["website"] == "https://romashka.ru"
+    assert first.records == []
+
+
+def test_waiting_job_honours_its_own_deadline(service):
+    first = service.submit("alice", ["Ромашка"])
+    wait_for(lambda: FakeFinder.searches)
+    second = service.submit("bob", ["Ромашка"], deadline=0.5)
+
+    records = list(second.iter_results(timeout=10))
+
+    assert records[0]["status"] == "skipped"
+    # Поиск первого задания продолжается
+    assert not first.done
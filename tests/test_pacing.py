@@ -0,0 +1,67 @@
+"""
+Тесты адаптивного подбора паузы и числа вкладок (AIMD)
+"""
+from utils.pacing import AimdPacing
+
+
+def test_speeds_up_after_healthy_streak():
+    pacing = AimdPacing(delay_seconds=3, concurrency=1, max_concurrency=4, step=0.5, healthy_streak=3)
+
+    assert pacing.record("yandex", "ok", 500) is None
+    assert pacing.record("yandex", "ok", 500) is None
+    assert pacing.record("yandex", "ok", 500) is not None
+    assert pacing.delay("yandex") == 2.5
+    assert pacing.limit("yandex") == 2
+
+
+def test_captcha_backs_off_multiplicatively():
+    pacing = AimdPacing(delay_seconds=4, concurrency=4, max_concurrency=4, backoff=2.0)
+
+    pacing.record("google", "captcha")
+
+    assert pacing.delay("google") == 8
+    assert pacing.limit("google") == 2
+    # Другие системы не затронуты
+    assert pacing.delay("yandex") == 4
+
+
+def test_slow_responses_hold_the_pace():
+    pacing = AimdPacing(delay_seconds=3, healthy_streak=2, latency_factor=2.0)
+
+    pacing.record("yandex", "ok", 500)
+    # Ответ втрое медленнее обычного сбрасывает серию
+    pacing.record("yandex", "ok", 1500)
+    pacing.record("yandex", "ok", 500)
+
+    assert pacing.delay("yandex") == 3
+
+
+def test_errors_reset_streak_without_backoff():
+    pacing = AimdPacing(delay_seconds=3, healthy_streak=2)
+
+    pacing.record("yandex", "ok", 500)
+    pacing.record("yandex", "error")
+    pacing.record("yandex", "ok", 500)
+
+    assert pacing.delay("yandex") == 3
+
+
+def test_delay_stays_within_limits():
+    pacing = AimdPacing(delay_seconds=2, min_delay=1, max_delay=10, step=5, healthy_streak=1)
+
+    pacing.record("yandex", "ok")
+    assert pacing.delay("yandex") == 1
+    for _ in range(5):
+        pacing.record("yandex", "captcha")
+    assert pacing.delay("yandex") == 10
+
+
+def test_values_persist_between_runs(tmp_path):
+    path = str(tmp_path / "pacing.json")
+    pacing = AimdPacing(path, delay_seconds=3)
+    pacing.record("yandex", "captcha")
+    pacing.save()
+
+    restored = AimdPacing(path, delay_seconds=3)
+    assert restored.delay("yandex") == 6
+    assert restored.summary()["yandex"]["captchas"] == 1
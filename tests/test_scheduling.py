@@ -0,0 +1,97 @@
+"""
+Тесты планирования: очередь повторных попыток, паузы по поисковым системам, разбор длительностей
+и учет времени запуска
+"""
+import pytest
+
+from utils.scheduling import RetryQueue, EngineSpacing, RunBudget, parse_duration, format_duration
+
+
+def test_retry_queue_backoff_grows_and_is_capped():
+    queue = RetryQueue(base_delay=10, max_delay=60, jitter=0)
+    assert [queue.backoff(attempt) for attempt in (2, 3, 4, 5)] == [10, 20, 40, 60]
+
+
+def test_retry_queue_returns_items_only_when_ready():
+    queue = RetryQueue(base_delay=10, jitter=0)
+    queue.push("a", 2, now=0)
+    queue.push("b", 3, now=0)
+
+    assert queue.pop_ready(now=5) is None
+    assert queue.next_ready_in(now=5) == 5
+    assert queue.pop_ready(now=10) == ("a", 2)
+    assert queue.pop_ready(now=10) is None
+    assert queue.pop_ready(now=20) == ("b", 3)
+    assert not queue
+    assert queue.next_ready_in() is None
+
+
+def test_retry_queue_drain_returns_everything_in_ready_order():
+    queue = RetryQueue(base_delay=10, jitter=0)
+    queue.push("late", 3, now=0)
+    queue.push("early", 2, now=0)
+
+    assert queue.drain() == [("early", 2), ("late", 3)]
+    assert len(queue) == 0
+
+
+def test_engine_spacing_is_per_engine():
+    spacing = EngineSpacing(delay_seconds=5, jitter=0)
+    spacing.used("yandex", now=100)
+
+    assert spacing.ready_in("yandex", now=102) == 3
+    assert spacing.ready_in("google", now=102) == 0
+    # Готовая система выбирается раньше той, что еще ждет паузу
+    assert spacing.pick(["yandex", "google"], now=102) == "google"
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (None, None),
+    ("", None),
+    (90, 90.0),
+    ("90", 90.0),
+    ("45s", 45.0),
+    ("15m", 900.0),
+    ("1h30m", 5400.0),
+    ("7d", 604800.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_parse_duration_time_of_day_is_within_a_day():
+    seconds = parse_duration("07:00")
+    assert 0 < seconds <= 24 * 3600
+
+
+def test_parse_duration_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_format_duration():
+    assert format_duration(45) == "45 сек"
+    assert format_duration(200) == "3 мин 20 сек"
+    assert format_duration(7500) == "2 ч 05 мин"
+
+
+def test_run_budget_eta_and_deadline():
+    budget = RunBudget(10, deadline=100)
+    start = budget.started_at
+    for second in range(1, 5):
+        budget.complete(now=start + second)
+
+    # 4 компании за 4 секунды: осталось 6 компаний, примерно 6 секунд
+    assert budget.eta(now=start + 4) == pytest.approx(6)
+    assert not budget.behind(now=start + 4)
+    assert budget.behind(now=start + 97)
+    assert not budget.expired(now=start + 99)
+    assert budget.expired(now=start + 100)
+
+
+def test_run_budget_without_deadline_never_expires():
+    budget = RunBudget(3, company_budget=30)
+    assert not budget.expired(now=budget.started_at + 10 ** 6)
+    assert budget.time_left() is None
+    assert budget.over_budget(30)
+    assert not budget.over_budget(29.9)
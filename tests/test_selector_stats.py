@@ -0,0 +1,65 @@
+"""
+Тесты статистики селекторов ссылок
+"""
+from utils.selector_stats import SelectorStats
+
+
+def test_plan_orders_by_recent_hit_rate():
+    stats = SelectorStats(smoothing=0.5)
+    for _ in range(3):
+        stats.plan("yandex", ["a", "b"])
+        stats.record("yandex", "a", 0)
+        stats.record("yandex", "b", 5)
+
+    assert [selector for selector, _ in stats.plan("yandex", ["a", "b"])] == ["b", "a"]
+
+
+def test_generic_selectors_stay_last_and_untrusted():
+    stats = SelectorStats(min_pages=1)
+    for _ in range(5):
+        stats.plan("yandex", ["specific", "generic"], generic=["generic"])
+        stats.record("yandex", "specific", 0)
+        stats.record("yandex", "generic", 10)
+
+    plan = stats.plan("yandex", ["specific", "generic"], generic=["generic"])
+    assert plan[-1] == ("generic", False)
+
+
+def test_trusted_after_enough_pages():
+    stats = SelectorStats(min_pages=3, short_circuit_rate=0.8)
+    assert stats.plan("yandex", ["a"]) == [("a", False)]
+    for _ in range(3):
+        stats.record("yandex", "a", 4)
+
+    assert stats.plan("yandex", ["a"]) == [("a", True)]
+
+
+def test_dead_selector_is_skipped_but_probed():
+    stats = SelectorStats(dead_after=2, probe_every=3)
+    for _ in range(2):
+        stats.record("yandex", "old", 0)
+    assert stats.is_dead("yandex", "old")
+
+    plans = [[selector for selector, _ in stats.plan("yandex", ["old", "new"])] for _ in range(3)]
+    assert plans[0] == ["new"]
+    assert plans[1] == ["new"]
+    # Каждая N-я страница проверяет и неработающие селекторы
+    assert "old" in plans[2]
+
+
+def test_all_dead_selectors_still_run():
+    stats = SelectorStats(dead_after=1, probe_every=100)
+    stats.record("yandex", "a", 0)
+
+    assert [selector for selector, _ in stats.plan("yandex", ["a"])] == ["a"]
+
+
+def test_statistics_persist_between_runs(tmp_path):
+    path = str(tmp_path / "selectors.json")
+    stats = SelectorStats(path)
+    stats.record("yandex", "a", 2)
+    stats.save()
+
+    summary = SelectorStats(path).summary()
+    assert summary["yandex"][0]["selector"] == "a"
+    assert summary["yandex"][0]["links_per_page"] == 2
@@ -0,0 +1,127 @@
+"""
+Самообучающийся черный список агрегаторов (справочники организаций, каталоги, отзовики).
+
+Сайт компании попадает в результаты поиска почти только по ее собственному названию,
+а справочник вроде rusprofile.ru - по названиям самых разных компаний. Поэтому для
+каждого регистрируемого домена считается, для скольких не связанных с ним компаний
+(название не совпадает с доменом) он встретился среди кандидатов. Домены, набравшие
+порог, считаются агрегаторами и отфильтровываются; статистика сохраняется между запусками.
+"""
+import re
+import copy
+import hashlib
+import threading
+
+from .helpers import registrable_domain, normalize_company_name, transliterate, load_json_state, save_json_atomic
+
+# Известные агрегаторы, которые отфильтровываются сразу, без обучения
+SEED_AGGREGATORS = [
+    'rusprofile.ru', 'list-org.com', 'checko.ru', 'zoon.ru', 'sbis.ru', 'audit-it.ru', 'spark-interfax.ru',
+    'zachestnyibiznes.ru', 'vbankcenter.ru', 'e-ecolog.ru', 'companium.ru', 'sravni.ru',
+    'orgpage.ru', 'yell.ru', 'flamp.ru', '2gis.ru', 'spravker.ru', 'hh.ru', 'otzovik.com', 'irecommend.ru'
+]
+
+class AggregatorStats:
+    """
+    Частота регистрируемых доменов среди кандидатов разных компаний с сохранением между запусками
+    """
+    def __init__(self, path=None, min_companies=5, seeds=None, max_tracked=50):
+        """
+        :param path: JSON-файл для сохранения статистики (None - только в памяти)
+        :param min_companies: Для скольких не связанных компаний должен встретиться домен,
+            чтобы считаться агрегатором
+        :param seeds: Заранее известные агрегаторы (по умолчанию SEED_AGGREGATORS)
+        :param max_tracked: Сколько компаний запоминать для домена (достаточно не меньше min_companies)
+        """
+        self.path = path
+        self.min_companies = min_companies
+        self.seeds = set(SEED_AGGREGATORS if seeds is None else seeds)
+        self.max_tracked = max(max_tracked, min_companies)
+        # Один экземпляр могут использовать несколько рабочих потоков
+        self._lock = threading.Lock()
+
+        # {домен: {'companies': [короткие хеши компаний]}}
+        self.domains = load_json_state(path, "статистику агрегаторов")
+
+    def is_aggregator(self, domain):
+        """Проверяет, что регистрируемый домен - известный или выученный агрегатор"""
+        if domain in self.seeds:
+            return True
+        stats = self.domains.get(domain)
+        return bool(stats) and len(stats["companies"]) >= self.min_companies
+
+    def filter(self, links, company_name=None):
+        """
+        Убирает ссылки на агрегаторы
+        :param links: Ссылки-кандидаты
+        :param company_name: Название компании: выученный агрегатор, похожий на него, не убирается
+            (популярный сайт компании мог встретиться и в результатах других компаний)
+        :return: Ссылки без агрегаторов
+        """
+        name = normalize_company_name(company_name)
+        kept = []
+        for link in links:
+            domain = registrable_domain(link)
+            if domain in self.seeds or (self.is_aggregator(domain) and not (name and related(name, domain))):
+                continue
+            kept.append(link)
+        return kept
+
+    def observe(self, company_name, links):
+        """
+        Учитывает кандидатов, найденных для компании
+        :param company_name: Название компании
+        :param links: Ссылки-кандидаты
+        """
+        name = normalize_company_name(company_name)
+        if not name:
+            return
+        # Запоминаем только хеш, чтобы не хранить список компаний пользователя в файле статистики
+        company_hash = hashlib.sha1(name.encode("utf-8")).hexdigest()[:10]
+
+        with self._lock:
+            for domain in {registrable_domain(link) for link in links}:
+                if not domain or domain in self.seeds or related(name, domain):
+                    continue
+                companies = self.domains.setdefault(domain, {"companies": []})["companies"]
+                if company_hash not in companies and len(companies) < self.max_tracked:
+                    companies.append(company_hash)
+
+    def learned(self):
+        """
+        Выученные агрегаторы
+        :return: Список (домен, число компаний) по убыванию числа компаний
+        """
+        rows = [(domain, len(stats["companies"])) for domain, stats in self.domains.items()
+                if domain not in self.seeds and len(stats["companies"]) >= self.min_companies]
+        return sorted(rows, key=lambda row: -row[1])
+
+    def summary(self):
+        """Сводка для метрик запуска"""
+        return {
+            "seeded": len(self.seeds),
+            "learned": [{"domain": domain, "companies": companies} for domain, companies in self.learned()],
+        }
+
+    def save(self):
+        """Сохраняет статистику в файл (если он задан)"""
+        if not self.path:
+            return
+        # Снимок под блокировкой: рабочие потоки могут дополнять статистику во время записи
+        with self._lock:
+            domains = copy.deepcopy(self.domains)
+        save_json_atomic(self.path, domains)
+
+def related(company_name, domain):
+    """
+    Похоже ли имя домена на название компании (тогда это, скорее всего, ее собственный сайт)
+    :param company_name: Нормализованное название компании
+    :param domain: Регистрируемый домен
+    """
+    label = re.sub(r'[^a-z0-9]', '', domain.split('.')[0])
+    words = [re.sub(r'[^a-z0-9]', '', transliterate(word)) for word in company_name.split()]
+    words = [word for word in words if len(word) >= 3]
+    if not label or not words:
+        return False
+    joined = ''.join(words)
+    return label in joined or joined in label or any(word in label for word in words)
@@ -0,0 +1,133 @@
+"""
+Потоковая запись результатов поиска в колоночные форматы (Parquet и Arrow IPC)
+"""
+import os
+
+# Поддерживаемые колоночные форматы вывода
+COLUMNAR_FORMATS = ["parquet", "arrow"]
+
+# Порядок колонок в выходном файле
+RESULT_COLUMNS = ["company", "website", "status", "engine", "attempts", "latency_ms", "candidates", "checked_at",
+                  "carried", "requests", "bytes", "bytes_by_type", "ttfb_ms", "dom_ready_ms"]
+
+def result_schema():
+    """
+    Возвращает схему pyarrow для записей с историей поиска
+    :return: pyarrow.Schema
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field("company", pa.string(), nullable=False),
+        pa.field("website", pa.string()),
+        # Обычные строки, а не dictionary: в Arrow IPC словарь нельзя менять между группами строк,
+        # а Parquet и так кодирует повторяющиеся значения словарем
+        pa.field("status", pa.string()),
+        pa.field("engine", pa.string()),
+        pa.field("attempts", pa.int16()),
+        pa.field("latency_ms", pa.float32()),
+        pa.field("candidates", pa.list_(pa.string())),
+        pa.field("checked_at", pa.timestamp("s")),
+        # Результат перенесен из прошлого запуска (engine и checked_at - того запуска)
+        pa.field("carried", pa.bool_()),
+        # Сетевые метрики загрузок страниц результатов (нет у компаний, найденных без браузера)
+        pa.field("requests", pa.int32()),
+        pa.field("bytes", pa.int64()),
+        pa.field("bytes_by_type", pa.map_(pa.string(), pa.int64())),
+        pa.field("ttfb_ms", pa.float32()),
+        pa.field("dom_ready_ms", pa.float32()),
+    ])
+
+class ColumnarResultWriter:
+    """
+    Пишет записи о поиске в Parquet или Arrow IPC группами строк по мере выполнения поиска
+    """
+    def __init__(self, path, output_format="parquet", row_group_size=1000):
+        """
+        :param path: Путь к выходному файлу
+        :param output_format: 'parquet' или 'arrow'
+        :param row_group_size: Количество строк в одной группе (записывается на диск целиком)
+        """
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Поддерживаемые колоночные форматы: {', '.join(COLUMNAR_FORMATS)}")
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Для записи в Parquet/Arrow установите пакет pyarrow: pip install pyarrow")
+
+        self.path = path
+        self.output_format = output_format
+        self.row_group_size = max(1, int(row_group_size))
+        self.schema = result_schema()
+        self.rows_written = 0
+        self._buffer = {column: [] for column in RESULT_COLUMNS}
+        self._writer = None
+        self._sink = None
+
+    def _open(self):
+        """Открывает файл для записи при первой группе строк"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.output_format == "parquet":
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, record):
+        """
+        Добавляет запись в буфер и сбрасывает группу строк, если буфер заполнен
+        :param record: Словарь с ключами из RESULT_COLUMNS
+        """
+        for column in RESULT_COLUMNS:
+            self._buffer[column].append(record.get(column))
+
+        if len(self._buffer["company"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные строки как одну группу"""
+        import pyarrow as pa
+
+        count = len(self._buffer["company"])
+        if not count:
+            return
+
+        if self._writer is None:
+            self._open()
+
+        batch = pa.RecordBatch.from_pydict(self._buffer, schema=self.schema)
+        if self.output_format == "parquet":
+            self._writer.write_batch(batch, row_group_size=count)
+        else:
+            self._writer.write_batch(batch)
+
+        self.rows_written += count
+        self._buffer = {column: [] for column in RESULT_COLUMNS}
+
+    def close(self):
+        """Сбрасывает остаток буфера и закрывает файл"""
+        self.flush()
+
+        # Пустой запуск все равно оставляет валидный файл со схемой
+        if self._writer is None:
+            self._open()
+
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,108 @@
+"""
+Повторный запуск по разнице с предыдущими результатами: ищутся только новые компании
+и (по желанию) давно не найденные, остальные результаты переносятся из прошлого файла.
+"""
+import os
+from datetime import datetime, timedelta
+
+from .helpers import normalize_company_name
+
+# Отметка о ненайденном сайте в CSV-файле результатов
+NOT_FOUND = "Не найден"
+
+def company_key(company_name):
+    """
+    Ключ для сравнения компаний между запусками
+    :param company_name: Название компании
+    :return: Нормализованное название (или название в нижнем регистре, если после нормализации ничего не осталось)
+    """
+    return normalize_company_name(company_name) or str(company_name).strip().lower()
+
+def _missing(value):
+    # NaN - единственное значение, которое не равно самому себе
+    return value is None or value != value or value == ""
+
+def load_previous_results(path):
+    """
+    Читает файл результатов прошлого запуска: CSV ('Company Name', 'Website', 'Checked At')
+    или Parquet/Arrow (company, website, status, engine, checked_at)
+    :param path: Путь к файлу
+    :return: Словарь {ключ компании: {'company', 'website', 'status', 'engine', 'checked_at'}}. Если в файле нет
+        времени проверки, для всех строк берется время изменения файла, а если нет поисковой системы - None
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        df = pd.read_parquet(path)
+    elif extension in (".arrow", ".feather"):
+        df = pd.read_feather(path)
+    else:
+        df = pd.read_csv(path)
+        df = df.rename(columns={"Company Name": "company", "Website": "website", "Checked At": "checked_at"})
+
+    if "company" not in df.columns:
+        raise ValueError(f"В файле {path} нет столбца с названиями компаний")
+
+    file_time = datetime.fromtimestamp(os.path.getmtime(path)).replace(microsecond=0)
+    has_checked_at = "checked_at" in df.columns
+
+    previous = {}
+    for row in df.to_dict("records"):
+        company = row["company"]
+        if _missing(company):
+            continue
+
+        website = row.get("website")
+        if _missing(website) or website == NOT_FOUND:
+            website = None
+
+        status = row.get("status")
+        if _missing(status):
+            status = "found" if website else "not_found"
+
+        engine = row.get("engine")
+        if _missing(engine):
+            engine = None
+
+        # Пропущенные компании не проверялись, у них нет времени проверки
+        checked_at = row.get("checked_at") if has_checked_at else file_time
+        checked_at = None if _missing(checked_at) else pd.Timestamp(checked_at).to_pydatetime()
+
+        previous[company_key(company)] = {
+            "company": company,
+            "website": website,
+            "status": status,
+            "engine": engine,
+            "checked_at": checked_at,
+        }
+
+    return previous
+
+def plan_delta(companies, previous, retry_missed_after=None, now=None):
+    """
+    Делит компании нового списка на те, что нужно искать, и те, результат которых переносится
+    :param companies: Названия компаний нового списка
+    :param previous: Результаты прошлого запуска (load_previous_results)
+    :param retry_missed_after: Повторять поиск для ненайденных компаний, проверенных раньше, чем столько
+        секунд назад (0 - все ненайденные, None - не повторять)
+    :param now: Текущее время (datetime), по умолчанию берется автоматически
+    :return: (компании для поиска, [(компания, прошлый результат)] для переноса)
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(seconds=retry_missed_after) if retry_missed_after is not None else None
+
+    to_search = []
+    carried = []
+    for company in companies:
+        row = previous.get(company_key(company))
+
+        if row is None or row["checked_at"] is None:
+            # Новая компания или компания, до которой прошлый запуск не дошел
+            to_search.append(company)
+        elif not row["website"] and cutoff is not None and row["checked_at"] <= cutoff:
+            to_search.append(company)
+        else:
+            carried.append((company, row))
+
+    return to_search, carried
@@ -0,0 +1,289 @@
+"""
+Быстрый подбор домена по названию компании без обращения к поисковым системам.
+
+Название нормализуется и транслитерируется, из него строится ранжированный список
+доменов-кандидатов, кандидаты параллельно проверяются через DNS и HTTP, и домен
+принимается, только если заголовок страницы совпадает с названием компании.
+"""
+import math
+import re
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .helpers import VALID_TLDS, normalize_company_name, transliterate, clean_url, registrable_domain
+
+# Доменные зоны для подбора в порядке приоритета (все они входят в VALID_TLDS)
+GUESS_TLDS = [tld for tld in ['ru', 'рф', 'com', 'su', 'net', 'org', 'pro', 'online', 'info', 'biz']
+              if tld in VALID_TLDS]
+
+# Альтернативные написания букв, которые часто встречаются в доменах
+TRANSLIT_ALTERNATIVES = {'х': 'h', 'ц': 'c', 'щ': 'sh', 'й': 'i', 'ю': 'u', 'я': 'ia', 'ж': 'j'}
+
+# Признаки припаркованных и продающихся доменов в заголовке страницы
+PARKED_MARKERS = ['домен продается', 'домен продаётся', 'domain for sale', 'this domain', 'buy this domain',
+                  'припаркован', 'parked', 'сайт в разработке', 'index of /']
+
+# Регистраторы и хостинги, чье имя в заголовке означает их страницу-заглушку. Если же сам
+# проверяемый сайт или компания называется так же, это не заглушка
+HOSTING_MARKERS = {'reg.ru': 'reg', 'nic.ru': 'nic', 'timeweb': 'timeweb'}
+
+# Какая доля значимых слов названия должна найтись среди слов заголовка
+TITLE_MATCH_SHARE = 0.75
+
+# Сколько байт страницы читать для поиска заголовка
+TITLE_READ_BYTES = 64 * 1024
+
+def transliteration_variants(text):
+    """
+    Возвращает варианты транслитерации в порядке убывания вероятности
+    :param text: Текст на кириллице
+    :return: Список уникальных вариантов
+    """
+    base = transliterate(text)
+    alternative = ''.join(TRANSLIT_ALTERNATIVES.get(char, char) for char in text.lower())
+    alternative = transliterate(alternative)
+
+    variants = [base, base.replace('ks', 'x'), alternative, alternative.replace('ks', 'x')]
+    return list(dict.fromkeys(variants))
+
+def _domain_label(text):
+    """Превращает текст в метку домена (латиница, цифры и дефис) или возвращает None"""
+    label = re.sub(r'[^a-z0-9-]', '', text.lower()).strip('-')
+    label = re.sub(r'-{2,}', '-', label)
+    if 2 <= len(label) <= 63:
+        return label
+    return None
+
+def candidate_domains(company_name, tlds=None, max_candidates=24):
+    """
+    Строит ранжированный список доменов-кандидатов для компании
+    :param company_name: Название компании
+    :param tlds: Список доменных зон (по умолчанию GUESS_TLDS)
+    :param max_candidates: Максимальное количество кандидатов
+    :return: Список доменов (кириллические домены .рф/.рус в punycode)
+    """
+    tlds = tlds or GUESS_TLDS
+    name = normalize_company_name(company_name)
+    if not name:
+        return []
+
+    words = [word for word in re.split(r'[\s-]+', name) if word]
+
+    # Варианты написания названия: слитно, через дефис, самое длинное слово
+    spellings = [''.join(words)]
+    if len(words) > 1:
+        spellings.append('-'.join(words))
+        spellings.append(max(words, key=len))
+
+    latin_labels = []
+    for spelling in spellings:
+        for variant in transliteration_variants(spelling):
+            label = _domain_label(variant)
+            if label:
+                latin_labels.append(label)
+    latin_labels = list(dict.fromkeys(latin_labels))
+
+    cyrillic_labels = []
+    for spelling in spellings:
+        label = re.sub(r'[^а-яё0-9-]', '', spelling).strip('-')
+        if label and re.search(r'[а-яё]', label):
+            cyrillic_labels.append(label)
+    cyrillic_labels = list(dict.fromkeys(cyrillic_labels))
+
+    # Ранжируем: сначала лучшие написания во всех зонах, затем менее вероятные
+    candidates = []
+    for rank in range(max(len(latin_labels), len(cyrillic_labels))):
+        for tld in tlds:
+            labels = cyrillic_labels if re.search(r'[а-яё]', tld) else latin_labels
+            if rank < len(labels):
+                try:
+                    candidates.append(f"{labels[rank]}.{tld}".encode('idna').decode('ascii'))
+                except UnicodeError:
+                    continue
+
+    return list(dict.fromkeys(candidates))[:max_candidates]
+
+def _words(text):
+    """Значимые слова нормализованного текста (не короче двух символов)"""
+    return [word for word in re.split(r'[^a-zа-я0-9]+', normalize_company_name(text)) if len(word) >= 2]
+
+def title_matches(company_name, title):
+    """
+    Проверяет, что заголовок страницы относится к компании. Слова сравниваются целиком, а не как
+    подстроки, иначе короткое или общее слово названия ('Альфа', 'Строй') совпадает почти с любым заголовком
+    :param company_name: Название компании
+    :param title: Заголовок страницы
+    :return: True, если среди слов заголовка есть большинство (TITLE_MATCH_SHARE) значимых слов названия
+    """
+    if not title:
+        return False
+
+    words = _words(company_name)
+    if not words:
+        return False
+
+    # Слова заголовка и их латинское написание: название может быть написано в заголовке латиницей
+    title_words = set()
+    for word in _words(title):
+        title_words.update([word, transliterate(word)])
+
+    # Название из нескольких слов может быть написано слитно, как в домене ('romashkaplus')
+    if any(variant in title_words for variant in transliteration_variants(''.join(words))):
+        return True
+
+    matched = sum(1 for word in words
+                  if word in title_words or any(variant in title_words for variant in transliteration_variants(word)))
+    return matched >= math.ceil(TITLE_MATCH_SHARE * len(words))
+
+def is_parked(title, domain, company_name=''):
+    """
+    Проверяет, что страница - заглушка регистратора или хостинга, а не сайт компании
+    :param title: Заголовок страницы
+    :param domain: Проверяемый домен
+    :param company_name: Название компании
+    :return: True, если заголовок похож на заглушку
+    """
+    # Маркеры содержат точки и слеши, которые нормализация названия убирает
+    title_lower = (title or '').lower()
+    if any(marker in title_lower for marker in PARKED_MARKERS):
+        return True
+
+    # Имя регистратора в заголовке - заглушка, только если сайт и компания называются иначе
+    own = set(registrable_domain(domain).split('.')[:1])
+    own.update(transliterate(word) for word in _words(company_name))
+    return any(marker in title_lower and name not in own for marker, name in HOSTING_MARKERS.items())
+
+def resolves(domain):
+    """
+    Проверяет, что домен резолвится в DNS
+    :param domain: Домен (в punycode)
+    :return: True, если у домена есть адрес
+    """
+    try:
+        return bool(socket.getaddrinfo(domain, 443, proto=socket.IPPROTO_TCP))
+    except (socket.gaierror, UnicodeError, OSError):
+        return False
+
+def fetch_title(domain, timeout=5, session=None):
+    """
+    Загружает главную страницу домена и извлекает заголовок
+    :param domain: Домен
+    :param timeout: Таймаут запроса в секундах
+    :param session: requests.Session (опционально)
+    :return: (final_url, title) или (None, None), если страница недоступна
+    """
+    import requests
+
+    client = session or requests
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/120.0.0.0 Safari/537.36",
+        "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+    }
+
+    for scheme in ("https", "http"):
+        try:
+            response = client.get(f"{scheme}://{domain}/", headers=headers, timeout=timeout,
+                                  allow_redirects=True, stream=True)
+            try:
+                if response.status_code >= 400:
+                    continue
+                content = response.raw.read(TITLE_READ_BYTES, decode_content=True) or b''
+                encoding = response.encoding or 'utf-8'
+                if encoding.lower() == 'iso-8859-1':
+                    # requests подставляет latin-1, если кодировка не указана в заголовках
+                    encoding = response.apparent_encoding or 'utf-8'
+                html = content.decode(encoding, errors='replace')
+            finally:
+                response.close()
+
+            match = re.search(r'<title[^>]*>(.*?)</title>', html, re.IGNORECASE | re.DOTALL)
+            title = re.sub(r'\s+', ' ', match.group(1)).strip() if match else ''
+            return response.url, title
+        except requests.RequestException:
+            continue
+
+    return None, None
+
+def probe_domain(company_name, domain, timeout=5, session=None):
+    """
+    Проверяет один домен-кандидат
+    :return: Словарь с результатом проверки: domain, resolved, url, title, accepted,
+        started_at и finished_at (time.perf_counter)
+    """
+    result = {'domain': domain, 'resolved': False, 'url': None, 'title': None, 'accepted': False,
+              'started_at': time.perf_counter(), 'finished_at': None}
+
+    try:
+        if not resolves(domain):
+            return result
+        result['resolved'] = True
+
+        url, title = fetch_title(domain, timeout=timeout, session=session)
+        result['url'] = url
+        result['title'] = title
+        # Перенаправление на другой домен (хостинг, агрегатор, продавец доменов) - не сайт компании
+        same_site = bool(url) and registrable_domain(url) == registrable_domain(domain)
+        result['accepted'] = (same_site and not is_parked(title, domain, company_name)
+                              and title_matches(company_name, title))
+        return result
+    finally:
+        result['finished_at'] = time.perf_counter()
+
+def guess_domains(companies, tlds=None, max_candidates=12, max_workers=32, timeout=5, progress_callback=None):
+    """
+    Подбирает домены для списка компаний, параллельно проверяя кандидатов через DNS и HTTP
+    :param companies: Список названий компаний
+    :param tlds: Доменные зоны для подбора (по умолчанию GUESS_TLDS)
+    :param max_candidates: Максимум кандидатов на одну компанию
+    :param max_workers: Количество параллельных проверок
+    :param timeout: Таймаут одной проверки в секундах
+    :param progress_callback: Функция progress_callback(done, total), вызываемая по мере проверки компаний
+    :return: Словарь {компания: запись}, где запись содержит website (или None), candidates
+        (домены, которые резолвятся), attempts (число проверенных доменов) и latency_ms
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    results = {}
+    total = len(companies)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Компании обрабатываются порциями, чтобы не держать в памяти задания для всего списка
+            chunk_size = max(1, max_workers)
+            for start in range(0, total, chunk_size):
+                chunk = companies[start:start + chunk_size]
+                futures = {
+                    company: [executor.submit(probe_domain, company, domain, timeout, session)
+                              for domain in candidate_domains(company, tlds, max_candidates)]
+                    for company in chunk
+                }
+
+                for company, company_futures in futures.items():
+                    probes = [future.result() for future in company_futures]
+                    # Кандидаты уже отсортированы по рангу, берем первого подтвержденного
+                    accepted = next((probe for probe in probes if probe['accepted']), None)
+                    # Время считается по проверкам самой компании, а не по всей порции
+                    latency_ms = 0.0
+                    if probes:
+                        latency_ms = (max(probe['finished_at'] for probe in probes)
+                                      - min(probe['started_at'] for probe in probes)) * 1000
+                    results[company] = {
+                        'website': clean_url(accepted['url']) if accepted else None,
+                        'candidates': [probe['domain'] for probe in probes if probe['resolved']],
+                        'attempts': len(probes),
+                        'latency_ms': latency_ms,
+                    }
+
+                if progress_callback:
+                    progress_callback(min(start + chunk_size, total), total)
+    finally:
+        session.close()
+
+    return results
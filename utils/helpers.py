@@ -1,8 +1,31 @@
+import os
+import json
 import random
 import time
 import re
+import threading
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
+# Доменные зоны верхнего уровня, которые считаются валидными для сайтов компаний
+VALID_TLDS = ['com', 'ru', 'org', 'net', 'edu', 'gov', 'io', 'co', 'info', 'biz', 
+              'рф', 'ua', 'uk', 'de', 'fr', 'es', 'it', 'cn', 'jp', 'kr', 'br',
+              'au', 'nz', 'ca', 'eu', 'me', 'tv', 'pro', 'online', 'store', 'shop',
+              'app', 'blog', 'dev', 'tech', 'site', 'web', 'club', 'xyz', 'agency',
+              'su', 'by', 'kz', 'am', 'az', 'ge', 'kg', 'md', 'tj', 'tm', 'uz',
+              'cymru', 'london', 'moscow', 'рус', 'tatar', '移动', '健康', '娱乐']
+
+# Организационно-правовые формы, которые не являются частью названия компании
+LEGAL_FORMS = ['ооо', 'оао', 'зао', 'пао', 'нао', 'ао', 'ип', 'нпо', 'нпп', 'гк', 'тд', 'фгуп', 'муп', 'гуп',
+               'llc', 'ltd', 'inc', 'corp', 'gmbh', 'jsc', 'группа компаний', 'торговый дом']
+
+# Таблица транслитерации (по практике доменных имен, близко к ГОСТ 7.79-2000 Б)
+TRANSLIT_TABLE = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+}
+
 def is_valid_website(url):
     """
     Проверяет, является ли URL валидным сайтом компании
@@ -44,15 +67,9 @@ def is_valid_website(url):
             
         # Проверка на валидное доменное имя верхнего уровня (TLD)
         tld = parts[-1].lower()
-        valid_tlds = ['com', 'ru', 'org', 'net', 'edu', 'gov', 'io', 'co', 'info', 'biz', 
-                      'рф', 'ua', 'uk', 'de', 'fr', 'es', 'it', 'cn', 'jp', 'kr', 'br',
-                      'au', 'nz', 'ca', 'eu', 'me', 'tv', 'pro', 'online', 'store', 'shop',
-                      'app', 'blog', 'dev', 'tech', 'site', 'web', 'club', 'xyz', 'agency',
-                      'su', 'by', 'kz', 'am', 'az', 'ge', 'kg', 'md', 'tj', 'tm', 'uz',
-                      'cymru', 'london', 'moscow', 'рус', 'tatar', '移动', '健康', '娱乐']
         
         # Поддержка всех распространенных TLD через проверку длины
-        if tld not in valid_tlds and len(tld) > 5:
+        if tld not in VALID_TLDS and len(tld) > 5:
             return False
             
         return True
@@ -132,6 +149,27 @@ def clean_url(url):
         print(f"Ошибка при очистке URL {url}: {e}")
         return url
 
+# Общедоступные домены второго уровня: регистрируются имена третьего уровня (company.msk.ru)
+PUBLIC_SECOND_LEVEL = ['com.ru', 'net.ru', 'org.ru', 'pp.ru', 'msk.ru', 'spb.ru', 'msk.su', 'spb.su',
+                       'com.ua', 'org.ua', 'kiev.ua', 'com.kz', 'org.kz', 'com.by', 'co.uk', 'org.uk',
+                       'com.au', 'co.jp', 'com.cn', 'com.br']
+
+def registrable_domain(url):
+    """
+    Возвращает регистрируемый домен адреса: https://spb.zoon.ru/... -> zoon.ru
+    :param url: URL или домен
+    :return: Домен в нижнем регистре (пустая строка, если домена нет)
+    """
+    if not url or not isinstance(url, str):
+        return ''
+    
+    netloc = urlparse(url if '//' in url else '//' + url).netloc.lower()
+    host = netloc.rpartition('@')[2].partition(':')[0].strip('.')
+    labels = host.split('.')
+    
+    size = 3 if '.'.join(labels[-2:]) in PUBLIC_SECOND_LEVEL else 2
+    return '.'.join(labels[-size:])
+
 def random_delay(min_seconds=1, max_seconds=3):
     """
     Создает случайную задержку для имитации человеческого поведения
@@ -141,6 +179,142 @@ def random_delay(min_seconds=1, max_seconds=3):
     delay = random.uniform(min_seconds, max_seconds)
     time.sleep(delay)
 
+def process_tree_rss_mb(pid):
+    """
+    Считает суммарную резидентную память процесса и всех его потомков
+    (для chromedriver это сам Chrome со всеми процессами вкладок и рендереров)
+    :param pid: PID корневого процесса
+    :return: Объем памяти в мегабайтах или None, если его не удалось определить
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    
+    try:
+        if psutil is not None:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        
+        # Без psutil читаем /proc напрямую (Linux)
+        if not os.path.isdir('/proc'):
+            return None
+        
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # Имя процесса в скобках может содержать пробелы, поэтому режем по последней скобке
+                    fields = f.read().rsplit(')', 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+        
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        total = 0
+        stack = [pid]
+        while stack:
+            current = stack.pop()
+            stack.extend(children.get(current, []))
+            try:
+                with open(f'/proc/{current}/statm') as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, IndexError, ValueError):
+                pass
+        return total / (1024 * 1024)
+    
+    except Exception as e:
+        print(f"Ошибка при определении памяти процесса {pid}: {e}")
+        return None
+
+def normalize_company_name(company_name):
+    """
+    Приводит название компании к каноническому виду для сравнения: нижний регистр,
+    без кавычек, знаков препинания и организационно-правовой формы
+    :param company_name: Название компании
+    :return: Нормализованное название
+    """
+    if not company_name or not isinstance(company_name, str):
+        return ''
+    
+    name = company_name.lower().replace('ё', 'е')
+    
+    # Убираем кавычки и знаки препинания, дефис внутри слов сохраняем
+    name = re.sub(r'[«»"\'`„“”.,;:!?()\[\]{}/\\|<>_+=*&^%$#@~]', ' ', name)
+    name = re.sub(r'\s+', ' ', name).strip()
+    
+    # Убираем организационно-правовую форму в начале и в конце названия
+    for form in LEGAL_FORMS:
+        if name.startswith(form + ' '):
+            name = name[len(form) + 1:]
+        if name.endswith(' ' + form):
+            name = name[:-len(form) - 1]
+    
+    return name.strip(' -')
+
+def transliterate(text):
+    """
+    Транслитерирует кириллицу в латиницу (остальные символы не меняются)
+    :param text: Исходный текст
+    :return: Текст латиницей
+    """
+    return ''.join(TRANSLIT_TABLE.get(char, char) for char in text.lower())
+
+# Названия столбца с компаниями во входных данных в порядке приоритета
+COMPANY_COLUMNS = ['Company Name', 'company name', 'CompanyName', 'company_name', 'name', 'Name',
+                   'Название', 'название', 'Компания', 'компания']
+
+def detect_company_column(columns):
+    """
+    Определяет столбец с названиями компаний
+    :param columns: Список названий столбцов
+    :return: Название столбца (первый столбец, если известных нет) или None, если столбцов нет
+    """
+    columns = list(columns)
+    for column in COMPANY_COLUMNS:
+        if column in columns:
+            return column
+    return columns[0] if columns else None
+
+def clean_company_names(values):
+    """
+    Очищает список названий компаний: убирает пустые значения и пробелы по краям,
+    удаляет дубликаты с сохранением исходного порядка
+    :param values: Итерируемый набор названий (строки, числа, None или NaN)
+    :return: Список уникальных названий
+    """
+    companies = []
+    for value in values:
+        # NaN - единственное значение, которое не равно самому себе
+        if value is None or value != value:
+            continue
+        name = str(value).strip()
+        if name:
+            companies.append(name)
+    return list(dict.fromkeys(companies))
+
+def companies_from_table(table):
+    """
+    Извлекает очищенный список компаний из таблицы или списка
+    :param table: pandas.DataFrame (столбец определяется detect_company_column) или итерируемый набор названий
+    :return: Список уникальных названий
+    """
+    if hasattr(table, 'columns'):
+        column = detect_company_column(table.columns)
+        if column is None:
+            return []
+        return clean_company_names(table[column].tolist())
+    return clean_company_names(table)
+
 def format_search_query(company_name):
     """
     Форматирует название компании для поискового запроса
@@ -161,6 +335,42 @@ def format_search_query(company_name):
     
     return query
 
+def load_json_state(path, description="состояние"):
+    """
+    Загружает состояние, сохраняемое между запусками (статистика селекторов, агрегаторов и т.п.)
+    :param path: JSON-файл (None или отсутствующий файл - пустое состояние)
+    :param description: Что загружается - для сообщения об ошибке
+    :return: Словарь из файла или пустой словарь
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Не удалось загрузить {description} из {path}: {e}")
+        return {}
+
+def save_json_atomic(path, data):
+    """
+    Сохраняет состояние в JSON-файл. Пишет во временный файл и переименовывает его,
+    чтобы сбой во время записи не повредил уже сохраненное состояние
+    :param path: JSON-файл (None - ничего не сохранять)
+    :param data: Данные для сохранения
+    """
+    if not path:
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Временный файл у каждого процесса и потока свой
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
 # Тестовый код для проверки функций
 if __name__ == "__main__":
     test_companies = [
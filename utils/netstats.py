@@ -0,0 +1,207 @@
+"""
+Сетевые метрики загрузки страниц результатов по событиям Chrome DevTools.
+
+Chrome передает события Network.* в журнал производительности (goog:loggingPrefs), который
+chromedriver отдает через driver.get_log('performance'), а время готовности DOM берется
+командой Performance.getMetrics по тому же каналу CDP. По событиям одной загрузки считаются
+число запросов, переданные байты по типам ресурсов, время до первого байта документа
+и время до DOMContentLoaded.
+"""
+import json
+
+# Типы ресурсов, которые идут в сводку отдельно (остальные попадают в 'Other')
+RESOURCE_TYPES = ["Document", "Script", "Stylesheet", "Image", "Font", "XHR", "Fetch", "Media"]
+
+def enable_performance_log(chrome_options):
+    """
+    Включает журнал производительности Chrome с событиями Network.*
+    :param chrome_options: selenium.webdriver.chrome.options.Options
+    """
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+def enable_performance_metrics(driver):
+    """Включает домен Performance, чтобы Performance.getMetrics возвращал время загрузки"""
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+    except Exception as e:
+        print(f"Не удалось включить метрики производительности Chrome: {e}")
+
+def read_events(driver):
+    """
+    Забирает накопленные события сети из журнала производительности (журнал при этом очищается)
+    :param driver: Драйвер Chrome с включенным журналом производительности
+    :return: Список событий {'method', 'params'}
+    """
+    events = []
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get("method", "").startswith("Network."):
+            events.append(message)
+    return events
+
+def summarize_events(events):
+    """
+    Сводка сетевых событий одной загрузки
+    :param events: События из read_events
+    :return: Словарь requests, bytes, bytes_by_type и ttfb_ms (время до первого байта
+        первого документа: от начала запроса до получения заголовков ответа; None, если документа нет)
+    """
+    types = {}
+    sizes = {}
+    requests = 0
+    ttfb_ms = None
+
+    for event in events:
+        method = event.get("method")
+        params = event.get("params", {})
+        request_id = params.get("requestId")
+
+        if method == "Network.requestWillBeSent":
+            requests += 1
+            types[request_id] = params.get("type") or types.get(request_id) or "Other"
+        elif method == "Network.responseReceived":
+            resource_type = params.get("type") or types.get(request_id) or "Other"
+            types[request_id] = resource_type
+            timing = params.get("response", {}).get("timing") or {}
+            if resource_type == "Document" and ttfb_ms is None and timing:
+                first_byte = timing.get("receiveHeadersStart", -1)
+                if first_byte is None or first_byte < 0:
+                    first_byte = timing.get("receiveHeadersEnd", -1)
+                if first_byte is not None and first_byte >= 0:
+                    ttfb_ms = round(first_byte, 1)
+        elif method == "Network.loadingFinished":
+            # encodedDataLength - все байты ответа по сети, включая заголовки
+            sizes[request_id] = sizes.get(request_id, 0) + int(params.get("encodedDataLength") or 0)
+
+    bytes_by_type = {}
+    for request_id, size in sizes.items():
+        resource_type = types.get(request_id, "Other")
+        if resource_type not in RESOURCE_TYPES:
+            resource_type = "Other"
+        bytes_by_type[resource_type] = bytes_by_type.get(resource_type, 0) + size
+
+    return {
+        "requests": requests,
+        "bytes": sum(bytes_by_type.values()),
+        "bytes_by_type": bytes_by_type,
+        "ttfb_ms": ttfb_ms,
+    }
+
+def dom_ready_ms(driver):
+    """
+    Время от начала навигации до DOMContentLoaded текущей страницы
+    :return: Миллисекунды или None, если страница еще не готова или метрики недоступны
+    """
+    metrics = {item["name"]: item["value"]
+               for item in driver.execute_cdp_cmd("Performance.getMetrics", {}).get("metrics", [])}
+    start = metrics.get("NavigationStart")
+    ready = metrics.get("DomContentLoaded")
+    if not start or not ready or ready < start:
+        return None
+    return round((ready - start) * 1000, 1)
+
+def page_load_metrics(driver, dom_ready=True):
+    """
+    Сетевые метрики загрузки с момента прошлого вызова
+    :param driver: Драйвер Chrome с включенным журналом производительности
+    :param dom_ready: Запрашивать время готовности DOM активной вкладки
+    :return: Словарь из summarize_events с ключом dom_ready_ms или None, если метрики недоступны
+    """
+    try:
+        metrics = summarize_events(read_events(driver))
+    except Exception as e:
+        print(f"Не удалось получить сетевые события браузера: {e}")
+        return None
+
+    metrics["dom_ready_ms"] = None
+    if dom_ready:
+        try:
+            metrics["dom_ready_ms"] = dom_ready_ms(driver)
+        except Exception as e:
+            print(f"Не удалось получить время загрузки страницы: {e}")
+    return metrics
+
+def merge_metrics(total, metrics):
+    """
+    Складывает метрики нескольких попыток по одной компании
+    :param total: Метрики прошлых попыток или None
+    :param metrics: Метрики очередной попытки или None
+    :return: Суммарные запросы и байты; время до первого байта и готовности DOM - последней попытки
+    """
+    if not metrics:
+        return total
+    if not total:
+        return dict(metrics, bytes_by_type=dict(metrics["bytes_by_type"]))
+    merged = dict(total, bytes_by_type=dict(total["bytes_by_type"]))
+    merged["requests"] += metrics["requests"]
+    merged["bytes"] += metrics["bytes"]
+    for resource_type, size in metrics["bytes_by_type"].items():
+        merged["bytes_by_type"][resource_type] = merged["bytes_by_type"].get(resource_type, 0) + size
+    for key in ("ttfb_ms", "dom_ready_ms"):
+        if metrics.get(key) is not None:
+            merged[key] = metrics[key]
+    return merged
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class NetworkStats:
+    """
+    Сетевые метрики загрузок за весь запуск: запросы, байты по типам ресурсов и по прокси,
+    распределения времени до первого байта и готовности DOM
+    """
+    def __init__(self):
+        self.loads = 0
+        self.requests = 0
+        self.bytes = 0
+        self.bytes_by_type = {}
+        self.bytes_by_proxy = {}
+        self.ttfb_ms = []
+        self.dom_ready_ms = []
+
+    def add(self, metrics, proxy=None, loads=1):
+        """
+        Учитывает метрики загрузки
+        :param metrics: Словарь из page_load_metrics (None - пропускается)
+        :param proxy: Прокси, через который шла загрузка (None - напрямую)
+        :param loads: Сколько загрузок страниц покрывают метрики
+        """
+        if not metrics:
+            return
+        self.loads += loads
+        self.requests += metrics["requests"]
+        self.bytes += metrics["bytes"]
+        for resource_type, size in metrics["bytes_by_type"].items():
+            self.bytes_by_type[resource_type] = self.bytes_by_type.get(resource_type, 0) + size
+        proxy = proxy or "direct"
+        self.bytes_by_proxy[proxy] = self.bytes_by_proxy.get(proxy, 0) + metrics["bytes"]
+        if metrics.get("ttfb_ms") is not None:
+            self.ttfb_ms.append(metrics["ttfb_ms"])
+        if metrics.get("dom_ready_ms") is not None:
+            self.dom_ready_ms.append(metrics["dom_ready_ms"])
+
+    def summary(self):
+        """Сводка для метрик запуска"""
+        def distribution(values):
+            if not values:
+                return None
+            return {"avg": round(sum(values) / len(values), 1), "p50": percentile(values, 0.5),
+                    "p95": percentile(values, 0.95), "max": max(values)}
+
+        return {
+            "loads": self.loads,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "bytes_per_load": round(self.bytes / self.loads) if self.loads else None,
+            "bytes_by_type": dict(sorted(self.bytes_by_type.items(), key=lambda item: -item[1])),
+            "bytes_by_proxy": self.bytes_by_proxy,
+            "ttfb_ms": distribution(self.ttfb_ms),
+            "dom_ready_ms": distribution(self.dom_ready_ms),
+        }
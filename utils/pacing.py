@@ -0,0 +1,122 @@
+"""
+Адаптивный подбор паузы между запросами и числа параллельных вкладок (AIMD).
+
+Пока поисковая система отвечает нормально, пауза уменьшается, а число вкладок растет
+на небольшой шаг (аддитивно). Капча означает, что мы превысили допустимую частоту:
+пауза умножается, а число вкладок делится (мультипликативно). Выросшая задержка ответа
+- ранний признак перегрузки: в этом случае значения не улучшаются. Найденные значения
+сохраняются и становятся начальными для следующего запуска.
+"""
+from .helpers import load_json_state, save_json_atomic
+
+class AimdPacing:
+    """
+    Регулятор паузы и параллельности по каждой поисковой системе (или паре система@прокси)
+    """
+    def __init__(self, path=None, delay_seconds=3, concurrency=1, min_delay=1, max_delay=120,
+                 max_concurrency=None, step=0.5, backoff=2.0, healthy_streak=5, latency_factor=2.0,
+                 smoothing=0.2):
+        """
+        :param path: JSON-файл для сохранения найденных значений (None - только в памяти)
+        :param delay_seconds: Начальная пауза для систем, по которым нет сохраненных значений
+        :param concurrency: Начальное число параллельных запросов к системе
+        :param min_delay: Минимальная пауза в секундах
+        :param max_delay: Максимальная пауза в секундах
+        :param max_concurrency: Максимум параллельных запросов (по умолчанию - начальное значение)
+        :param step: На сколько секунд уменьшать паузу после серии успешных запросов
+        :param backoff: Во сколько раз увеличивать паузу (и уменьшать параллельность) при капче
+        :param healthy_streak: Сколько успешных запросов подряд нужно для шага вперед
+        :param latency_factor: Во сколько раз задержка ответа должна превысить обычную,
+            чтобы считаться признаком перегрузки
+        :param smoothing: Вес последнего запроса в скользящей средней задержки ответа
+        """
+        self.path = path
+        self.delay_seconds = delay_seconds
+        self.concurrency = max(1, concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max(1, max_concurrency or concurrency)
+        self.step = step
+        self.backoff = backoff
+        self.healthy_streak = max(1, healthy_streak)
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+
+        # {ключ: {'delay', 'concurrency', 'latency_ms', 'streak', 'captchas'}}
+        self.engines = load_json_state(path, "настройки темпа запросов")
+
+    def _state(self, key):
+        state = self.engines.setdefault(key, {})
+        state.setdefault("delay", self.delay_seconds)
+        state.setdefault("concurrency", self.concurrency)
+        state.setdefault("latency_ms", None)
+        state.setdefault("streak", 0)
+        state.setdefault("captchas", 0)
+        # Ограничения могли измениться с прошлого запуска
+        state["delay"] = min(self.max_delay, max(self.min_delay, state["delay"]))
+        state["concurrency"] = min(self.max_concurrency, max(1, state["concurrency"]))
+        return state
+
+    def delay(self, key):
+        """Текущая пауза между запросами к поисковой системе в секундах"""
+        return self._state(key)["delay"]
+
+    def limit(self, key):
+        """Текущее допустимое число параллельных запросов к поисковой системе"""
+        return self._state(key)["concurrency"]
+
+    def record(self, key, outcome, latency_ms=None):
+        """
+        Учитывает результат запроса
+        :param key: Поисковая система или система@прокси
+        :param outcome: 'ok' - страница результатов получена, 'captcha' - блокировка,
+            'error' - прочие ошибки (таймауты и т.п.)
+        :param latency_ms: Время запроса в миллисекундах
+        :return: Описание изменения для журнала или None, если значения не изменились
+        """
+        state = self._state(key)
+
+        if outcome == "captcha":
+            state["captchas"] += 1
+            state["streak"] = 0
+            state["delay"] = min(self.max_delay, state["delay"] * self.backoff)
+            state["concurrency"] = max(1, int(state["concurrency"] / self.backoff))
+            return f"капча: пауза {state['delay']:.1f} сек, вкладок {state['concurrency']}"
+
+        if outcome != "ok":
+            # Ошибка не говорит о блокировке, но и не повод ускоряться
+            state["streak"] = 0
+            return None
+
+        slow = False
+        if latency_ms is not None:
+            average = state["latency_ms"]
+            slow = average is not None and latency_ms > average * self.latency_factor
+            state["latency_ms"] = latency_ms if average is None else average + self.smoothing * (latency_ms - average)
+
+        if slow:
+            # Ответы замедлились - держим текущий темп
+            state["streak"] = 0
+            return None
+
+        state["streak"] += 1
+        if state["streak"] < self.healthy_streak:
+            return None
+
+        state["streak"] = 0
+        old = (state["delay"], state["concurrency"])
+        state["delay"] = max(self.min_delay, state["delay"] - self.step)
+        state["concurrency"] = min(self.max_concurrency, state["concurrency"] + 1)
+        if (state["delay"], state["concurrency"]) == old:
+            return None
+        return f"ускоряемся: пауза {state['delay']:.1f} сек, вкладок {state['concurrency']}"
+
+    def summary(self):
+        """Сводка для метрик запуска"""
+        return {key: {"delay": round(state["delay"], 2), "concurrency": state["concurrency"],
+                      "captchas": state["captchas"]}
+                for key, state in self.engines.items()}
+
+    def save(self):
+        """Сохраняет найденные значения в файл (если он задан)"""
+        save_json_atomic(self.path, self.engines)
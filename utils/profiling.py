@@ -0,0 +1,208 @@
+"""
+Профилирование запуска поиска: разделение времени на работу процессора (on-CPU)
+и ожидание (blocked: WebDriverWait, random_delay, сеть)
+"""
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Режимы профилирования
+PROFILE_MODES = ["sampling", "cprofile"]
+
+class RunProfiler:
+    """
+    Профилировщик запуска.
+
+    В режиме 'sampling' отдельный поток периодически снимает стек профилируемого потока
+    и по приросту его процессорного времени делит интервал между работой процессора и
+    ожиданием. Результат пишется в формате свернутых стеков (для flamegraph) с корнями
+    [cpu] и [blocked] и в текстовую сводку самых затратных функций.
+
+    В режиме 'cprofile' используется детерминированный cProfile с таймером процессорного
+    времени, а ожидание считается как разница между общим и процессорным временем.
+
+    Профилируются только участки, для которых section() вызван с sampled=True, поэтому при
+    выборочном профилировании (каждая N-я компания) накладные расходы почти нулевые.
+    """
+    def __init__(self, output_path, mode="sampling", interval=0.005, top=20):
+        """
+        :param output_path: Путь к файлу профиля без расширения (рядом будет записана сводка .txt)
+        :param mode: 'sampling' или 'cprofile'
+        :param interval: Интервал снятия стека в секундах (для режима 'sampling')
+        :param top: Количество функций в сводке
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Поддерживаемые режимы профилирования: {', '.join(PROFILE_MODES)}")
+
+        # Без часов процессорного времени потока выборочный режим невозможен
+        if mode == "sampling" and not hasattr(time, "pthread_getcpuclockid"):
+            print("Выборочное профилирование недоступно на этой платформе, используется cProfile")
+            mode = "cprofile"
+
+        self.output_path = os.path.splitext(output_path)[0]
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+
+        self.sections = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+        # Свернутые стеки: (тип, стек) -> секунды
+        self._stacks = {}
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._thread_id = threading.get_ident()
+        self._sampler = None
+        self._cprofile = None
+
+        if self.mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+            self._sampler.start()
+        else:
+            import cProfile
+            self._cprofile = cProfile.Profile(time.process_time)
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_loop(self):
+        """Цикл потока выборки"""
+        clock = time.pthread_getcpuclockid(self._thread_id)
+
+        while not self._stopped.is_set():
+            # Вне профилируемых участков поток спит и не тратит ресурсы
+            if not self._active.wait(timeout=0.5):
+                continue
+
+            last_wall = time.perf_counter()
+            last_cpu = time.clock_gettime(clock)
+
+            while self._active.is_set() and not self._stopped.is_set():
+                time.sleep(self.interval)
+                if not self._active.is_set():
+                    break
+
+                frame = sys._current_frames().get(self._thread_id)
+                wall = time.perf_counter()
+                cpu = time.clock_gettime(clock)
+                delta_wall = wall - last_wall
+                delta_cpu = min(cpu - last_cpu, delta_wall)
+                last_wall, last_cpu = wall, cpu
+
+                if frame is None:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack = tuple(reversed(stack))
+
+                # Интервал делится между работой процессора и ожиданием пропорционально
+                if delta_cpu > 0:
+                    key = ("cpu", stack)
+                    self._stacks[key] = self._stacks.get(key, 0.0) + delta_cpu
+                if delta_wall - delta_cpu > 0:
+                    key = ("blocked", stack)
+                    self._stacks[key] = self._stacks.get(key, 0.0) + delta_wall - delta_cpu
+
+    @contextmanager
+    def section(self, sampled=True):
+        """
+        Профилируемый участок (например, обработка одной компании)
+        :param sampled: Профилировать ли этот участок
+        """
+        if not sampled:
+            yield
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        else:
+            self._active.set()
+
+        try:
+            yield
+        finally:
+            if self._cprofile is not None:
+                self._cprofile.disable()
+            else:
+                self._active.clear()
+
+            self.sections += 1
+            self.wall_time += time.perf_counter() - wall_start
+            self.cpu_time += time.thread_time() - cpu_start
+
+    def _top_functions(self, kind):
+        """Самые затратные функции по собственному времени (последний кадр стека)"""
+        totals = {}
+        for (stack_kind, stack), seconds in self._stacks.items():
+            if stack_kind == kind and stack:
+                totals[stack[-1]] = totals.get(stack[-1], 0.0) + seconds
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:self.top]
+
+    def close(self):
+        """
+        Останавливает профилирование, пишет файл профиля и сводку
+        :return: (путь к профилю, путь к сводке)
+        """
+        self._active.clear()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=2)
+
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        blocked_time = max(0.0, self.wall_time - self.cpu_time)
+        cpu_percent = (self.cpu_time / self.wall_time * 100) if self.wall_time else 0.0
+
+        lines = [
+            f"Профилированных участков: {self.sections}",
+            f"Общее время: {self.wall_time:.2f} сек",
+            f"Работа процессора (on-CPU): {self.cpu_time:.2f} сек ({cpu_percent:.1f}%)",
+            f"Ожидание (blocked): {blocked_time:.2f} сек ({100 - cpu_percent if self.wall_time else 0.0:.1f}%)",
+            "",
+        ]
+
+        if self._cprofile is not None:
+            import io
+            import pstats
+
+            profile_path = self.output_path + ".prof"
+            self._cprofile.dump_stats(profile_path)
+
+            stream = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=stream)
+            stats.sort_stats("tottime").print_stats(self.top)
+            lines.append(f"Топ-{self.top} функций по процессорному времени (cProfile):")
+            lines.append(stream.getvalue())
+        else:
+            profile_path = self.output_path + ".folded"
+            with open(profile_path, "w", encoding="utf-8") as f:
+                for (kind, stack), seconds in sorted(self._stacks.items()):
+                    # Формат свернутых стеков: кадры через ';' и вес в микросекундах
+                    f.write(f"[{kind}];{';'.join(stack)} {int(seconds * 1_000_000)}\n")
+
+            for kind, title in (("cpu", "работе процессора"), ("blocked", "ожиданию")):
+                lines.append(f"Топ-{self.top} функций по {title}:")
+                for name, seconds in self._top_functions(kind):
+                    lines.append(f"  {seconds:8.3f} сек  {name}")
+                lines.append("")
+
+        summary = "\n".join(lines)
+        summary_path = self.output_path + ".txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+
+        print(summary)
+        print(f"Профиль сохранен в файл: {profile_path}, сводка: {summary_path}")
+        return profile_path, summary_path
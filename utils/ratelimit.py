@@ -0,0 +1,145 @@
+"""
+Общее для всех процессов ограничение частоты запросов к поисковым системам.
+
+Состояние ведра токенов хранится в небольшом файле во временном каталоге и
+изменяется под эксклюзивной блокировкой файла, поэтому все процессы на одной
+машине расходуют один и тот же бюджет запросов к поисковой системе.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Каталог для файлов состояния по умолчанию
+RATE_LIMIT_DIR = os.path.join(tempfile.gettempdir(), "company_site_finder_ratelimit")
+
+def parse_rate_limits(values):
+    """
+    Разбирает ограничения частоты из командной строки
+    :param values: Список строк вида 'yandex=20' или 'yandex@host:port=30' (запросов в минуту)
+    :return: Словарь {'yandex': 20.0, 'yandex@host:port': 30.0}
+    """
+    rate_limits = {}
+    for value in values or []:
+        key, separator, rate = value.rpartition("=")
+        if not separator or not key:
+            raise ValueError(f"Ожидается ПОИСКОВАЯ_СИСТЕМА[@ПРОКСИ]=ЗАПРОСОВ_В_МИНУТУ, получено: {value}")
+        rate_limits[key.strip().lower()] = float(rate)
+    return rate_limits
+
+def resolve_rate(rate_limits, engine_name, proxy=None):
+    """
+    Находит ограничение для поисковой системы: сначала для пары система@прокси, затем для системы
+    :param rate_limits: Словарь ограничений (запросов в минуту)
+    :param engine_name: Имя поисковой системы
+    :param proxy: Прокси-сервер (опционально)
+    :return: Запросов в минуту или None, если ограничение не задано
+    """
+    if not rate_limits:
+        return None
+    if proxy:
+        rate = rate_limits.get(f"{engine_name}@{proxy}".lower())
+        if rate is not None:
+            return rate
+    return rate_limits.get(engine_name)
+
+class SharedRateLimiter:
+    """
+    Ведро токенов, общее для всех процессов на машине.
+
+    Ведро определяется поисковой системой и прокси: запросы через разные прокси
+    расходуют разные бюджеты, а процессы с одинаковыми настройками - один общий.
+    """
+    def __init__(self, engine_name, requests_per_minute, proxy=None, burst=1, state_dir=None):
+        """
+        :param engine_name: Имя поисковой системы
+        :param requests_per_minute: Допустимая частота запросов
+        :param proxy: Прокси-сервер (опционально)
+        :param burst: Сколько запросов можно сделать подряд после простоя
+        :param state_dir: Каталог для файлов состояния (по умолчанию RATE_LIMIT_DIR)
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("Частота запросов должна быть больше нуля")
+
+        self.engine_name = engine_name
+        self.proxy = proxy
+        self.rate = requests_per_minute / 60.0
+        self.burst = max(1, burst)
+
+        key = engine_name
+        if proxy:
+            key += "_" + hashlib.sha1(proxy.encode("utf-8")).hexdigest()[:12]
+
+        state_dir = state_dir or RATE_LIMIT_DIR
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"{key}.json")
+
+    def _lock(self, f):
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(self, f):
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _take(self):
+        """
+        Пытается взять токен
+        :return: 0, если токен взят, иначе время в секундах до появления токена
+        """
+        with open(self.path, "a+", encoding="utf-8") as f:
+            self._lock(f)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+
+                # Время берется по системным часам, чтобы оно было общим для всех процессов
+                now = time.time()
+                tokens = state.get("tokens", self.burst)
+                updated = state.get("updated", now)
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": tokens, "updated": now}))
+                f.flush()
+                return wait
+            finally:
+                self._unlock(f)
+
+    def acquire(self):
+        """
+        Ждет, пока в общем ведре появится токен, и забирает его
+        :return: Время ожидания в секундах
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return waited
+            # Другие процессы могли забрать токен, пока мы ждали, поэтому проверяем снова
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,277 @@
+"""
+Планирование запросов: отложенные повторные попытки с экспоненциальной задержкой,
+чередование поисковых систем, оценка времени до окончания и срок окончания запуска
+"""
+import re
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+class RetryQueue:
+    """
+    Очередь отложенных повторных попыток.
+
+    Неудачная компания не повторяется сразу, а откладывается на время, которое растет
+    экспоненциально с номером попытки (со случайным разбросом). Пока она ждет,
+    обрабатываются новые компании.
+    """
+    def __init__(self, base_delay=10, max_delay=600, jitter=0.5):
+        """
+        :param base_delay: Задержка перед второй попыткой в секундах
+        :param max_delay: Максимальная задержка в секундах
+        :param jitter: Доля случайного разброса задержки (0.5 - от 50% до 150%)
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._heap = []
+        # Счетчик для стабильного порядка компаний с одинаковым временем
+        self._counter = itertools.count()
+
+    def backoff(self, attempt):
+        """
+        Возвращает задержку перед попыткой с указанным номером
+        :param attempt: Номер следующей попытки (2 - первая повторная)
+        :return: Задержка в секундах
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempt - 2))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def push(self, company, attempt, now=None):
+        """
+        Откладывает компанию для повторной попытки
+        :param company: Название компании
+        :param attempt: Номер следующей попытки
+        :param now: Текущее время (time.monotonic), по умолчанию берется автоматически
+        :return: Время в секундах, через которое попытка станет доступна
+        """
+        now = time.monotonic() if now is None else now
+        delay = self.backoff(attempt)
+        heapq.heappush(self._heap, (now + delay, next(self._counter), company, attempt))
+        return delay
+
+    def pop_ready(self, now=None):
+        """
+        Извлекает компанию, время повторной попытки которой уже наступило
+        :param now: Текущее время (time.monotonic)
+        :return: (company, attempt) или None, если готовых попыток нет
+        """
+        now = time.monotonic() if now is None else now
+        if self._heap and self._heap[0][0] <= now:
+            _, _, company, attempt = heapq.heappop(self._heap)
+            return company, attempt
+        return None
+
+    def next_ready_in(self, now=None):
+        """
+        Возвращает время до ближайшей повторной попытки
+        :return: Секунды (0, если попытка уже доступна) или None, если очередь пуста
+        """
+        if not self._heap:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._heap[0][0] - now)
+
+    def drain(self):
+        """
+        Извлекает все отложенные попытки независимо от времени
+        :return: Список (company, attempt) в порядке готовности
+        """
+        items = [(company, attempt) for _, _, company, attempt in sorted(self._heap)]
+        self._heap = []
+        return items
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+class EngineSpacing:
+    """
+    Паузы между запросами к каждой поисковой системе отдельно.
+
+    Пауза нужна, чтобы не перегружать одну поисковую систему, поэтому после запроса
+    к Яндексу можно сразу отправить запрос в Google: браузер простаивает, только
+    когда ни одна из систем еще не готова принять следующий запрос.
+    """
+    def __init__(self, delay_seconds=3, jitter=2):
+        """
+        :param delay_seconds: Минимальная пауза между запросами к одной поисковой системе
+        :param jitter: Случайная добавка к паузе (от 0 до jitter секунд)
+        """
+        self.delay_seconds = delay_seconds
+        self.jitter = jitter
+        # Ключ (поисковая система или система@прокси) -> когда можно отправить следующий запрос
+        self._available_at = {}
+        # Когда ключ использовался последний раз - для чередования систем, готовых одновременно
+        self._last_used = {}
+        self._counter = itertools.count()
+
+    def ready_in(self, key, now=None):
+        """Секунды до момента, когда к поисковой системе можно отправить запрос (0 - уже можно)"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._available_at.get(key, now) - now)
+
+    def pick(self, keys, now=None):
+        """
+        Выбирает поисковую систему для следующего запроса: ту, что готова раньше всех,
+        а среди готовых - ту, к которой дольше всего не обращались
+        :param keys: Ключи поисковых систем
+        :return: Ключ
+        """
+        now = time.monotonic() if now is None else now
+        return min(keys, key=lambda key: (self.ready_in(key, now), self._last_used.get(key, -1)))
+
+    def wait(self, key):
+        """
+        Ждет, пока к поисковой системе можно будет отправить запрос
+        :return: Время ожидания в секундах
+        """
+        delay = self.ready_in(key)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def used(self, key, delay=None, now=None):
+        """
+        Отмечает запрос к поисковой системе: следующий - не раньше чем через паузу
+        :param delay: Пауза для этой системы (по умолчанию delay_seconds)
+        """
+        now = time.monotonic() if now is None else now
+        delay = self.delay_seconds if delay is None else delay
+        self._available_at[key] = now + random.uniform(delay, delay + self.jitter)
+        self._last_used[key] = next(self._counter)
+
+def parse_duration(value):
+    """
+    Разбирает длительность или время окончания
+    :param value: Число секунд, строка вида '90', '45s', '15m', '8h', '1h30m', '7d' или время суток 'ЧЧ:ММ'
+        (ближайшее такое время, сегодня или завтра)
+    :return: Длительность в секундах или None
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).strip().lower()
+
+    # Время суток: считаем до ближайшего наступления
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text)
+    if match:
+        now = datetime.now()
+        end = now.replace(hour=int(match.group(1)), minute=int(match.group(2)), second=0, microsecond=0)
+        if end <= now:
+            end += timedelta(days=1)
+        return (end - now).total_seconds()
+
+    if re.fullmatch(r"\d+(\.\d+)?", text):
+        return float(text)
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*([dhms])", text)
+    if not parts or re.sub(r"[\d.\sdhms]", "", text):
+        raise ValueError(f"Не удалось разобрать длительность: {value}")
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+def format_duration(seconds):
+    """
+    Форматирует длительность для вывода
+    :param seconds: Секунды
+    :return: Строка вида '2 ч 05 мин', '3 мин 20 сек' или '45 сек'
+    """
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours} ч {minutes:02d} мин"
+    if minutes:
+        return f"{minutes} мин {seconds:02d} сек"
+    return f"{seconds} сек"
+
+class RunBudget:
+    """
+    Учет времени запуска: оценка времени до окончания (ETA) по наблюдаемой скорости,
+    срок окончания запуска и бюджет времени на одну компанию.
+    """
+    def __init__(self, total, deadline=None, company_budget=None, window=20):
+        """
+        :param total: Сколько компаний нужно обработать
+        :param deadline: Через сколько секунд запуск должен закончиться (None - без срока)
+        :param company_budget: Сколько секунд можно потратить на одну компанию (None - без ограничения)
+        :param window: По скольким последним компаниям оценивать скорость
+        """
+        self.total = total
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + deadline if deadline is not None else None
+        self.company_budget = company_budget
+        self.completed = 0
+        self._completions = deque(maxlen=max(2, window))
+
+    def complete(self, now=None):
+        """Отмечает завершение обработки компании"""
+        now = time.monotonic() if now is None else now
+        self.completed += 1
+        self._completions.append(now)
+
+    def rate(self, now=None):
+        """
+        Наблюдаемая скорость по последним компаниям
+        :return: Компаний в секунду или None, если данных пока нет
+        """
+        now = time.monotonic() if now is None else now
+        if len(self._completions) >= 2 and self._completions[-1] > self._completions[0]:
+            return (len(self._completions) - 1) / (self._completions[-1] - self._completions[0])
+        if self.completed and now > self.started_at:
+            return self.completed / (now - self.started_at)
+        return None
+
+    def eta(self, now=None):
+        """
+        Оценка времени до окончания
+        :return: Секунды или None, если оценить пока нельзя
+        """
+        rate = self.rate(now)
+        if not rate:
+            return None
+        return max(0, self.total - self.completed) / rate
+
+    def time_left(self, now=None):
+        """Секунды до срока окончания (None - срока нет)"""
+        if self.deadline is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return self.deadline - now
+
+    def expired(self, now=None):
+        """Срок окончания наступил"""
+        time_left = self.time_left(now)
+        return time_left is not None and time_left <= 0
+
+    def behind(self, now=None):
+        """По текущей скорости запуск не успевает к сроку"""
+        time_left = self.time_left(now)
+        eta = self.eta(now)
+        return time_left is not None and eta is not None and eta > time_left
+
+    def over_budget(self, spent_seconds):
+        """На компанию уже потрачено больше бюджета"""
+        return self.company_budget is not None and spent_seconds >= self.company_budget
+
+    def describe(self, now=None):
+        """
+        Строка с оценкой времени для статуса
+        :return: Например, 'осталось ~1 ч 20 мин, отстаем от срока на 15 мин' или ''
+        """
+        eta = self.eta(now)
+        if eta is None:
+            return ""
+        text = f"осталось ~{format_duration(eta)}"
+        time_left = self.time_left(now)
+        if time_left is not None and eta > time_left:
+            text += f", отстаем от срока на {format_duration(eta - max(0, time_left))}"
+        return text
@@ -0,0 +1,135 @@
+"""
+Статистика селекторов ссылок: доля страниц, на которых селектор что-то нашел, и
+сколько ссылок он дает. По ней селекторы упорядочиваются, давно не работающие
+пропускаются, а после хорошего селектора с результатами остальные не выполняются.
+"""
+from .helpers import load_json_state, save_json_atomic
+
+class SelectorStats:
+    """
+    Статистика селекторов по поисковым системам с сохранением между запусками.
+
+    Для каждого селектора хранятся число страниц, на которых он выполнялся, число
+    страниц с совпадениями, общее число найденных ссылок, скользящая доля попаданий
+    (недавние страницы весят больше) и число промахов подряд.
+    """
+    def __init__(self, path=None, smoothing=0.1, dead_after=50, probe_every=25,
+                 short_circuit_rate=0.8, short_circuit_links=3, min_pages=5):
+        """
+        :param path: JSON-файл для сохранения статистики (None - только в памяти)
+        :param smoothing: Вес последней страницы в скользящей доле попаданий
+        :param dead_after: После скольких промахов подряд селектор считается неработающим
+        :param probe_every: Неработающие селекторы все же проверяются на каждой N-й странице,
+            чтобы заметить возврат старой разметки
+        :param short_circuit_rate: Минимальная доля попаданий селектора, после которого можно остановиться
+        :param short_circuit_links: Сколько ссылок должен найти такой селектор, чтобы остальные не выполнять
+        :param min_pages: Сколько страниц нужно, чтобы доверять доле попаданий селектора
+        """
+        self.path = path
+        self.smoothing = smoothing
+        self.dead_after = dead_after
+        self.probe_every = max(1, probe_every)
+        self.short_circuit_rate = short_circuit_rate
+        self.short_circuit_links = short_circuit_links
+        self.min_pages = min_pages
+
+        # {поисковая система: {'pages': N, 'selectors': {селектор: статистика}}}
+        self.engines = load_json_state(path, "статистику селекторов")
+
+    def _engine(self, engine_name):
+        return self.engines.setdefault(engine_name, {"pages": 0, "selectors": {}})
+
+    def _selector(self, engine_name, selector):
+        return self._engine(engine_name)["selectors"].setdefault(selector, {
+            "pages": 0,
+            "hits": 0,
+            "links": 0,
+            # Новые селекторы сначала считаются рабочими, чтобы их попробовали
+            "recent_hit_rate": 1.0,
+            "misses_in_row": 0,
+        })
+
+    def is_dead(self, engine_name, selector):
+        """Проверяет, что селектор давно ничего не находит"""
+        stats = self.engines.get(engine_name, {}).get("selectors", {}).get(selector)
+        return bool(stats) and stats["misses_in_row"] >= self.dead_after
+
+    def plan(self, engine_name, selectors, generic=()):
+        """
+        Составляет порядок выполнения селекторов для очередной страницы. Порядок выполнения
+        не влияет на приоритет найденных ссылок: они ранжируются по исходному порядку селекторов
+        :param engine_name: Имя поисковой системы
+        :param selectors: Селекторы поисковой системы в исходном порядке
+        :param generic: Общие селекторы (например, все внешние ссылки): они находят что-то почти на
+            любой странице, поэтому не поднимаются вперед и не останавливают выполнение остальных
+        :return: Список (селектор, можно_остановиться) в порядке убывания недавней доли попаданий и выхода ссылок
+        """
+        engine = self._engine(engine_name)
+        engine["pages"] += 1
+        probe = engine["pages"] % self.probe_every == 0
+
+        planned = [selector for selector in selectors if probe or not self.is_dead(engine_name, selector)]
+        # Если не работает ни один селектор, выполняем все
+        if not planned:
+            planned = list(selectors)
+
+        # При равной доле попаданий первым идет селектор, дающий больше ссылок, затем исходный порядок
+        position = {selector: index for index, selector in enumerate(selectors)}
+
+        def priority(selector):
+            stats = self._selector(engine_name, selector)
+            links_per_page = stats["links"] / stats["pages"] if stats["pages"] else 0.0
+            return -round(stats["recent_hit_rate"], 2), -links_per_page, position[selector]
+
+        generic = set(generic)
+        specific = sorted((selector for selector in planned if selector not in generic), key=priority)
+        plan = []
+        for selector in specific:
+            stats = self._selector(engine_name, selector)
+            trusted = stats["pages"] >= self.min_pages and stats["recent_hit_rate"] >= self.short_circuit_rate
+            plan.append((selector, trusted))
+        # Общие селекторы - всегда в конце и в исходном порядке
+        plan.extend((selector, False) for selector in planned if selector in generic)
+        return plan
+
+    def record(self, engine_name, selector, matched):
+        """
+        Записывает результат выполнения селектора на странице
+        :param engine_name: Имя поисковой системы
+        :param selector: Селектор
+        :param matched: Сколько ссылок нашел селектор
+        """
+        stats = self._selector(engine_name, selector)
+        hit = matched > 0
+        stats["pages"] += 1
+        stats["hits"] += int(hit)
+        stats["links"] += matched
+        stats["recent_hit_rate"] += self.smoothing * (float(hit) - stats["recent_hit_rate"])
+        stats["misses_in_row"] = 0 if hit else stats["misses_in_row"] + 1
+
+    def summary(self):
+        """
+        Сводка для метрик запуска
+        :return: {поисковая система: [статистика селекторов по убыванию недавней доли попаданий]}
+        """
+        summary = {}
+        for engine_name, engine in self.engines.items():
+            rows = []
+            for selector, stats in engine["selectors"].items():
+                pages = stats["pages"]
+                rows.append({
+                    "selector": selector,
+                    "pages": pages,
+                    "hit_rate": round(stats["hits"] / pages, 3) if pages else None,
+                    "recent_hit_rate": round(stats["recent_hit_rate"], 3),
+                    "links_per_page": round(stats["links"] / pages, 2) if pages else None,
+                    "misses_in_row": stats["misses_in_row"],
+                    "dead": self.is_dead(engine_name, selector),
+                })
+            rows.sort(key=lambda row: -row["recent_hit_rate"])
+            summary[engine_name] = rows
+        return summary
+
+    def save(self):
+        """Сохраняет статистику в файл (если он задан)"""
+        save_json_atomic(self.path, self.engines)
@@ -0,0 +1,111 @@
+"""
+Архив страниц результатов поиска (SERP) для повторного разбора без сети.
+
+Страницы хранятся сжатыми (gzip) и адресуются по содержимому: имя файла - это
+SHA-256 от HTML, поэтому одинаковые страницы хранятся один раз. Индекс index.jsonl
+связывает пару (поисковая система, запрос) с хешем последней загруженной страницы.
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+
+INDEX_FILE = "index.jsonl"
+OBJECTS_DIR = "objects"
+
+class SerpArchive:
+    """
+    Архив страниц результатов поиска в каталоге на диске
+    """
+    def __init__(self, directory):
+        """
+        :param directory: Каталог архива (создается при необходимости)
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        os.makedirs(os.path.join(directory, OBJECTS_DIR), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, OBJECTS_DIR, digest[:2], digest + ".html.gz")
+
+    def store(self, engine_name, query, company, html, url=None):
+        """
+        Сохраняет страницу результатов
+        :param engine_name: Имя поисковой системы
+        :param query: Поисковый запрос
+        :param company: Название компании
+        :param html: HTML страницы результатов
+        :param url: Адрес страницы (опционально)
+        :return: SHA-256 содержимого
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Пишем во временный файл и переименовываем, чтобы не оставить неполный объект
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(temp_path, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        entry = {
+            "engine": engine_name,
+            "query": query,
+            "company": company,
+            "sha256": digest,
+            "url": url,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        # Одна короткая строка в режиме дозаписи, поэтому индекс можно вести из нескольких процессов
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        return digest
+
+    def load(self, digest):
+        """
+        Загружает страницу по хешу
+        :param digest: SHA-256 содержимого
+        :return: HTML страницы
+        """
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def entries(self, engines=None):
+        """
+        Возвращает записи индекса: для каждой пары (поисковая система, запрос) - последнюю загрузку
+        :param engines: Ограничить записи этими поисковыми системами (опционально)
+        :return: Список словарей с ключами engine, query, company, sha256, url, fetched_at
+        """
+        latest = {}
+        if not os.path.exists(self.index_path):
+            return []
+
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Недописанная строка, например, если процесс был прерван
+                    continue
+                if engines and entry["engine"] not in engines:
+                    continue
+                latest[(entry["engine"], entry["query"])] = entry
+
+        return list(latest.values())
+
+    def get(self, engine_name, query):
+        """
+        Возвращает последнюю сохраненную страницу для поисковой системы и запроса
+        :return: HTML страницы или None, если ее нет в архиве
+        """
+        for entry in self.entries([engine_name]):
+            if entry["query"] == query:
+                return self.load(entry["sha256"])
+        return None
+
+    def __len__(self):
+        return len(self.entries())
@@ -0,0 +1,107 @@
+"""
+Несколько вкладок в одном браузере: запросы раздаются вкладкам по кругу, навигация
+не блокирует (через window.location), а готовность каждой вкладки проверяется отдельно.
+Вкладки делят один процесс Chrome, поэтому параллельный поиск занимает намного меньше
+памяти, чем отдельный браузер на каждый поток.
+"""
+import time
+
+# Навигация без ожидания загрузки. Метка остается на старом документе, поэтому по ней видно,
+# что новая страница еще не открылась (иначе старая выдача выглядела бы готовой)
+NAVIGATE_SCRIPT = "window.__csfPending = true; window.location.href = arguments[0];"
+READY_SCRIPT = "return [!window.__csfPending, !window.__csfPending && !!document.querySelector(arguments[0])];"
+
+class BrowserTab:
+    """Вкладка браузера и запрос, который в ней выполняется"""
+    def __init__(self, handle):
+        self.handle = handle
+        # Словарь с описанием запроса (company, attempt, engine, query, started_at) или None
+        self.job = None
+        self.deadline = 0.0
+        # Вкладка свободна, но новый запрос в нее можно отправить не раньше этого времени
+        self.available_at = 0.0
+
+class TabPool:
+    """
+    Набор вкладок одного драйвера. WebDriver управляет одной вкладкой за раз, поэтому
+    параллельность достигается тем, что вкладки загружают страницы одновременно, а
+    драйвер только переключается между ними, чтобы отправить запрос или забрать результат.
+    """
+    def __init__(self, driver, size):
+        """
+        :param driver: WebDriver
+        :param size: Количество вкладок
+        """
+        self.driver = driver
+        handles = [driver.current_window_handle]
+        for _ in range(max(1, size) - 1):
+            driver.switch_to.new_window('tab')
+            handles.append(driver.current_window_handle)
+
+        self.tabs = [BrowserTab(handle) for handle in handles]
+        self._current = handles[-1]
+        self._next = 0
+
+    def activate(self, tab):
+        """Делает вкладку текущей для драйвера"""
+        if self._current != tab.handle:
+            self.driver.switch_to.window(tab.handle)
+            self._current = tab.handle
+
+    def idle(self, now=None):
+        """
+        Свободные вкладки по кругу, начиная со следующей после последней загруженной
+        :return: Список BrowserTab
+        """
+        now = time.monotonic() if now is None else now
+        ordered = self.tabs[self._next:] + self.tabs[:self._next]
+        return [tab for tab in ordered if tab.job is None and tab.available_at <= now]
+
+    def busy(self):
+        """Вкладки, в которых выполняется запрос"""
+        return [tab for tab in self.tabs if tab.job is not None]
+
+    def next_available_in(self, now=None):
+        """Время в секундах до освобождения ближайшей свободной вкладки (None, если свободных нет)"""
+        now = time.monotonic() if now is None else now
+        waits = [max(0.0, tab.available_at - now) for tab in self.tabs if tab.job is None]
+        return min(waits) if waits else None
+
+    def dispatch(self, tab, url, job, timeout):
+        """
+        Начинает загрузку страницы во вкладке и сразу возвращает управление
+        :param tab: Свободная вкладка
+        :param url: Адрес страницы результатов
+        :param job: Описание запроса
+        :param timeout: Сколько секунд ждать готовности страницы
+        """
+        self.activate(tab)
+        self.driver.execute_script(NAVIGATE_SCRIPT, url)
+        tab.job = job
+        tab.deadline = time.monotonic() + timeout
+        self._next = (self.tabs.index(tab) + 1) % len(self.tabs)
+
+    def poll(self):
+        """
+        Проверяет занятые вкладки
+        :return: Список (вкладка, открылась_ли_страница, готова_ли) для вкладок, где страница
+            готова или истекло время ожидания
+        """
+        finished = []
+        for tab in self.busy():
+            self.activate(tab)
+            loaded, ready = self.driver.execute_script(READY_SCRIPT, tab.job['engine'].ready_selector)
+            if ready or time.monotonic() >= tab.deadline:
+                finished.append((tab, bool(loaded), bool(ready)))
+        return finished
+
+    def release(self, tab, delay=0.0):
+        """
+        Освобождает вкладку
+        :param delay: Пауза в секундах перед следующим запросом в этой вкладке
+        :return: Описание запроса, который выполнялся во вкладке
+        """
+        job = tab.job
+        tab.job = None
+        tab.available_at = time.monotonic() + delay
+        return job